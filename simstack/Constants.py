@@ -13,4 +13,5 @@ SETTING_KEYS = {
     "registry.is_default": "is_default",
     "wanoRepo": "WaNo_Repository_Path",
     "workflows": "workflow_path",
+    "connectOnStartup": "connect_all_registries_on_startup",
 }
@@ -1,12 +1,15 @@
 import getpass
 import logging
 import socket
+import time
+import threading
 
 import os
+import posixpath
+import shutil
 from io import StringIO
 import traceback
 from enum import Enum
-from os.path import dirname
 
 
 import paramiko
@@ -16,7 +19,7 @@ from lxml import etree
 
 from zmq.error import Again, ZMQError
 
-from PySide6.QtCore import Signal, QObject
+from PySide6.QtCore import Signal, QObject, Qt
 from PySide6.QtWidgets import QMessageBox
 
 from SimStackServer.ClusterManager import ClusterManager
@@ -31,11 +34,53 @@ from SimStackServer.Util.FileUtilities import filewalker
 
 from functools import wraps
 
+from simstack.lib.BlobStore import BlobStore
+from simstack.lib.DownloadManager import DownloadManager
+from simstack.lib.ListingCache import (
+    DIRECTORY_LISTING,
+    WORKFLOW_JOB_LISTING,
+    WORKFLOW_LIST_KEY,
+    ListingCache,
+)
+from simstack.lib.Placeholders import PlaceholderSubstitution
 from simstack.lib.QtClusterSettingsProvider import QtClusterSettingsProvider
+from simstack.lib.RemoteListing import list_dirs
+from simstack.lib.RequestExecutor import (
+    CONTROL_LANE,
+    TRANSFER_LANE,
+    RequestExecutor,
+    current_request,
+)
+from simstack.lib.StatusPoller import FINAL_STATUSES, status_changes
+from simstack.lib.TransferEngine import TransferEngine, get_ssh_client
 
 """ Number of data transfer workers per regisrtry. """
 MAX_DT_WORKERS_PER_REGISTRY = 3
 
+""" Minimum interval in seconds between two progress updates sent to the GUI. """
+PROGRESS_INTERVAL = 1.0 / 30.0
+
+""" Directory levels listed in advance, when a directory is expanded. """
+LISTING_PREFETCH_DEPTH = 2
+
+""" Workflows shown at once in the remote file tree, more are loaded on scrolling. """
+WORKFLOW_PAGE_SIZE = 200
+
+""" Seconds between SSH keep-alive packets of connected registries. """
+KEEPALIVE_INTERVAL = 30
+
+""" Seconds the connection of a registry, which is not used, is kept open. """
+POOL_IDLE_TIMEOUT = 30 * 60
+
+""" Connections kept open at most. The least recently used is closed first. """
+MAX_POOLED_CONNECTIONS = 4
+
+""" Workflows with at least this many files are uploaded as a single archive. """
+ARCHIVE_SUBMIT_MIN_FILES = 200
+
+""" Workflows with at least this many bytes are uploaded as a single archive. """
+ARCHIVE_SUBMIT_MIN_BYTES = 64 * 1024 * 1024
+
 _AUTH_TYPES = Enum(
     "AUTH_TYPES",
     """
@@ -111,7 +156,7 @@ def eagain_catcher(f):
             from simstack.view.WFViewManager import WFViewManager
 
             message = "Connection Error, please try reconnecting Client."
-            WFViewManager.show_error(message)
+            self._exec_callback(WFViewManager.show_error, message)
         except socket.timeout as e:
             from simstack.view.WFViewManager import WFViewManager
 
@@ -119,7 +164,7 @@ def eagain_catcher(f):
                 "Caught connection exception %s: SSH socket timed out. Please try reconnecting Client."
                 % (e)
             )
-            WFViewManager.show_error(message)
+            self._exec_callback(WFViewManager.show_error, message)
         except OSError as e:
             from simstack.view.WFViewManager import WFViewManager
 
@@ -128,13 +173,39 @@ def eagain_catcher(f):
                 type(e),
                 e,
             )
-            WFViewManager.show_error(message)
+            self._exec_callback(WFViewManager.show_error, message)
 
     return wrapper
 
 
+def io_request(lane):
+    """
+    Runs the decorated method on the thread pool of its registry.
+
+    Called from the GUI thread of a threaded SSHConnector, the method returns
+    a cancellable Request immediately. In all other cases it runs inline.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(self, registry_name, *args, **kwds):
+            if not self._threaded or not self._in_gui_thread():
+                return f(self, registry_name, *args, **kwds)
+            return self._executor.submit(
+                registry_name, lane, f, self, registry_name, *args, **kwds
+            )
+
+        return wrapper
+
+    return decorator
+
+
 class SSHConnector(QObject):
     error = Signal(str, int, int, str, name="SSHError")
+    # Emitted with the registry name, when an idle connection was closed.
+    connection_evicted = Signal(str)
+    _dispatch = Signal(object)
+    _dispatch_blocking = Signal(object)
 
     def _emit_error(self, base_uri, operation, error, message=None):
         if message is None:
@@ -156,18 +227,35 @@ class SSHConnector(QObject):
         maindir = os.path.dirname(os.path.realpath(__main__.__file__))
         return maindir
 
+    @io_request(CONTROL_LANE)
     @eagain_catcher
-    def connect_registry(self, registry_name: str, callback=(None, (), {})):
+    def connect_registry(
+        self, registry_name: str, callback=(None, (), {}), reuse=False, keep_open=False
+    ):
+        """
+        Connects to the registry and starts its server.
+
+        :param reuse: Keep a live connection of the registry instead of
+                      connecting again, e.g. when switching back to it.
+        :param keep_open: Never close the connection for being idle, e.g. when
+                          all registries were connected on purpose.
+        """
         name = registry_name
         error = ErrorCodes.NO_ERROR
         statusmessage = ""
         registry = self._registries[name]
+        if keep_open:
+            with self._pool_lock:
+                self._kept_open.add(name)
+        if reuse and self._pooled_cm(name) is not None:
+            self._exec_callback(callback, registry.base_URI, error, "Connected.")
+            return
         try:
             # We disconnect in case of reconnect
-            if name in self._clustermanagers:
-                cm = self._clustermanagers[name]
-                if cm.is_connected():
-                    cm.disconnect()
+            with self._pool_lock:
+                cm = self._clustermanagers.get(name)
+            if cm is not None and cm.is_connected():
+                cm.disconnect()
         except ConnectionError:
             pass
 
@@ -222,7 +310,9 @@ class SSHConnector(QObject):
                 queueing_system=registry.queueing_system,
                 default_queue=registry.queue,
             )
-        self._clustermanagers[name] = cm
+        with self._pool_lock:
+            self._clustermanagers[name] = cm
+        self._get_listing_cache(name).clear()
         if not cm.is_connected():
             try:
                 local_hostkey_file = SimStackPaths.get_local_hostfile()
@@ -233,7 +323,8 @@ class SSHConnector(QObject):
                 except paramiko.ssh_exception.SSHException as e:
                     exstr = str(e)
                     if exstr.endswith("not found in known_hosts"):
-                        reply = QMessageBox.question(
+                        reply = self._call_in_gui_thread(
+                            QMessageBox.question,
                             None,
                             "SSH HostKey unknown",
                             "An unknown hostkey was encountered, when connecting to %s. If this is your first time connecting, this is expected. Add the Host to your local hostkeys?"
@@ -256,22 +347,24 @@ class SSHConnector(QObject):
                 error = ErrorCodes.NO_ERROR
                 statusmessage = "Connected."
                 self.start_server(registry_name)
+                self._keep_alive(cm)
+                self._touch(name)
             except paramiko.ssh_exception.SSHException as e:
                 statusmessage = str(e)
                 traceback.print_exc()
                 error = ErrorCodes.CONN_ERROR
-                del self._clustermanagers[name]
+                self._pop_cm(name)
             except Again:
                 statusmessage = "Connection Error, please try reconnecting Client."
                 error = ErrorCodes.CONN_ERROR
-                del self._clustermanagers[name]
+                self._pop_cm(name)
             except socket.timeout as e:
                 statusmessage = (
                     "Caught connection exception %s: SSH socket timed out. Please try reconnecting Client."
                     % (e)
                 )
                 error = ErrorCodes.CONN_ERROR
-                del self._clustermanagers[name]
+                self._pop_cm(name)
             except FileNotFoundError as e:
                 traceback_out = StringIO()
                 traceback.print_exc(file=traceback_out)
@@ -281,18 +374,112 @@ class SSHConnector(QObject):
                 )
 
                 error = ErrorCodes.CONN_ERROR
-                del self._clustermanagers[name]
+                self._pop_cm(name)
             except OSError as e:
                 statusmessage = (
                     "Caught generic exception %s. Please reconnect and try again and if it reappears report to Nanomatch"
                     % (e)
                 )
                 error = ErrorCodes.CONN_ERROR
-                del self._clustermanagers[name]
+                self._pop_cm(name)
         else:
             print("Already connected, will not connect again.")
+        self._evict_idle_connections(keep=name)
         self._exec_callback(callback, registry.base_URI, error, statusmessage)
 
+    def _pooled_cm(self, registry_name):
+        """
+        :return: The ClusterManager of registry_name, if it is still connected.
+                 Dead connections are closed and None is returned.
+        """
+        with self._pool_lock:
+            cm = self._clustermanagers.get(registry_name)
+        if cm is None:
+            return None
+        if self._is_alive(cm):
+            self._touch(registry_name)
+            return cm
+        self._close_connection(registry_name)
+        return None
+
+    @staticmethod
+    def _is_alive(cm) -> bool:
+        try:
+            if not cm.is_connected():
+                return False
+        except (OSError, ZMQError):
+            return False
+        client = get_ssh_client(cm)
+        if client is None:
+            return True
+        # Failed keep-alive packets close the transport.
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @staticmethod
+    def _keep_alive(cm):
+        # Keeps idle connections from being dropped by firewalls and NAT.
+        client = get_ssh_client(cm)
+        transport = client.get_transport() if client is not None else None
+        if transport is not None:
+            transport.set_keepalive(KEEPALIVE_INTERVAL)
+
+    def _touch(self, registry_name):
+        with self._pool_lock:
+            self._last_used[registry_name] = time.monotonic()
+
+    def _pop_cm(self, registry_name):
+        with self._pool_lock:
+            self._last_used.pop(registry_name, None)
+            return self._clustermanagers.pop(registry_name, None)
+
+    def _close_connection(self, registry_name):
+        cm = self._pop_cm(registry_name)
+        self._get_listing_cache(registry_name).clear()
+        if cm is not None:
+            try:
+                cm.disconnect()
+            except (OSError, ZMQError) as e:
+                print("Could not disconnect from %s: %s" % (registry_name, e))
+
+    def _evict_idle_connections(self, keep=None):
+        """
+        Closes connections unused for POOL_IDLE_TIMEOUT and the least recently
+        used ones beyond MAX_POOLED_CONNECTIONS. Registries with running
+        requests, connected with keep_open and keep are left alone.
+
+        It runs in the request thread of any registry, so a registry is only
+        closed while its registry lock can be taken without waiting and no
+        request of it is pending.
+        """
+        now = time.monotonic()
+        with self._pool_lock:
+            last_used = {
+                name: self._last_used.get(name, 0.0)
+                for name in self._clustermanagers
+                if name != keep and name not in self._kept_open
+            }
+        idle = sorted(
+            (name for name in last_used if not self._executor.is_busy(name)),
+            key=last_used.get,
+            reverse=True,
+        )
+        for position, name in enumerate(idle):
+            unused = now - last_used[name]
+            if unused <= POOL_IDLE_TIMEOUT and position + 1 < MAX_POOLED_CONNECTIONS:
+                continue
+            registry_lock = self._executor.lock(name)
+            if not registry_lock.acquire(blocking=False):
+                continue
+            try:
+                # Requests submitted since is_busy was checked wait for the
+                # lock and find the registry disconnected.
+                if not self._executor.is_busy(name):
+                    self._close_connection(name)
+                    self.connection_evicted.emit(name)
+            finally:
+                registry_lock.release()
+
     def _get_error_or_fail(self, base_uri):
         worker = None
         if base_uri in self.workers:
@@ -303,15 +490,20 @@ class SSHConnector(QObject):
             )
         return worker
 
+    @io_request(CONTROL_LANE)
     def disconnect_registry(self, registry_name, callback):
         name = registry_name
         error = ErrorCodes.NO_ERROR
         statusmessage = ""
-        if name in self._clustermanagers:
-            cm = self._clustermanagers[name]
+        with self._pool_lock:
+            cm = self._clustermanagers.get(name)
+            self._kept_open.discard(name)
+        if cm is not None:
             cm.disconnect()
+        self._get_listing_cache(name).clear()
         self._exec_callback(callback, error, statusmessage)
 
+    @io_request(TRANSFER_LANE)
     @eagain_catcher
     def run_workflow_job(
         self,
@@ -321,51 +513,128 @@ class SSHConnector(QObject):
         xml,
         progress_callback=None,
         callback=None,
+        remove_after_upload=False,
+    ):
+        """
+        Uploads dir_to_upload as submitname and submits xml. If
+        remove_after_upload is set, dir_to_upload is removed afterwards, even
+        if the upload failed.
+        """
+        try:
+            self._upload_and_submit(
+                registry_name, submitname, dir_to_upload, xml, progress_callback
+            )
+        except (Again, ZMQError, OSError):
+            # Shown by eagain_catcher.
+            raise
+        except Exception as e:
+            from simstack.view.WFViewManager import WFViewManager
+
+            traceback.print_exc()
+            message = "Submitting workflow %s failed: %s" % (submitname, e)
+            self._exec_callback(WFViewManager.show_error, message)
+        finally:
+            if remove_after_upload:
+                shutil.rmtree(dir_to_upload, ignore_errors=True)
+
+    def _upload_and_submit(
+        self, registry_name, submitname, dir_to_upload, xml, progress_callback
     ):
         cm = self._get_cm(registry_name)
+        registry_lock = self._executor.lock(registry_name)
+        progress_callback = self._progress_to_gui_thread(progress_callback)
         counter = 0
 
         real_submitname = submitname
-        while cm.exists(real_submitname):
-            counter += 1
-            print(
-                "File %s already exists. This is unlikely but possible, when submitting lots of workflows. Trying a different filename."
-                % (real_submitname)
-            )
-            real_submitname = submitname + "_Nr_%d" % counter
-
-            if counter == 15:
-                raise FileExistsError(
-                    "File %s already exists. Stopping to find a new file. This is highly unlikely. Please report to Nanomatch."
+        with registry_lock:
+            while cm.exists(real_submitname):
+                counter += 1
+                print(
+                    "File %s already exists. This is unlikely but possible, when submitting lots of workflows. Trying a different filename."
                     % (real_submitname)
                 )
+                real_submitname = submitname + "_Nr_%d" % counter
+
+                if counter == 15:
+                    raise FileExistsError(
+                        "File %s already exists. Stopping to find a new file. This is highly unlikely. Please report to Nanomatch."
+                        % (real_submitname)
+                    )
 
         submitname = real_submitname
 
+        transfers = []
         for filename in filewalker(dir_to_upload):
             cp = os.path.commonprefix([dir_to_upload, filename])
             relpath = os.path.relpath(filename, cp)
             submitpath = submitname + "/" + "workflow_data" + "/" + relpath
-            print("Uploading '%s' to '%s'" % (filename, submitpath))
-            mydir = dirname(submitpath).replace("\\", "/")
-            cm.mkdir_p(mydir)
-            cm.put_file(filename, submitpath.replace("\\", "/"))
+            transfers.append((filename, submitpath.replace("\\", "/")))
+        blobstore = self._get_blobstore(registry_name, cm)
+        num_files = len(transfers)
+        transfers = blobstore.copy_known(transfers)
+        if len(transfers) != num_files:
+            print(
+                "Copied %d unchanged files from the blob store"
+                % (num_files - len(transfers))
+            )
+
+        engine = TransferEngine(cm, max_workers=MAX_DT_WORKERS_PER_REGISTRY)
+        request = current_request()
+        if request is not None:
+            request.add_cancel_hook(engine.cancel)
+        if self._use_archive_submit(cm, transfers):
+            print(
+                "Uploading %d files to '%s' as archive" % (len(transfers), submitname)
+            )
+            engine.upload_archive(
+                transfers,
+                submitname + "/" + "workflow_data",
+                progress_callback=progress_callback,
+            )
+        else:
+            print("Uploading %d files to '%s'" % (len(transfers), submitname))
+            engine.upload(transfers, progress_callback=progress_callback)
+        # Only links the uploaded files. Linking them after the job started
+        # could store inputs the job already modified.
+        blobstore.add(transfers)
 
         wf_yml_name = real_submitname + "/" + "rendered_workflow.xml"
-        with cm.remote_open(wf_yml_name, "wt") as outfile:
-            outfile.write(
-                etree.tostring(xml, encoding="utf8", pretty_print=True)
-                .decode()
-                .replace("c9m:", "")
-                .replace("${STORAGE}/", "")
-                .replace("${SUBMIT_NAME}", real_submitname)
-                .replace(
-                    "${BASEFOLDER}", cm.get_calculation_basepath() + "/" + submitname
+        with registry_lock:
+            placeholders = PlaceholderSubstitution(
+                {
+                    "c9m:": "",
+                    "${STORAGE}/": "",
+                    "${SUBMIT_NAME}": real_submitname,
+                    "${BASEFOLDER}": cm.get_calculation_basepath() + "/" + submitname,
+                    "${QUEUE}": cm.get_queueing_system(),
+                    "${QUEUE_NAME}": cm.get_default_queue(),
+                }
+            )
+            with cm.remote_open(wf_yml_name, "wt") as outfile:
+                placeholders.write(
+                    outfile, etree.tostring(xml, encoding="utf8", pretty_print=True)
                 )
-                .replace("${QUEUE}", cm.get_queueing_system())
-                .replace("${QUEUE_NAME}", cm.get_default_queue())
+            cm.submit_wf(wf_yml_name)
+        self._get_listing_cache(registry_name).discard(WORKFLOW_LIST_KEY)
+
+    def _get_blobstore(self, registry_name, cm) -> BlobStore:
+        blobstore = self._blobstores.get(registry_name)
+        if blobstore is None or blobstore.cm is not cm:
+            index_file = BlobStore.index_file_for_registry(
+                SimStackPaths.get_settings_folder_nanomatch(), registry_name
             )
-        cm.submit_wf(wf_yml_name)
+            blobstore = BlobStore(cm, index_file)
+            self._blobstores[registry_name] = blobstore
+        return blobstore
+
+    def _use_archive_submit(self, cm, transfers) -> bool:
+        """Many small files are faster in a single tar stream than one by one."""
+        if get_ssh_client(cm) is None:
+            return False
+        if len(transfers) >= self.archive_submit_min_files:
+            return True
+        total = sum(os.path.getsize(local_file) for local_file, _ in transfers)
+        return total >= self.archive_submit_min_bytes
 
     def update_job_list(self, base_uri, callback=(None, (), {})):
         worker = self._get_error_or_fail(base_uri)
@@ -377,35 +646,260 @@ class SSHConnector(QObject):
         if worker is not None:
             worker.update_resources(callback, base_uri)
 
+    def _get_listing_cache(self, registry_name) -> ListingCache:
+        cache = self._listings.get(registry_name)
+        if cache is None:
+            cache = ListingCache()
+            self._listings[registry_name] = cache
+        return cache
+
+    def _cached_listing(self, registry_name, key, fetch, callback, *args):
+        """
+        Serves a listing from the cache. Stale listings are delivered as well,
+        but fetched again in the background. The callback is called a second
+        time then, if the listing changed.
+        """
+        listing, fresh = self._get_listing_cache(registry_name).get(key)
+        if listing is not None:
+            self._exec_callback(callback, registry_name, *args, listing)
+            if fresh:
+                return None
+        return fetch(registry_name, *args, callback, revalidate=listing is not None)
+
+    def _store_listing(self, registry_name, key, listing, revalidate) -> bool:
+        """Caches listing. Returns True, if the callback has to be called."""
+        changed = self._get_listing_cache(registry_name).put(key, listing)
+        return changed or not revalidate
+
+    def expire_listings(self, registry_name):
+        """Marks all cached listings stale, e.g. after the user pressed reload."""
+        self._get_listing_cache(registry_name).expire()
+
+    def update_workflow_list(
+        self, registry_name, callback=(None, (), {}), offset=0, limit=None
+    ):
+        """
+        Lists the workflows newest first. The callback gets limit workflows from
+        offset on and the total number of workflows as
+        callback(registry_name, workflows, offset, total). ClusterManager only
+        lists all workflows at once, so the pages are cut from the cached list.
+        """
+        page = (self._deliver_workflow_page, (callback, offset, limit), {})
+        return self._cached_listing(
+            registry_name, WORKFLOW_LIST_KEY, self._fetch_workflow_list, page
+        )
+
+    def _deliver_workflow_page(self, callback, offset, limit, registry_name, workflows):
+        end = len(workflows) if limit is None else offset + limit
+        self._exec_callback(
+            callback, registry_name, workflows[offset:end], offset, len(workflows)
+        )
+
+    @io_request(CONTROL_LANE)
+    @eagain_catcher
+    def _fetch_workflow_list(self, registry_name, callback, revalidate=False):
+        workflows = self._list_workflows(registry_name)
+        if self._store_listing(registry_name, WORKFLOW_LIST_KEY, workflows, revalidate):
+            self._exec_callback(callback, registry_name, workflows)
+
+    def _list_workflows(self, registry_name):
+        cm = self._get_cm(registry_name)
+        # Submit names start with the submission time.
+        return sorted(cm.get_workflow_list(), key=lambda wf: wf["name"], reverse=True)
+
+    @io_request(CONTROL_LANE)
     @eagain_catcher
-    def update_workflow_list(self, registry_name, callback=(None, (), {})):
+    def query_workflows(
+        self, registry_name, query, callback=(None, (), {}), offset=0, limit=None
+    ):
+        """
+        Delivers the workflows matching the WorkflowQuery like
+        update_workflow_list, total being the number of matches.
+
+        The query is not evaluated remotely. The statuses are only known to
+        SimStackServer, which lists all workflows at once, so the full list is
+        still transferred, if the cached one is stale. The query is evaluated
+        on it in the request thread and only the matches are handed to the GUI.
+        """
+        cache = self._get_listing_cache(registry_name)
+        workflows, fresh = cache.get(WORKFLOW_LIST_KEY)
+        if workflows is None or not fresh:
+            workflows = self._list_workflows(registry_name)
+            cache.put(WORKFLOW_LIST_KEY, workflows)
+        self._deliver_workflow_page(
+            callback, offset, limit, registry_name, query.filter(workflows)
+        )
+
+    @io_request(CONTROL_LANE)
+    def poll_status(self, registry_name, callback=(None, (), {})):
+        """
+        Fetches the workflow list and the job lists of the listed, unfinished
+        workflows and compares their statuses with the cached listings. The
+        workflow list is only fetched, if the cached one is stale and lists
+        unfinished workflows, or if it was dropped.
+        callback(registry_name, changes) gets [(wfid, job_id, status)], job_id
+        being None for workflows, or None if the poll failed. Errors are not
+        shown, the next poll simply tries again.
+
+        SimStackServer only answers requests, so status updates can't be
+        pushed and are polled instead.
+        """
+        try:
+            changes = self._poll_status(registry_name)
+        except (Again, ZMQError, OSError) as e:
+            print("Polling the status failed: %s" % e)
+            changes = None
+        # Polls run regularly, so they also close connections not used anymore.
+        self._evict_idle_connections(keep=registry_name)
+        self._exec_callback(callback, registry_name, changes)
+
+    def _poll_status(self, registry_name):
         cm = self._get_cm(registry_name)
-        workflows = cm.get_workflow_list()
-        self._exec_callback(callback, registry_name, workflows)
+        cache = self._get_listing_cache(registry_name)
+        changes = []
+
+        cached, fresh = cache.get(WORKFLOW_LIST_KEY)
+        if cached is not None and (
+            fresh or all(wf.get("status") in FINAL_STATUSES for wf in cached)
+        ):
+            # The list was just fetched, or none of the listed workflows can
+            # change anymore. New workflows drop the list, when submitted.
+            workflows = cached
+        else:
+            workflows = self._list_workflows(registry_name)
+            if cached is not None:
+                changes += [
+                    (wfid, None, status)
+                    for wfid, status in status_changes(cached, workflows)
+                ]
+            else:
+                # The listing was dropped, e.g. by a submit. The shown statuses
+                # are unknown, so all are reported and the view skips unchanged
+                # ones.
+                changes += [
+                    (wf["id"], None, wf.get("status")) for wf in workflows if "id" in wf
+                ]
+            cache.put(WORKFLOW_LIST_KEY, workflows)
+
+        running = {
+            wf["id"] for wf in workflows if wf.get("status") not in FINAL_STATUSES
+        }
+        for wfid in cache.paths(WORKFLOW_JOB_LISTING):
+            if wfid not in running:
+                continue
+            key = ListingCache.key(WORKFLOW_JOB_LISTING, wfid)
+            cached, _ = cache.get(key)
+            if cached is None:
+                continue
+            jobs = cm.get_workflow_job_list(wfid)
+            changes += [
+                (wfid, job_id, status)
+                for job_id, status in status_changes(cached, jobs)
+            ]
+            cache.put(key, jobs)
+        return changes
 
     def exit(self):
-        for cm in self._clustermanagers.values():
+        self._executor.cancel()
+        self._executor.wait(5000)
+        with self._pool_lock:
+            clustermanagers = list(self._clustermanagers.values())
+        for cm in clustermanagers:
             cm.disconnect()
 
-    @eagain_catcher
+    def cancel_requests(self, registry_name=None):
+        """Cancels all pending and running requests, optionally per registry."""
+        self._executor.cancel(registry_name)
+
     def update_workflow_job_list(self, registry_name, wfid, callback=(None, (), {})):
+        return self._cached_listing(
+            registry_name,
+            ListingCache.key(WORKFLOW_JOB_LISTING, wfid),
+            self._fetch_workflow_job_list,
+            callback,
+            wfid,
+        )
+
+    @io_request(CONTROL_LANE)
+    @eagain_catcher
+    def _fetch_workflow_job_list(self, registry_name, wfid, callback, revalidate=False):
         cm = self._get_cm(registry_name)
         files = cm.get_workflow_job_list(wfid)
-        self._exec_callback(callback, registry_name, wfid, files)
+        key = ListingCache.key(WORKFLOW_JOB_LISTING, wfid)
+        if self._store_listing(registry_name, key, files, revalidate):
+            self._exec_callback(callback, registry_name, wfid, files)
 
-    @eagain_catcher
     def update_dir_list(self, registry_name, path, callback=(None, (), {})):
+        return self._cached_listing(
+            registry_name,
+            ListingCache.key(DIRECTORY_LISTING, path),
+            self._fetch_dir_list,
+            callback,
+            path,
+        )
+
+    @io_request(CONTROL_LANE)
+    @eagain_catcher
+    def _fetch_dir_list(self, registry_name, path, callback, revalidate=False):
         cm = self._get_cm(registry_name)
         files = cm.list_dir(path)
-        self._exec_callback(callback, registry_name, path, files)
+        key = ListingCache.key(DIRECTORY_LISTING, path)
+        if self._store_listing(registry_name, key, files, revalidate):
+            self._exec_callback(callback, registry_name, path, files)
+
+    def update_dir_lists(self, registry_name, paths, depth=1, callback=(None, (), {})):
+        """
+        Lists several directories and their subdirectories up to depth in a
+        single round trip. callback(registry_name, {path: files}) receives the
+        listings of the paths and their subdirectories.
+
+        Cached listings are delivered at once. Unless all of them are fresh,
+        the paths are fetched again and changed listings are delivered in a
+        second call.
+        """
+        cache = self._get_listing_cache(registry_name)
+        cached = {}
+        fresh = True
+        for path in paths:
+            listing, path_fresh = cache.get(ListingCache.key(DIRECTORY_LISTING, path))
+            if listing is None:
+                fresh = False
+                continue
+            cached[path] = listing
+            fresh = fresh and path_fresh
+        if cached:
+            self._exec_callback(callback, registry_name, cached)
+        if fresh:
+            return None
+        return self._fetch_dir_lists(
+            registry_name, list(paths), depth, callback, delivered=list(cached)
+        )
 
+    @io_request(CONTROL_LANE)
+    @eagain_catcher
+    def _fetch_dir_lists(self, registry_name, paths, depth, callback, delivered=()):
+        cm = self._get_cm(registry_name)
+        listings = list_dirs(cm, paths, depth)
+        cache = self._get_listing_cache(registry_name)
+        changed = {}
+        for path, files in listings.items():
+            key = ListingCache.key(DIRECTORY_LISTING, path)
+            if cache.put(key, files) or path not in delivered:
+                changed[path] = files
+        if changed:
+            self._exec_callback(callback, registry_name, changed)
+
+    @io_request(CONTROL_LANE)
     @eagain_catcher
     def delete_file(self, registry_name, filename, callback=(None, (), {})):
         cm = self._get_cm(registry_name)
-        if cm.is_directory(filename):
-            cm.rmtree(filename)
-        else:
-            cm.delete_file(filename)
+        try:
+            if cm.is_directory(filename):
+                cm.rmtree(filename)
+            else:
+                cm.delete_file(filename)
+        finally:
+            self._get_listing_cache(registry_name).invalidate(filename)
         self._exec_callback(callback, registry_name, filename, ErrorCodes.NO_ERROR)
 
     def delete_job(self, base_uri, job, callback=(None, (), {})):
@@ -418,27 +912,45 @@ class SSHConnector(QObject):
         if worker is not None:
             worker.abort_job(callback, base_uri, job)
 
-    def get_workflow_url(self, registry_name, workflow):
+    def _invalidate_workflow(self, registry_name, workflow_submitname):
+        cache = self._get_listing_cache(registry_name)
+        cache.discard(WORKFLOW_LIST_KEY)
+        cache.invalidate(workflow_submitname)
+
+    @io_request(CONTROL_LANE)
+    @eagain_catcher
+    def get_workflow_url(self, registry_name, workflow, callback=(None, (), {})):
         cm = self._get_cm(registry_name)
-        return cm.get_url_for_workflow(workflow)
+        url = cm.get_url_for_workflow(workflow)
+        self._exec_callback(callback, url)
+        return url
 
+    @io_request(CONTROL_LANE)
     @eagain_catcher
     def delete_workflow(
         self, registry_name, workflow_submitname, callback=(None, (), {})
     ):
         cm = self._get_cm(registry_name)
-        cm.delete_wf(workflow_submitname)
+        try:
+            cm.delete_wf(workflow_submitname)
+        finally:
+            self._invalidate_workflow(registry_name, workflow_submitname)
 
+    @io_request(CONTROL_LANE)
     @eagain_catcher
     def abort_workflow(
         self, registry_name, workflow_submitname, callback=(None, (), {})
     ):
         cm = self._get_cm(registry_name)
-        cm.abort_wf(workflow_submitname)
+        try:
+            cm.abort_wf(workflow_submitname)
+        finally:
+            self._invalidate_workflow(registry_name, workflow_submitname)
         self.logger.debug(
             "Sending Workflow Abort message for workflows %s" % workflow_submitname
         )
 
+    @io_request(TRANSFER_LANE)
     @eagain_catcher
     def download_file(
         self,
@@ -453,15 +965,89 @@ class SSHConnector(QObject):
         if isinstance(download_files, str):
             todl = [download_files]
 
-        for remote_file in todl:
-            cm.get_file(remote_file, local_dest, progress_callback)
+        if len(todl) == 1 and not os.path.isdir(local_dest):
+            pairs = [(todl[0], local_dest)]
+        else:
+            pairs = [
+                (
+                    remote,
+                    os.path.join(local_dest, posixpath.basename(remote.rstrip("/"))),
+                )
+                for remote in todl
+            ]
+
+        def on_done(errors):
+            if errors:
+                from simstack.view.WFViewManager import WFViewManager
+
+                self._exec_callback(
+                    WFViewManager.show_error,
+                    "Failed to download %d file(s). First error was: %s"
+                    % (len(errors), errors[0]),
+                )
+            elif callback is not None and callback[0] is not None:
+                self._exec_callback(callback)
+
+        # A running download of this registry is fed with the new files.
+        with self._downloads_lock:
+            manager = self._downloads.get(registry_name)
+            if manager is not None and manager.cm is cm and manager.add(pairs, on_done):
+                return
+            manager = DownloadManager(cm, max_workers=MAX_DT_WORKERS_PER_REGISTRY)
+            manager.add(pairs, on_done)
+            self._downloads[registry_name] = manager
+
+        request = current_request()
+        if request is not None:
+            request.add_cancel_hook(manager.cancel)
+        try:
+            manager.run(self._progress_to_gui_thread(progress_callback))
+        finally:
+            with self._downloads_lock:
+                if self._downloads.get(registry_name) is manager:
+                    del self._downloads[registry_name]
+
+    @io_request(TRANSFER_LANE)
+    @eagain_catcher
+    def download_directory(
+        self,
+        registry_name,
+        remote_dir,
+        local_dest,
+        pattern=None,
+        progress_callback=None,
+        callback=(None, (), {}),
+    ):
+        """
+        Downloads the subtree of remote_dir to local_dest/<basename> packed
+        into a single compressed stream.
+
+        :param pattern: Optional glob of relative paths to include.
+        """
+        cm = self._get_cm(registry_name)
+        local_dir = os.path.join(local_dest, posixpath.basename(remote_dir.rstrip("/")))
+        manager = DownloadManager(cm, max_workers=MAX_DT_WORKERS_PER_REGISTRY)
+        request = current_request()
+        if request is not None:
+            request.add_cancel_hook(manager.cancel)
+        manager.download_archive(
+            remote_dir,
+            local_dir,
+            pattern=pattern,
+            progress_callback=self._progress_to_gui_thread(progress_callback),
+        )
+        if callback is not None and callback[0] is not None:
+            self._exec_callback(callback)
 
     def _get_cm(self, registry_name) -> ClusterManager:
         name = registry_name
-        if name not in self._clustermanagers:
-            raise ConnectionError("Clustermanager %s was not connected." % name)
-        return self._clustermanagers[name]
+        with self._pool_lock:
+            if name not in self._clustermanagers:
+                raise ConnectionError("Clustermanager %s was not connected." % name)
+            self._last_used[name] = time.monotonic()
+            return self._clustermanagers[name]
 
+    @io_request(TRANSFER_LANE)
     @eagain_catcher
     def upload_files(
         self,
@@ -476,8 +1062,14 @@ class SSHConnector(QObject):
         if isinstance(upload_files, str):
             toupload = [upload_files]
 
-        for local_file in toupload:
-            cm.put_file(local_file, destination)
+        try:
+            with self._executor.lock(registry_name):
+                for local_file in toupload:
+                    if self._is_cancelled():
+                        return
+                    cm.put_file(local_file, destination)
+        finally:
+            self._get_listing_cache(registry_name).invalidate(destination)
 
     def run(self):
         self.exec_()
@@ -491,18 +1083,75 @@ class SSHConnector(QObject):
                 args = callback[1] + args
             else:
                 args = (callback[1],) + args
-            kwargs = callback[2]
-
-        cb_function(*args, **kwargs)
+            kwargs = {**kwargs, **callback[2]}
+
+        if self._in_gui_thread():
+            cb_function(*args, **kwargs)
+        elif not self._is_cancelled():
+            # Results of worker threads are delivered by a queued signal.
+            self._dispatch.emit(lambda: cb_function(*args, **kwargs))
+
+    def _in_gui_thread(self) -> bool:
+        return threading.get_ident() == self._gui_thread_ident
+
+    @staticmethod
+    def _is_cancelled() -> bool:
+        request = current_request()
+        return request is not None and request.cancelled
+
+    def _call_in_gui_thread(self, func, *args, **kwargs):
+        """Calls func in the GUI thread, waits for it and returns the result."""
+        if self._in_gui_thread():
+            return func(*args, **kwargs)
+        result = []
+        self._dispatch_blocking.emit(lambda: result.append(func(*args, **kwargs)))
+        return result[0]
+
+    def _progress_to_gui_thread(self, progress_callback):
+        """Wraps progress_callback(transferred, total) for use in worker threads."""
+        if progress_callback is None or self._in_gui_thread():
+            return progress_callback
+        last_update = [0.0]
+
+        def wrapper(transferred, total):
+            now = time.monotonic()
+            if transferred < total and now - last_update[0] < PROGRESS_INTERVAL:
+                return
+            last_update[0] = now
+            self._exec_callback(progress_callback, transferred, total)
+
+        return wrapper
+
+    @staticmethod
+    def _run_dispatched(func):
+        func()
 
     def quit(self):
         self.exit()
 
-    def __init__(self):
+    def __init__(self, threaded=True):
         super().__init__()
         self.logger = logging.getLogger("SSHConnection")
+        self._threaded = threaded
+        self._gui_thread_ident = threading.get_ident()
+        self._executor = RequestExecutor(
+            max_transfer_workers=MAX_DT_WORKERS_PER_REGISTRY
+        )
+        self._dispatch.connect(self._run_dispatched, Qt.QueuedConnection)
+        self._dispatch_blocking.connect(
+            self._run_dispatched, Qt.BlockingQueuedConnection
+        )
         self._registries = QtClusterSettingsProvider.get_registries()
         self._clustermanagers = {}
+        self._last_used = {}
+        self._kept_open = set()
+        self._pool_lock = threading.Lock()
+        self._blobstores = {}
+        self._listings = {}
+        self._downloads = {}
+        self._downloads_lock = threading.Lock()
+        self.archive_submit_min_files = ARCHIVE_SUBMIT_MIN_FILES
+        self.archive_submit_min_bytes = ARCHIVE_SUBMIT_MIN_BYTES
 
         self.workers = {}
 
@@ -1,3 +1,4 @@
+import itertools
 import logging
 import os
 import webbrowser
@@ -19,11 +20,22 @@ from simstack.SimStackPaths import SimStackPaths
 from SimStackServer.WaNo.WaNoExceptions import WorkflowSubmitError
 
 from SimStackServer.WaNo.MiscWaNoTypes import WaNoListEntry, get_wano_xml_path
+from simstack.lib.AtomicFolder import (
+    recover_folders,
+    remove_snapshots,
+    snapshot_tree,
+)
+from simstack.lib.DownloadManager import TransferRate
 from simstack.lib.QtClusterSettingsProvider import QtClusterSettingsProvider
+from simstack.lib.StatusPoller import StatusPoller
 
 from simstack.view.WFViewManager import WFViewManager
 from simstack.Constants import SETTING_KEYS
-from simstack.SSHConnector import SSHConnector
+from simstack.SSHConnector import (
+    LISTING_PREFETCH_DEPTH,
+    WORKFLOW_PAGE_SIZE,
+    SSHConnector,
+)
 from simstack.SSHConnector import OPERATIONS as uops
 from simstack.SSHConnector import ERROR as uerror
 
@@ -111,6 +123,10 @@ class WFEditorApplication:
             self.__settings.get_path_settings()
         )
 
+    def _on_connect_on_startup_changed(self, enabled):
+        self.__settings.set_value(SETTING_KEYS["connectOnStartup"], enabled)
+        self.__settings.save()
+
     def _on_registry_changed(self, registry_name: str):
         self._reconnect_remote(registry_name)
 
@@ -143,23 +159,53 @@ class WFEditorApplication:
         )
 
     # @QThreadCallback.callback
-    def _on_workflow_list_updated(self, base_uri, workflows):
-        self._view_manager.update_workflow_list(workflows)
+    def _on_workflow_list_updated(self, base_uri, workflows, offset=0, total=None):
+        self._view_manager.update_workflow_list(workflows, offset, total)
 
-    def _on_fs_worflow_list_update_request(self):
+    def _request_workflows(self, offset, limit):
         registry_name = self._get_current_registry_name()
-        self._connector.update_workflow_list(
-            registry_name, (self._on_workflow_list_updated, (), {})
-        )
+        callback = (self._on_workflow_list_updated, (), {})
+        if self._workflow_query is None:
+            self._connector.update_workflow_list(
+                registry_name, callback, offset=offset, limit=limit
+            )
+        else:
+            self._connector.query_workflows(
+                registry_name,
+                self._workflow_query,
+                callback,
+                offset=offset,
+                limit=limit,
+            )
+
+    def _on_fs_worflow_list_update_request(self):
+        # Refreshes all pages loaded so far.
+        self._request_workflows(0, self._workflow_rows)
+
+    def _on_fs_more_workflows_request(self, offset):
+        self._workflow_rows = max(self._workflow_rows, offset + WORKFLOW_PAGE_SIZE)
+        self._request_workflows(offset, WORKFLOW_PAGE_SIZE)
+
+    def _on_fs_workflow_query_changed(self, query):
+        # The view requests the first page of the new results itself.
+        self._workflow_query = query
+        self._workflow_rows = WORKFLOW_PAGE_SIZE
 
     # @QThreadCallback.callback
     def _on_fs_list_updated(self, base_uri, path, files):
         self._view_manager.update_filesystem_model(path, files)
 
+    def _on_fs_lists_updated(self, base_uri, listings):
+        self._view_manager.update_filesystem_models(listings)
+
     def _on_fs_job_update_request(self, path):
         registry_name = self._get_current_registry_name()
-        self._connector.update_dir_list(
-            registry_name, path, (self._on_fs_list_updated, (), {})
+        # The next level is listed in the same round trip.
+        self._connector.update_dir_lists(
+            registry_name,
+            [path],
+            depth=LISTING_PREFETCH_DEPTH,
+            callback=(self._on_fs_lists_updated, (), {}),
         )
 
     def _on_fs_workflow_update_request(self, wfid):
@@ -174,6 +220,21 @@ class WFEditorApplication:
         # TODO
         self._on_fs_job_update_request(path)
 
+    def _on_fs_reload_request(self):
+        registry_name = self._get_current_registry_name()
+        self._connector.expire_listings(registry_name)
+        self._status_poller.reset()
+
+    def _poll_status(self):
+        self._connector.poll_status(
+            self._get_current_registry_name(), (self._on_status_polled, (), {})
+        )
+
+    def _on_status_polled(self, base_uri, changes):
+        if changes:
+            self._view_manager.update_status(changes)
+        self._status_poller.poll_finished(bool(changes))
+
     def _on_saved_workflows_update_request(self, path):
         self._update_workflow_list()
 
@@ -198,6 +259,7 @@ class WFEditorApplication:
             registry_name,
             from_path,
             to_path,
+            progress_callback=self._download_progress(),
             callback=(
                 self._view_manager.on_download_complete,
                 (registry_name, from_path, to_path),
@@ -205,6 +267,50 @@ class WFEditorApplication:
             ),
         )
 
+    def _on_fs_download_many(self, from_paths, to_dir):
+        registry_name = self._get_current_registry_name()
+        self._connector.download_file(
+            registry_name,
+            from_paths,
+            to_dir,
+            progress_callback=self._download_progress(),
+            callback=(
+                self._view_manager.on_download_complete,
+                (registry_name, from_paths, to_dir),
+                {},
+            ),
+        )
+
+    def _on_fs_download_directory(self, from_path, to_dir, pattern):
+        registry_name = self._get_current_registry_name()
+        self._connector.download_directory(
+            registry_name,
+            from_path,
+            to_dir,
+            pattern=pattern or None,
+            progress_callback=self._download_progress(),
+            callback=(
+                self._view_manager.on_download_complete,
+                (registry_name, from_path, to_dir),
+                {},
+            ),
+        )
+
+    def _download_progress(self):
+        """
+        Returns the progress callback of a new download. Concurrent downloads
+        show their own message with their own rate and ETA.
+        """
+        key = "download-%d" % next(self._download_ids)
+        rate = TransferRate()
+
+        def on_progress(transferred, total):
+            self._view_manager.show_progress_message(
+                key, rate.status_message("Downloading", transferred, total)
+            )
+
+        return on_progress
+
     def _on_fs_upload(self, local_files, dest_dir):
         registry_name = self._get_current_registry_name()
 
@@ -302,8 +408,9 @@ class WFEditorApplication:
     def _on_fs_browse_workflow(self, workflow):
         registry_name = self._get_current_registry_name()
         # print("Im workflow",workflow)
-        myurl = self._connector.get_workflow_url(registry_name, workflow)
-        webbrowser.open_new_tab(myurl)
+        self._connector.get_workflow_url(
+            registry_name, workflow, webbrowser.open_new_tab
+        )
 
     def _on_fs_delete_workflow(self, workflow):
         registry_name = self._get_current_registry_name()
@@ -394,6 +501,8 @@ class WFEditorApplication:
             workflow_path = join(SimStackPaths.get_embedded_path(), "workflows")
         workflows = []
         try:
+            # Workflows, whose last save was interrupted, are listed again.
+            recover_folders(workflow_path)
             for directory in os.listdir(workflow_path):
                 fulldir = os.path.join(workflow_path, directory)
                 if not os.path.isdir(fulldir):
@@ -417,6 +526,7 @@ class WFEditorApplication:
         if error == ErrorCodes.NO_ERROR:
             self._logger.info("Connected.")
             self._set_connected()
+            self._status_poller.start()
         else:
             self._logger.error(
                 "Failed to connect to registry: %s, %s" % (str(status), str(error))
@@ -439,7 +549,9 @@ class WFEditorApplication:
             registry_name, (self._cb_disconnect, (), {"registry_name": registry_name})
         )
 
-    def _connect_remote(self, registry_name, no_status_update=False):
+    def _connect_remote(
+        self, registry_name, no_status_update=False, reuse=False, keep_open=False
+    ):
         if registry_name == "":
             message = "No server definition selected. Please define a server in the Configuration -> Servers Dialog."
             WFViewManager.show_error(message)
@@ -453,7 +565,10 @@ class WFEditorApplication:
         self._logger.info("Connecting to registry '%s'." % registry_name)
 
         self._connector.connect_registry(
-            registry_name, (self._cb_connect, (), {"registry_name": registry_name})
+            registry_name,
+            (self._cb_connect, (), {"registry_name": registry_name}),
+            reuse=reuse,
+            keep_open=keep_open,
         )
 
     @trace_to_logger
@@ -505,18 +620,69 @@ class WFEditorApplication:
         nowstr = now.strftime("%Y-%m-%d-%Hh%Mm%Ss")
         submitname = "%s-%s" % (nowstr, name)
         to_upload = os.path.join(directory, "workflow_data")
-        self._connector.run_workflow_job(registry_name, submitname, to_upload, xml)
+        # Saving the workflow moves its folder, the upload runs in another
+        # thread and reads a snapshot instead, which it removes when done.
+        workflow_folder = Path(directory).parents[1]
+        snapshot = snapshot_tree(to_upload, workflow_folder)
+        self._connector.run_workflow_job(
+            registry_name, submitname, str(snapshot), xml, remove_after_upload=True
+        )
+        # New workflows change their status quickly.
+        self._status_poller.reset()
+
+    def _connect_all_remotes(self):
+        # Every registry has its own request thread, so all of them connect
+        # concurrently. The selected one becomes the current registry, the
+        # others only show their status and are taken from the connection pool,
+        # when they are selected. None of them is closed for being idle.
+        registry_names = self._get_registry_names()
+        if not registry_names:
+            return
+        selected = registry_names[self._get_default_registry()]
+        for registry_name in registry_names:
+            if registry_name == selected:
+                self._connect_remote(registry_name, reuse=True, keep_open=True)
+                continue
+            self._view_manager.set_registry_status(
+                registry_name, self._view_manager.REGISTRY_CONNECTION_STATES.connecting
+            )
+            self._connector.connect_registry(
+                registry_name,
+                (self._cb_background_connect, (), {"registry_name": registry_name}),
+                reuse=True,
+                keep_open=True,
+            )
+
+    def _cb_background_connect(self, base_uri, error, status, registry_name=None):
+        states = self._view_manager.REGISTRY_CONNECTION_STATES
+        if error == ErrorCodes.NO_ERROR:
+            self._logger.info("Connected to registry '%s'." % registry_name)
+            state = states.connected
+        else:
+            self._logger.error(
+                "Failed to connect to registry '%s': %s" % (registry_name, status)
+            )
+            state = states.disconnected
+        self._view_manager.set_registry_status(registry_name, state)
+
+    def _on_connection_evicted(self, registry_name):
+        states = self._view_manager.REGISTRY_CONNECTION_STATES
+        self._logger.info("Closed idle connection to registry '%s'." % registry_name)
+        if registry_name == self._get_current_registry_name():
+            self._set_disconnected()
+        else:
+            self._view_manager.set_registry_status(registry_name, states.disconnected)
 
     def _reconnect_remote(self, registry_name):
         self._logger.info("Reconnecting to Registry.")
         self._set_connecting()
-        # quietly disconnect
-        if self._get_current_registry_name():
-            self._disconnect_remote(no_status_update=True)
-
-        self._connect_remote(registry_name)
+        self._status_poller.stop()
+        # The previous registry stays connected in the pool of the connector,
+        # so switching back to it doesn't have to connect again.
+        self._connect_remote(registry_name, reuse=True)
 
     def _set_disconnected(self):
+        self._status_poller.stop()
         self._view_manager.set_registry_connection_status(
             self._view_manager.REGISTRY_CONNECTION_STATES.disconnected
         )
@@ -582,6 +748,16 @@ class WFEditorApplication:
 
         self._view_manager.update_registries(regList, selected=default)
 
+    def _remove_upload_snapshots(self):
+        # Snapshots are removed after their upload, unless the client crashed.
+        workflow_path = self.__settings.get_value(SETTING_KEYS["workflows"])
+        if workflow_path == "<embedded>":
+            workflow_path = join(SimStackPaths.get_embedded_path(), "workflows")
+        try:
+            remove_snapshots(workflow_path)
+        except OSError:
+            pass
+
     def _update_all(self):
         self._update_saved_registries()
         self._update_wanos()
@@ -599,7 +775,12 @@ class WFEditorApplication:
     ############################################################################
     def __start(self):
         self._view_manager.show_mainwindow()
+        self._remove_upload_snapshots()
         self._update_all()
+        connect_on_startup = self.__settings.get_value(SETTING_KEYS["connectOnStartup"])
+        self._view_manager.set_connect_on_startup(connect_on_startup)
+        if connect_on_startup:
+            self._connect_all_remotes()
 
     def _connect_signals(self):
         self._view_manager.save_paths.connect(self._on_save_paths)
@@ -607,6 +788,9 @@ class WFEditorApplication:
             self._on_open_registry_settings
         )
         self._view_manager.open_path_settings.connect(self._on_open_path_settings)
+        self._view_manager.connect_on_startup_changed.connect(
+            self._on_connect_on_startup_changed
+        )
         self._view_manager.registry_changed.connect(self._on_registry_changed)
         self._view_manager.disconnect_registry.connect(self._on_registry_disconnect)
         self._view_manager.connect_registry.connect(self._on_registry_connect)
@@ -618,6 +802,12 @@ class WFEditorApplication:
         self._view_manager.request_worflow_list_update.connect(
             self._on_fs_worflow_list_update_request
         )
+        self._view_manager.request_more_workflows.connect(
+            self._on_fs_more_workflows_request
+        )
+        self._view_manager.workflow_query_changed.connect(
+            self._on_fs_workflow_query_changed
+        )
         self._view_manager.request_job_update.connect(self._on_fs_job_update_request)
         self._view_manager.request_worflow_update.connect(
             self._on_fs_workflow_update_request
@@ -628,7 +818,10 @@ class WFEditorApplication:
         self._view_manager.request_saved_workflows_update.connect(
             self._on_saved_workflows_update_request
         )
+        self._view_manager.request_reload.connect(self._on_fs_reload_request)
         self._view_manager.download_file_to.connect(self._on_fs_download)
+        self._view_manager.download_files_to.connect(self._on_fs_download_many)
+        self._view_manager.download_directory_to.connect(self._on_fs_download_directory)
         self._view_manager.upload_file.connect(self._on_fs_upload)
         self._view_manager.delete_job.connect(self._on_fs_delete_job)
         self._view_manager.abort_job.connect(self._on_fs_abort_job)
@@ -640,6 +833,7 @@ class WFEditorApplication:
         self._view_manager.exit_client.connect(self._client_about_to_exit)
 
         self._connector.error.connect(self._on_error)
+        self._connector.connection_evicted.connect(self._on_connection_evicted)
 
     def _client_about_to_exit(self):
         print("Exiting.")
@@ -665,6 +859,10 @@ class WFEditorApplication:
         self._view_manager = WFViewManager()
 
         self._current_registry_name = None
+        self._download_ids = itertools.count()
+        self._workflow_rows = WORKFLOW_PAGE_SIZE
+        self._workflow_query = None
+        self._status_poller = StatusPoller(self._poll_status)
         self._registries = QtClusterSettingsProvider.get_registries()
         self.wanos = []
 
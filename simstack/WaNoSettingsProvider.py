@@ -54,6 +54,11 @@ class WaNoSettingsProvider(AbstractSettings):
                 os.path.join(pardirpardir, "workflows"),
                 "Working directory for Workflows.",
             ),
+            (
+                SETTING_KEYS["connectOnStartup"],
+                False,
+                "Connect to all registries in the background on startup.",
+            ),
         ]
 
         for valuename, default, explanation in defaults:
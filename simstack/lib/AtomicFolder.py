@@ -0,0 +1,173 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+""" Prefix of the sibling directory a new folder state is built in. """
+STAGING_PREFIX = ".saving-"
+
+""" Suffix of the sibling directory the old folder state is kept in while swapping. """
+BACKUP_SUFFIX = ".previous"
+
+""" Prefix of the sibling directories uploads read a snapshot of a folder from. """
+SNAPSHOT_PREFIX = ".snapshot-"
+
+
+def _staging_prefix(folder: Path):
+    return ".%s%s" % (folder.name, STAGING_PREFIX)
+
+
+def _backup(folder: Path) -> Path:
+    return folder.parent / (".%s%s" % (folder.name, BACKUP_SUFFIX))
+
+
+def link_tree(source, target):
+    """
+    Hard links all files below source to target. Files are copied, if the
+    file system does not support hard links.
+    """
+    source = Path(source)
+    target = Path(target)
+    for dirpath, _, filenames in os.walk(source):
+        target_dir = target / Path(dirpath).relative_to(source)
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            try:
+                os.link(os.path.join(dirpath, filename), target_dir / filename)
+            except OSError:
+                shutil.copy2(os.path.join(dirpath, filename), target_dir / filename)
+
+
+def snapshot_tree(source, folder) -> Path:
+    """
+    Hard links all files below source into a new directory next to folder.
+
+    Replacing folder never moves the snapshot, so it can be read in another
+    thread while folder is saved. The caller removes the snapshot.
+    """
+    folder = Path(folder)
+    snapshot = Path(
+        tempfile.mkdtemp(
+            prefix=".%s%s" % (folder.name, SNAPSHOT_PREFIX), dir=folder.parent
+        )
+    )
+    try:
+        link_tree(source, snapshot)
+    except OSError:
+        shutil.rmtree(snapshot, ignore_errors=True)
+        raise
+    return snapshot
+
+
+def remove_snapshots(parent):
+    """
+    Removes all snapshots below parent. Only call it, while no upload is
+    running, e.g. on startup after a crash.
+    """
+    for entry in Path(parent).iterdir():
+        if entry.name.startswith(".") and SNAPSHOT_PREFIX in entry.name:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def _fsync_path(path, directory=False):
+    flags = os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0)
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        # Directories cannot be opened on all platforms.
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def fsync_tree(folder):
+    """Flushes all files and directories below folder to disk."""
+    for dirpath, _, filenames in os.walk(folder):
+        for filename in filenames:
+            _fsync_path(os.path.join(dirpath, filename))
+        _fsync_path(dirpath, directory=True)
+
+
+def _move_missing_entries(source: Path, target: Path):
+    """Moves all entries of source, which do not exist in target, to target."""
+    for entry in source.iterdir():
+        if not (target / entry.name).exists():
+            os.replace(entry, target / entry.name)
+
+
+def recover_folder(folder):
+    """
+    Completes or reverts a replacement of folder interrupted by a crash and
+    removes leftover staging directories.
+    """
+    folder = Path(folder)
+    backup = _backup(folder)
+    if backup.is_dir():
+        if not folder.exists():
+            # Crashed before the new state was renamed into place.
+            os.replace(backup, folder)
+        else:
+            _move_missing_entries(backup, folder)
+            shutil.rmtree(backup)
+    if folder.parent.is_dir():
+        for entry in folder.parent.iterdir():
+            if entry.name.startswith(_staging_prefix(folder)) and entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+
+
+def recover_folders(parent):
+    """recover_folder for all folders below parent with an interrupted replacement."""
+    parent = Path(parent)
+    prefixes = set()
+    for entry in parent.iterdir():
+        name = entry.name
+        if name.startswith(".") and name.endswith(BACKUP_SUFFIX):
+            prefixes.add(name[1 : -len(BACKUP_SUFFIX)])
+        elif name.startswith(".") and STAGING_PREFIX in name:
+            prefixes.add(name[1 : name.rindex(STAGING_PREFIX)])
+    for name in prefixes:
+        recover_folder(parent / name)
+
+
+def begin_replace(folder) -> Path:
+    """
+    Creates an empty staging directory next to folder, in which the new state
+    of folder is built.
+    """
+    folder = Path(folder)
+    if folder == folder.parent or folder == Path.home():
+        raise ValueError("Cannot replace %s." % folder)
+    recover_folder(folder)
+    os.makedirs(folder.parent, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=_staging_prefix(folder), dir=folder.parent))
+
+
+def commit_replace(staging, folder):
+    """
+    Replaces folder by staging. Entries of folder, which staging does not
+    contain, like previous submissions, are kept.
+
+    The staging directory is flushed to disk first. The old state is renamed
+    aside, before staging is renamed into place, so recover_folder can always
+    restore a complete state.
+    """
+    staging = Path(staging)
+    folder = Path(folder)
+    fsync_tree(staging)
+    backup = _backup(folder)
+    if folder.exists():
+        os.replace(folder, backup)
+    os.replace(staging, folder)
+    _fsync_path(folder.parent, directory=True)
+    if backup.is_dir():
+        _move_missing_entries(backup, folder)
+        shutil.rmtree(backup)
+
+
+def abort_replace(staging):
+    shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shlex
+import threading
+import time
+
+from SimStackServer.ClusterManager import ClusterManager
+
+from simstack.lib.DigestCache import DigestCache
+from simstack.lib.TransferEngine import (
+    exec_remote_command,
+    get_ssh_client,
+    resolve_remote_path,
+)
+
+
+""" Name of the blob store directory below the calculation basepath. """
+BLOB_DIR = ".simstack_blobs"
+
+""" Files smaller than this are always uploaded, deduplication does not pay off. """
+BLOB_MIN_SIZE = 1024 * 1024
+
+""" Seconds after its last submission, a blob is removed from the store. """
+BLOB_MAX_AGE = 30 * 24 * 3600.0
+
+
+class BlobStore:
+    """
+    Content addressed store of uploaded files on a registry.
+
+    Every file uploaded by run_workflow_job above min_size is hard linked to
+    <basepath>/.simstack_blobs/<digest[:2]>/<digest>, so storing it costs
+    neither a copy nor quota. A local index per registry remembers which
+    digests are present together with size and mtime of the blob and the time
+    it was last submitted. When the same content is submitted again, the blob
+    is verified remotely against the index and copied into the new submit
+    directory on the remote instead of being transferred. Blobs not submitted
+    for max_age seconds are removed.
+
+    Jobs may modify their inputs in place. A blob modified this way through
+    its link fails the verification and is uploaded and stored again. Files
+    copied from a blob never share its inode, so jobs cannot modify each
+    others inputs.
+    """
+
+    def __init__(
+        self,
+        cm: ClusterManager,
+        index_file: str,
+        min_size: int = BLOB_MIN_SIZE,
+        max_age: float = BLOB_MAX_AGE,
+        clock=time.time,
+    ):
+        self._cm = cm
+        self._index_file = index_file
+        self._min_size = min_size
+        self._max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        # The digests are stored in the index, so the hash function is fixed.
+        self._digests = DigestCache(new_digest=hashlib.blake2b)
+        self._index = self._load_index()
+
+    @property
+    def cm(self) -> ClusterManager:
+        return self._cm
+
+    @staticmethod
+    def index_file_for_registry(settings_folder, registry_name) -> str:
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", registry_name)
+        return os.path.join(settings_folder, "blob_index", safe_name + ".json")
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_file, "rt") as infile:
+                index = json.load(infile)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        # Entries written before blobs expired count as submitted now.
+        now = self._clock()
+        return {
+            digest: [entry[0], entry[1], entry[2] if len(entry) > 2 else now]
+            for digest, entry in index.items()
+            if isinstance(entry, list) and len(entry) >= 2
+        }
+
+    def _save_index(self):
+        os.makedirs(os.path.dirname(self._index_file), exist_ok=True)
+        tmpfile = self._index_file + ".tmp"
+        with open(tmpfile, "wt") as outfile:
+            json.dump(self._index, outfile)
+        os.replace(tmpfile, self._index_file)
+
+    def _blob_path(self, digest) -> str:
+        return resolve_remote_path(
+            self._cm, posixpath.join(BLOB_DIR, digest[:2], digest)
+        )
+
+    def _digest(self, local_file):
+        """Digest of local_file or None, if the file is too small to be stored."""
+        stat = os.stat(local_file)
+        if stat.st_size < self._min_size:
+            return None
+        return self._digests.file_digest(local_file)
+
+    def copy_known(self, file_pairs):
+        """
+        Copies all files, which are already present in the blob store, to their
+        remote destination. The copies are made on the remote, copy-on-write
+        file systems share the data with the blob.
+
+        :param file_pairs: List of (local_file, remote_file) tuples. Remote
+                           files are relative to the calculation basepath.
+        :return: List of the (local_file, remote_file) tuples, which still have
+                 to be uploaded.
+        """
+        file_pairs = list(file_pairs)
+        if get_ssh_client(self._cm) is None:
+            return file_pairs
+
+        # Large files are hashed, before the index is locked.
+        digests = [self._digest(local_file) for local_file, _ in file_pairs]
+        candidates = []
+        remaining = []
+        with self._lock:
+            for (local_file, remote_file), digest in zip(file_pairs, digests):
+                if digest is not None and digest in self._index:
+                    candidates.append((local_file, remote_file, digest))
+                else:
+                    remaining.append((local_file, remote_file))
+        if not candidates:
+            return remaining
+
+        targets = [resolve_remote_path(self._cm, c[1]) for c in candidates]
+        directories = sorted({posixpath.dirname(t) for t in targets})
+        script = ["mkdir -p -- %s" % " ".join(shlex.quote(d) for d in directories)]
+        for i, ((_, _, digest), target) in enumerate(zip(candidates, targets)):
+            blob = shlex.quote(self._blob_path(digest))
+            target = shlex.quote(target)
+            size, mtime, _ = self._index[digest]
+            script.append(
+                "if [ \"$(stat -c '%%s %%Y' -- %s 2>/dev/null)\" = '%d %d' ] && "
+                "{ cp --reflink=auto -- %s %s 2>/dev/null || cp -- %s %s; } && "
+                "chmod u+w -- %s; then echo %d; fi"
+                % (blob, size, mtime, blob, target, blob, target, target, i)
+            )
+        exit_status, out, err = exec_remote_command(
+            self._cm, "sh -s", stdin_data="\n".join(script) + "\n"
+        )
+        if exit_status != 0:
+            raise OSError(
+                "Could not copy files from blob store: %s"
+                % err.decode(errors="replace")
+            )
+
+        copied = {int(line) for line in out.decode().split()}
+        now = self._clock()
+        with self._lock:
+            for i, (local_file, remote_file, digest) in enumerate(candidates):
+                if i in copied:
+                    if digest in self._index:
+                        self._index[digest][2] = now
+                    continue
+                # Blob is gone or was modified on the remote.
+                self._index.pop(digest, None)
+                remaining.append((local_file, remote_file))
+            self._save_index()
+        return remaining
+
+    def _expire(self, now):
+        """Drops blobs unused for max_age from the index and returns their paths."""
+        expired = [
+            digest
+            for digest, (_, _, last_used) in self._index.items()
+            if now - last_used > self._max_age
+        ]
+        for digest in expired:
+            del self._index[digest]
+        return [self._blob_path(digest) for digest in expired]
+
+    def add(self, file_pairs):
+        """
+        Stores already uploaded files in the blob store and removes expired
+        blobs. Call it before the job is submitted, so the blobs hold the
+        uploaded contents.
+
+        :param file_pairs: List of (local_file, remote_file) tuples, which were
+                           uploaded to the remote.
+        """
+        if get_ssh_client(self._cm) is None:
+            return
+        entries = []
+        for local_file, remote_file in file_pairs:
+            digest = self._digest(local_file)
+            if digest is not None:
+                entries.append((digest, resolve_remote_path(self._cm, remote_file)))
+        with self._lock:
+            now = self._clock()
+            expired = self._expire(now)
+        if not entries and not expired:
+            return
+
+        script = ["rm -f -- %s" % shlex.quote(blob) for blob in expired]
+        for i, (digest, target) in enumerate(entries):
+            blob = self._blob_path(digest)
+            # Linked under a temporary name, so a blob is always complete. Only
+            # file systems without hard links get a copy.
+            partial = shlex.quote(blob + ".part.") + "$$"
+            script.append(
+                "mkdir -p -- %s && { ln -- %s %s 2>/dev/null || cp -p -- %s %s; } && "
+                "mv -f -- %s %s && echo %d $(stat -c '%%s %%Y' -- %s)"
+                % (
+                    shlex.quote(posixpath.dirname(blob)),
+                    shlex.quote(target),
+                    partial,
+                    shlex.quote(target),
+                    partial,
+                    partial,
+                    shlex.quote(blob),
+                    i,
+                    shlex.quote(blob),
+                )
+            )
+        _, out, _ = exec_remote_command(
+            self._cm, "sh -s", stdin_data="\n".join(script) + "\n"
+        )
+
+        with self._lock:
+            for line in out.decode().splitlines():
+                fields = line.split()
+                if len(fields) != 3:
+                    continue
+                i, size, mtime = (int(f) for f in fields)
+                self._index[entries[i][0]] = [size, mtime, now]
+            self._save_index()
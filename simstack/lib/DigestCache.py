@@ -0,0 +1,82 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+""" Number of file digests remembered per process. """
+MAX_DIGEST_CACHE_ENTRIES = 4096
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _new_digest():
+    """xxh3 if the xxhash package is installed, blake2b otherwise."""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+class DigestCache:
+    """
+    Digests of file contents, which are only computed again, when the file,
+    its size or modification time changed.
+
+    Digests are keyed by device and inode, not by path. Hard links of a file,
+    like the linked inputs of each submission, share one entry.
+
+    By default, the digests are only meant for comparisons within this
+    process, because the hash function depends on whether xxhash is installed.
+    Digests, which are stored, need a fixed new_digest like hashlib.blake2b.
+    """
+
+    def __init__(self, max_entries=MAX_DIGEST_CACHE_ENTRIES, new_digest=None):
+        self._max_entries = max_entries
+        self._new_digest = new_digest
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def file_digest(self, filename) -> str:
+        """Returns the hex digest of the contents of filename."""
+        stat = os.stat(filename)
+        key = (stat.st_dev, stat.st_ino)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        digest = _new_digest() if self._new_digest is None else self._new_digest()
+        with open(filename, "rb") as infile:
+            for chunk in iter(lambda: infile.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        hexdigest = digest.hexdigest()
+
+        with self._lock:
+            self._entries[key] = (fingerprint, hexdigest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return hexdigest
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_digest_cache = DigestCache()
+
+
+def file_digest(filename) -> str:
+    """DigestCache.file_digest using the cache shared by the whole process."""
+    return _digest_cache.file_digest(filename)
@@ -0,0 +1,523 @@
+import fnmatch
+import os
+import posixpath
+import queue
+import shlex
+import stat
+import tarfile
+import threading
+import time
+
+import paramiko
+
+from SimStackServer.ClusterManager import ClusterManager
+
+from simstack.lib.TransferEngine import (
+    TransferCancelled,
+    exec_remote_command,
+    get_ssh_client,
+    resolve_remote_path,
+)
+
+
+""" Number of attempts per file before a download is given up. """
+DOWNLOAD_RETRIES = 3
+
+""" Suffix of partially downloaded files, which are resumed by byte offset. """
+PART_SUFFIX = ".part"
+
+""" Suffix of the file, which records size and mtime of the remote file a part file belongs to. """
+PART_VERSION_SUFFIX = ".part.version"
+
+_CHUNK_SIZE = 256 * 1024
+
+
+class _DownloadBatch:
+    """Files added together. on_done(errors) is called, once all are finished."""
+
+    def __init__(self, on_done):
+        self.on_done = on_done
+        self.pending = 0
+        self.errors = []
+
+
+class _SFTPDownloadChannel:
+    """A dedicated SFTP session multiplexed over the transport of cm."""
+
+    def __init__(self, cm: ClusterManager):
+        self._cm = cm
+        transport = get_ssh_client(cm).get_transport()
+        self._sftp = paramiko.SFTPClient.from_transport(transport)
+
+    def stat(self, remote_file):
+        """Returns (is_directory, size, mtime)."""
+        attributes = self._sftp.stat(resolve_remote_path(self._cm, remote_file))
+        return (
+            stat.S_ISDIR(attributes.st_mode),
+            attributes.st_size,
+            int(attributes.st_mtime),
+        )
+
+    def list_tree(self, remote_dir):
+        """Returns [(relpath, size, mtime)] of all regular files below remote_dir."""
+        command = "cd %s && find . -type f -printf '%%s %%T@ %%P\\n'" % shlex.quote(
+            resolve_remote_path(self._cm, remote_dir)
+        )
+        exit_status, out, err = exec_remote_command(self._cm, command)
+        if exit_status != 0:
+            raise OSError(
+                "Could not list %s: %s" % (remote_dir, err.decode(errors="replace"))
+            )
+        files = []
+        for line in out.decode(errors="replace").splitlines():
+            size, mtime, relpath = line.split(" ", 2)
+            if relpath:
+                files.append((relpath, int(size), int(float(mtime))))
+        return files
+
+    def get(self, remote_file, local_file, offset, callback):
+        """Appends the contents of remote_file from offset on to local_file."""
+        with self._sftp.open(resolve_remote_path(self._cm, remote_file), "rb") as rf:
+            rf.seek(offset)
+            rf.prefetch()
+            with open(local_file, "ab" if offset else "wb") as lf:
+                while True:
+                    data = rf.read(_CHUNK_SIZE)
+                    if not data:
+                        break
+                    lf.write(data)
+                    callback(len(data))
+
+    def close(self):
+        self._sftp.close()
+
+
+class _ClusterManagerDownloadChannel:
+    """Fallback channel, which goes through the public ClusterManager API."""
+
+    def __init__(self, cm: ClusterManager):
+        self._cm = cm
+
+    def stat(self, remote_file):
+        return self._cm.is_directory(remote_file), None, None
+
+    def list_tree(self, remote_dir):
+        files = []
+        for entry in self._cm.list_dir(remote_dir):
+            if entry["type"] == "d":
+                files += [
+                    (posixpath.join(entry["name"], relpath), size, mtime)
+                    for relpath, size, mtime in self.list_tree(
+                        posixpath.join(remote_dir, entry["name"])
+                    )
+                ]
+            else:
+                files.append((entry["name"], None, None))
+        return files
+
+    def get(self, remote_file, local_file, offset, callback):
+        # No resume possible here.
+        self._cm.get_file(remote_file, local_file)
+        callback(os.path.getsize(local_file) - offset)
+
+    def close(self):
+        pass
+
+
+class DownloadManager:
+    """
+    Downloads files and directory trees from a ClusterManager.
+
+    Items are put into a queue, which can be fed from other threads while the
+    download is running. run() starts max_workers workers, each with its own
+    SFTP channel. Directories are expanded into their files by the workers.
+    Files are written to <local>.part first and renamed when complete. A failed
+    transfer is retried up to `retries` times and resumed at the byte offset
+    of the partial file, unless size or mtime of the remote file changed since
+    it was started. download_archive() fetches a whole subtree as a single
+    tar stream instead, which saves one round trip per file.
+    """
+
+    def __init__(self, cm: ClusterManager, max_workers=3, retries=DOWNLOAD_RETRIES):
+        self._cm = cm
+        self._max_workers = max(1, max_workers)
+        self._retries = max(1, retries)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._closed = False
+        self._busy = 0
+        self._transferred = 0
+        self._total = 0
+        self._progress_callback = None
+
+    @property
+    def cm(self) -> ClusterManager:
+        return self._cm
+
+    @property
+    def queue(self) -> queue.Queue:
+        return self._queue
+
+    def cancel(self):
+        self._cancel.set()
+
+    def add(self, pairs, on_done=None) -> bool:
+        """
+        Queues (remote_path, local_path) tuples. Remote paths may be files or
+        directories.
+
+        :param on_done: Optional callable(errors), called from a worker thread,
+                        when all pairs are finished.
+        :return: False, if the manager already finished. Use a new one then.
+        """
+        pairs = list(pairs)
+        batch = _DownloadBatch(on_done)
+        with self._lock:
+            if self._closed:
+                return False
+            batch.pending = len(pairs)
+            for remote_path, local_path in pairs:
+                self._queue.put((remote_path, local_path, None, batch))
+        if not pairs and on_done is not None:
+            on_done([])
+        return True
+
+    def _open_channel(self):
+        if get_ssh_client(self._cm) is None:
+            return _ClusterManagerDownloadChannel(self._cm)
+        return _SFTPDownloadChannel(self._cm)
+
+    def _add_progress(self, transferred=0, total=0):
+        with self._lock:
+            self._transferred += transferred
+            self._total += total
+            transferred, total = self._transferred, self._total
+        if self._progress_callback is not None:
+            self._progress_callback(transferred, max(total, transferred))
+
+    def _finish_item(self, batch, error=None):
+        with self._lock:
+            if error is not None:
+                batch.errors.append(error)
+            batch.pending -= 1
+            done = batch.pending == 0
+        if done and batch.on_done is not None:
+            batch.on_done(batch.errors)
+
+    def _expand(self, channel, remote_dir, local_dir, batch):
+        files = channel.list_tree(remote_dir)
+        with self._lock:
+            batch.pending += len(files)
+        for relpath, size, mtime in files:
+            version = None
+            if size is not None:
+                self._add_progress(total=size)
+                version = (size, mtime)
+            local_file = os.path.join(local_dir, *relpath.split("/"))
+            self._queue.put(
+                (posixpath.join(remote_dir, relpath), local_file, version, batch)
+            )
+
+    @staticmethod
+    def _resume_offset(part_file, version_file, version):
+        """
+        Returns the size of part_file, if it was downloaded from the same
+        (size, mtime) version of the remote file, otherwise 0.
+        """
+        if version is None or not os.path.isfile(part_file):
+            return 0
+        try:
+            with open(version_file) as infile:
+                stored = tuple(int(field) for field in infile.read().split())
+        except (OSError, ValueError):
+            return 0
+        offset = os.path.getsize(part_file)
+        return offset if stored == version and offset <= version[0] else 0
+
+    @staticmethod
+    def _write_version(version_file, version):
+        if version is not None:
+            with open(version_file, "w") as outfile:
+                outfile.write("%d %d\n" % version)
+        elif os.path.isfile(version_file):
+            os.remove(version_file)
+
+    def _download(self, channel, remote_file, local_file, version):
+        """
+        Downloads a single file with retry and resume. Returns the channel.
+
+        :param version: (size, mtime) of the remote file or None, if unknown.
+                        Part files are only resumed, if it is known and did
+                        not change.
+        """
+        part_file = local_file + PART_SUFFIX
+        version_file = local_file + PART_VERSION_SUFFIX
+        local_dir = os.path.dirname(local_file)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+
+        def callback(num_bytes):
+            if self._cancel.is_set():
+                raise TransferCancelled("Download was cancelled.")
+            self._add_progress(transferred=num_bytes)
+
+        for attempt in range(self._retries):
+            try:
+                if channel is None:
+                    channel = self._open_channel()
+                offset = self._resume_offset(part_file, version_file, version)
+                if offset:
+                    self._add_progress(transferred=offset)
+                else:
+                    self._write_version(version_file, version)
+                channel.get(remote_file, part_file, offset, callback)
+                os.replace(part_file, local_file)
+                self._write_version(version_file, None)
+                return channel
+            except TransferCancelled:
+                raise
+            except (OSError, EOFError, paramiko.SSHException) as e:
+                if channel is not None:
+                    channel.close()
+                    channel = None
+                if attempt + 1 == self._retries:
+                    raise e
+                # The partially downloaded bytes are counted again on resume.
+                if os.path.isfile(part_file):
+                    self._add_progress(transferred=-os.path.getsize(part_file))
+                if self._cancel.wait(0.5 * 2**attempt):
+                    raise TransferCancelled("Download was cancelled.")
+        return channel
+
+    def _next_item(self):
+        """
+        Returns the next queued item or None, when the queue is empty and no
+        other worker can add items anymore.
+        """
+        while True:
+            with self._lock:
+                try:
+                    item = self._queue.get_nowait()
+                    self._busy += 1
+                    return item
+                except queue.Empty:
+                    if self._busy == 0:
+                        return None
+            # Another worker is still expanding a directory.
+            self._cancel.wait(0.05)
+
+    def _worker(self):
+        channel = None
+        try:
+            while True:
+                item = self._next_item()
+                if item is None:
+                    return
+                remote_path, local_path, version, batch = item
+                try:
+                    if self._cancel.is_set():
+                        raise TransferCancelled("Download was cancelled.")
+                    if channel is None:
+                        channel = self._open_channel()
+                    if version is None:
+                        is_directory, size, mtime = channel.stat(remote_path)
+                        if is_directory:
+                            self._expand(channel, remote_path, local_path, batch)
+                            self._finish_item(batch)
+                            continue
+                        if size is not None:
+                            self._add_progress(total=size)
+                            version = (size, mtime)
+                    channel = self._download(channel, remote_path, local_path, version)
+                    self._finish_item(batch)
+                except Exception as e:
+                    if channel is not None:
+                        channel.close()
+                        channel = None
+                    self._finish_item(batch, e)
+                finally:
+                    with self._lock:
+                        self._busy -= 1
+        finally:
+            if channel is not None:
+                channel.close()
+
+    def run(self, progress_callback=None):
+        """
+        Processes the queue until it is empty and no more items are added.
+
+        :param progress_callback: Optional callable(transferred, total), called
+                                  from the worker threads.
+        """
+        self._progress_callback = progress_callback
+        while True:
+            threads = [
+                threading.Thread(
+                    target=self._worker, name="DownloadWorker", daemon=True
+                )
+                for _ in range(self._max_workers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with self._lock:
+                if self._queue.empty():
+                    self._closed = True
+                    return
+
+    def _find_command(self, remote_dir, pattern, action):
+        command = "cd %s && find . -type f" % shlex.quote(
+            resolve_remote_path(self._cm, remote_dir)
+        )
+        if pattern:
+            command += " -path %s" % shlex.quote("./" + pattern.lstrip("/"))
+        return "%s %s" % (command, action)
+
+    def download_archive(
+        self, remote_dir, local_dir, pattern=None, progress_callback=None
+    ):
+        """
+        Downloads the subtree of remote_dir into local_dir as a single gzipped
+        tar stream, which is unpacked while it arrives.
+
+        :param pattern: Optional glob matched against the paths relative to
+                        remote_dir, e.g. "ForEach/*/outputs/*".
+        :param progress_callback: Optional callable(transferred, total) in
+                                  uncompressed bytes.
+        :return: Number of files written.
+        """
+        client = get_ssh_client(self._cm)
+        if client is None:
+            return self._download_tree_per_file(
+                remote_dir, local_dir, pattern, progress_callback
+            )
+
+        exit_status, out, err = exec_remote_command(
+            self._cm,
+            self._find_command(
+                remote_dir, pattern, "-printf '%s\\n' | awk '{s+=$1} END {print s+0}'"
+            ),
+        )
+        if exit_status != 0:
+            raise OSError(
+                "Could not list %s: %s" % (remote_dir, err.decode(errors="replace"))
+            )
+        total = int(out.strip() or 0)
+        transferred = 0
+        num_files = 0
+
+        stdin, stdout, stderr = client.exec_command(
+            self._find_command(
+                remote_dir, pattern, "-print0 | tar --null --no-recursion -czf - -T -"
+            )
+        )
+        stdin.channel.shutdown_write()
+        try:
+            with tarfile.open(fileobj=stdout, mode="r|gz") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    relpath = posixpath.normpath(member.name)
+                    if posixpath.isabs(relpath) or relpath.split("/")[0] == "..":
+                        raise OSError(
+                            "Refusing to extract %s outside of %s."
+                            % (member.name, local_dir)
+                        )
+                    local_file = os.path.join(local_dir, *relpath.split("/"))
+                    os.makedirs(os.path.dirname(local_file), exist_ok=True)
+                    source = tar.extractfile(member)
+                    with open(local_file, "wb") as outfile:
+                        while True:
+                            if self._cancel.is_set():
+                                raise TransferCancelled("Download was cancelled.")
+                            data = source.read(_CHUNK_SIZE)
+                            if not data:
+                                break
+                            outfile.write(data)
+                            transferred += len(data)
+                            if progress_callback is not None:
+                                progress_callback(transferred, max(total, transferred))
+                    num_files += 1
+        except Exception:
+            # Stops the remote tar instead of draining the rest of the stream.
+            stdout.channel.close()
+            raise
+        err = stderr.read()
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status != 0:
+            raise OSError(
+                "Could not pack %s: %s" % (remote_dir, err.decode(errors="replace"))
+            )
+        return num_files
+
+    def _download_tree_per_file(
+        self, remote_dir, local_dir, pattern, progress_callback
+    ):
+        """Fallback of download_archive without SSH connection."""
+        channel = _ClusterManagerDownloadChannel(self._cm)
+        files = [
+            relpath
+            for relpath, _, _ in channel.list_tree(remote_dir)
+            if not pattern or fnmatch.fnmatch(relpath, pattern.lstrip("/"))
+        ]
+        errors = []
+        self.add(
+            [
+                (
+                    posixpath.join(remote_dir, relpath),
+                    os.path.join(local_dir, *relpath.split("/")),
+                )
+                for relpath in files
+            ],
+            errors.extend,
+        )
+        self.run(progress_callback)
+        if errors:
+            raise errors[0]
+        return len(files)
+
+
+class TransferRate:
+    """Smoothed throughput and ETA of a running transfer."""
+
+    def __init__(self, smoothing=0.3, clock=time.monotonic):
+        self._smoothing = smoothing
+        self._clock = clock
+        self._last_time = None
+        self._last_transferred = 0
+        self._rate = None
+
+    def update(self, transferred, total):
+        """Returns (bytes per second, seconds remaining or None)."""
+        now = self._clock()
+        if self._last_time is None or transferred < self._last_transferred:
+            self._last_time = now
+            self._last_transferred = transferred
+            return 0.0, None
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            current = (transferred - self._last_transferred) / elapsed
+            if self._rate is None:
+                self._rate = current
+            else:
+                self._rate += self._smoothing * (current - self._rate)
+            self._last_time = now
+            self._last_transferred = transferred
+        if not self._rate:
+            return 0.0, None
+        return self._rate, (total - transferred) / self._rate
+
+    def status_message(self, action, transferred, total):
+        rate, eta = self.update(transferred, total)
+        message = "%s %.1f / %.1f MB at %.1f MB/s" % (
+            action,
+            transferred / 1e6,
+            total / 1e6,
+            rate / 1e6,
+        )
+        if eta is not None:
+            minutes, seconds = divmod(int(eta), 60)
+            message += ", %d:%02d remaining" % (minutes, seconds)
+        return message
@@ -0,0 +1,56 @@
+import logging
+
+from PySide6.QtCore import QObject, QTimer
+
+
+""" Milliseconds after start, before prefetching begins. """
+PREFETCH_DELAY = 500
+
+""" Milliseconds between two prefetch steps. """
+PREFETCH_INTERVAL = 20
+
+
+class IdlePrefetcher(QObject):
+    """
+    Calls prefetch_next repeatedly, while the event loop is idle, until it
+    returns False.
+
+    The steps run on a timer in the GUI thread, because prefetching may create
+    Qt objects. Each step should do a single unit of work, so user input in
+    between is never delayed for long. Prefetching stops at the first error,
+    the remaining work is done on first use instead.
+    """
+
+    def __init__(
+        self,
+        prefetch_next,
+        delay=PREFETCH_DELAY,
+        interval=PREFETCH_INTERVAL,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._logger = logging.getLogger("IdlePrefetcher")
+        self._prefetch_next = prefetch_next
+        self._delay = delay
+        self._interval = interval
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.__timeout)
+
+    def is_active(self) -> bool:
+        return self._timer.isActive()
+
+    def start(self):
+        self._timer.start(self._delay)
+
+    def stop(self):
+        self._timer.stop()
+
+    def __timeout(self):
+        try:
+            more = self._prefetch_next()
+        except Exception as e:
+            self._logger.warning("Prefetching stopped: %s" % e)
+            return
+        if more:
+            self._timer.start(self._interval)
@@ -0,0 +1,103 @@
+import posixpath
+import threading
+import time
+
+
+""" Seconds a cached listing is served without asking the remote again. """
+LISTING_TTL = 10.0
+
+""" Seconds a stale listing is still shown, while it is refreshed. """
+LISTING_MAX_AGE = 300.0
+
+""" Key kind of ClusterManager.list_dir results. """
+DIRECTORY_LISTING = "directory"
+
+""" Key kind of ClusterManager.get_workflow_job_list results. """
+WORKFLOW_JOB_LISTING = "workflow_jobs"
+
+""" Key of ClusterManager.get_workflow_list results. """
+WORKFLOW_LIST_KEY = ("workflow_list", "")
+
+
+def _normalize(path):
+    path = path.replace("\\", "/")
+    return path.rstrip("/") if path.rstrip("/") else path
+
+
+class ListingCache:
+    """
+    Remote listings of a single registry keyed by (kind, absolute path).
+
+    Entries younger than ttl are fresh. Older entries up to max_age are stale:
+    They may be shown immediately, but have to be revalidated. The cache is
+    shared between the GUI thread and the request threads.
+    """
+
+    def __init__(self, ttl=LISTING_TTL, max_age=LISTING_MAX_AGE, clock=time.monotonic):
+        self._ttl = ttl
+        self._max_age = max(ttl, max_age)
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind, path):
+        return kind, _normalize(path)
+
+    def get(self, key):
+        """
+        :return: Tuple of (listing or None, fresh). Returned listings are
+                 copies and may be reordered by the caller.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            stored, listing = entry
+            age = self._clock() - stored
+            if age > self._max_age:
+                del self._entries[key]
+                return None, False
+        return list(listing), age <= self._ttl
+
+    def put(self, key, listing) -> bool:
+        """Stores listing. Returns True, if it differs from the cached one."""
+        listing = list(listing)
+        with self._lock:
+            entry = self._entries.get(key)
+            self._entries[key] = (self._clock(), listing)
+        return entry is None or entry[1] != listing
+
+    def paths(self, kind):
+        """Paths of the cached listings of kind."""
+        with self._lock:
+            return [path for other, path in self._entries if other == kind]
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, path):
+        """
+        Drops all listings affected by a modification of path: The listing of
+        path itself, all listings below it and the listing of its parent.
+        """
+        path = _normalize(path)
+        parent = posixpath.dirname(path)
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            for key in list(self._entries):
+                other = key[1]
+                if other == path or other == parent or other.startswith(prefix):
+                    del self._entries[key]
+
+    def expire(self):
+        """Marks all listings stale, so they are revalidated on the next request."""
+        with self._lock:
+            expired = self._clock() - self._ttl - 1.0
+            for key, (stored, listing) in self._entries.items():
+                self._entries[key] = (min(stored, expired), listing)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
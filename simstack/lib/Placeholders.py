@@ -0,0 +1,46 @@
+# Bytes substituted and written at once by PlaceholderSubstitution.write.
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+_SEPARATOR = b"<"
+
+
+class PlaceholderSubstitution:
+    """
+    Replaces placeholders in utf-8 encoded XML in the given order, like chained
+    str.replace calls on the decoded text.
+
+    write() works on chunks of the XML, which end before the start of a tag.
+    Placeholders never contain "<", so they are never split between two
+    chunks and only a chunk is copied at a time.
+    """
+
+    def __init__(self, replacements):
+        self._replacements = [
+            (placeholder.encode(), str(replacement).encode())
+            for placeholder, replacement in replacements.items()
+        ]
+        for placeholder, _ in self._replacements:
+            if _SEPARATOR in placeholder:
+                raise ValueError("Placeholder %r must not contain '<'." % placeholder)
+
+    def substitute(self, data: bytes) -> bytes:
+        for placeholder, replacement in self._replacements:
+            data = data.replace(placeholder, replacement)
+        return data
+
+    def _chunk_end(self, data, start, chunk_size):
+        end = start + chunk_size
+        if end >= len(data):
+            return len(data)
+        cut = data.rfind(_SEPARATOR, start + 1, end + 1)
+        if cut == -1:
+            cut = data.find(_SEPARATOR, end + 1)
+        return len(data) if cut == -1 else cut
+
+    def write(self, outfile, data: bytes, chunk_size=WRITE_CHUNK_SIZE):
+        """Writes data with all placeholders substituted to the text file outfile."""
+        start = 0
+        while start < len(data):
+            end = self._chunk_end(data, start, chunk_size)
+            outfile.write(self.substitute(data[start:end]).decode())
+            start = end
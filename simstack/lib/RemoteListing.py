@@ -0,0 +1,95 @@
+import shlex
+
+from SimStackServer.ClusterManager import ClusterManager
+
+from simstack.lib.TransferEngine import (
+    exec_remote_command,
+    get_ssh_client,
+    resolve_remote_path,
+)
+
+
+def _child_path(path, name):
+    # Mirrors the absolute paths of the nodes in the remote file tree.
+    return "%s/%s" % (path, name)
+
+
+def _list_dirs_per_path(cm: ClusterManager, paths, depth):
+    listings = {}
+    pending = [(path, 1) for path in paths]
+    while pending:
+        path, level = pending.pop()
+        files = cm.list_dir(path)
+        listings[path] = files
+        if level < depth:
+            pending += [
+                (_child_path(path, entry["name"]), level + 1)
+                for entry in files
+                if entry["type"] == "d"
+            ]
+    return listings
+
+
+def list_dirs(cm: ClusterManager, paths, depth=1):
+    """
+    Lists several remote directories and their subdirectories up to depth with
+    a single remote find.
+
+    :param paths: Directories as used for ClusterManager.list_dir.
+    :param depth: 1 lists only the paths themselves, 2 also their
+                  subdirectories and so on.
+    :return: Dict of {directory: [{"name", "path", "type"}]} in the format of
+             ClusterManager.list_dir. It contains all requested paths and all
+             subdirectories above depth. Subdirectories are keyed as
+             "<parent>/<name>".
+    """
+    paths = list(dict.fromkeys(paths))
+    depth = max(1, depth)
+    if not paths:
+        return {}
+    if get_ssh_client(cm) is None:
+        return _list_dirs_per_path(cm, paths, depth)
+
+    resolved = [resolve_remote_path(cm, path) for path in paths]
+    # %y is the type of the entry itself, %Y the type of a symlink target.
+    # Starting points are printed with %H, so the output can be mapped back to
+    # the requested paths. NUL separated, because file names may contain
+    # anything else.
+    command = "find %s -mindepth 1 -maxdepth %d -printf '%%y\\0%%Y\\0%%H\\0%%P\\0'" % (
+        " ".join(shlex.quote(path) for path in resolved),
+        depth,
+    )
+    exit_status, out, err = exec_remote_command(cm, command)
+    if exit_status != 0 and not out:
+        raise OSError(
+            "Could not list %s: %s" % (", ".join(paths), err.decode(errors="replace"))
+        )
+
+    requested = dict(zip(resolved, paths))
+    listings = {path: [] for path in paths}
+    fields = out.decode(errors="replace").split("\0")
+    for start in range(0, len(fields) - 3, 4):
+        own_type, target_type, root, relpath = fields[start : start + 4]
+        path = requested.get(root)
+        if path is None or not relpath:
+            continue
+        parent, _, name = relpath.rpartition("/")
+        if parent:
+            for part in parent.split("/"):
+                path = _child_path(path, part)
+        listings.setdefault(path, []).append(
+            {
+                "name": name,
+                "path": root if not parent else "%s/%s" % (root, parent),
+                "type": "d" if target_type == "d" else "f",
+            }
+        )
+        # find does not follow symlinks, so only real directories are complete.
+        if own_type == "d" and relpath.count("/") + 1 < depth:
+            listings.setdefault(_child_path(path, name), [])
+    if exit_status != 0:
+        # Missing or unreadable paths can't be told apart from empty ones.
+        for path in paths:
+            if not listings[path]:
+                del listings[path]
+    return listings
@@ -0,0 +1,154 @@
+import copy
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+
+""" Number of rendered WaNos remembered per workflow. """
+MAX_RENDER_CACHE_ENTRIES = 256
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _files(folder):
+    """Sorted relative paths of all files below folder."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames.sort()
+        for filename in filenames:
+            found.append(os.path.relpath(os.path.join(dirpath, filename), folder))
+    return sorted(found)
+
+
+def update_digest_with_tree(digest, folder, contents=True):
+    """
+    Adds all files below folder to digest. With contents, the file contents are
+    hashed, otherwise only their size and modification time.
+    """
+    folder = str(folder)
+    for relpath in _files(folder):
+        filename = os.path.join(folder, relpath)
+        digest.update(relpath.encode() + b"\0")
+        if contents:
+            with open(filename, "rb") as infile:
+                for chunk in iter(lambda: infile.read(_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        else:
+            stat = os.stat(filename)
+            digest.update(b"%d %d" % (stat.st_size, stat.st_mtime_ns))
+        digest.update(b"\0")
+
+
+def copy_exec_module(wem):
+    """
+    Copy of a WorkflowExecModule for a single submission.
+
+    Only the containers of the field values and the resources are copied. All
+    other values are shared with wem: Rendering replaces fields, but only
+    modifies the resources in place, when unset fields are filled from the
+    default resources.
+    """
+    resources = wem.resources
+    my_resources = copy.deepcopy(resources)
+    mywem = copy.copy(wem)
+    for name, value in vars(wem).items():
+        if isinstance(value, dict):
+            value = {
+                key: my_resources if val is resources else val
+                for key, val in value.items()
+            }
+        elif isinstance(value, list):
+            value = [my_resources if val is resources else val for val in value]
+        elif value is resources:
+            value = my_resources
+        else:
+            continue
+        vars(mywem)[name] = value
+    return mywem
+
+
+def file_manifest(folder):
+    """Sorted (relative path, size, mtime) of all files below folder."""
+    manifest = []
+    for relpath in _files(folder):
+        stat = os.stat(os.path.join(folder, relpath))
+        manifest.append((relpath, stat.st_size, stat.st_mtime_ns))
+    return manifest
+
+
+class RenderCache:
+    """
+    Rendered WaNos of previous submissions keyed by a digest of everything the
+    rendering depends on (see WFWaNoWidget.render).
+
+    For every key the directory the input files were written to is remembered
+    together with the returned WorkflowExecModule. A hit hard links the input
+    files into the new job directory and hands out a copy of the module.
+    Entries, whose files were modified or deleted since, are dropped.
+    """
+
+    def __init__(self, max_entries=MAX_RENDER_CACHE_ENTRIES):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, target_dir):
+        """
+        Links the cached input files of key into target_dir.
+
+        :return: Tuple of (jsdl, wem) or None, if key is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        source_dir, manifest, jsdl, wem = entry
+
+        if file_manifest(source_dir) != manifest:
+            self.discard(key)
+            return None
+        linked = []
+        try:
+            for relpath, _, _ in manifest:
+                target = os.path.join(target_dir, relpath)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                source = os.path.join(source_dir, relpath)
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copy2(source, target)
+                linked.append(target)
+        except OSError:
+            for target in linked:
+                os.remove(target)
+            self.discard(key)
+            return None
+        return jsdl, copy_exec_module(wem)
+
+    def put(self, key, source_dir, jsdl, wem):
+        """Remembers the input files rendered to source_dir for key."""
+        entry = (
+            str(source_dir),
+            file_manifest(source_dir),
+            jsdl,
+            copy_exec_module(wem),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,171 @@
+import threading
+import traceback
+
+from PySide6.QtCore import QRunnable, QThreadPool
+
+
+""" Lane for short requests, which talk to the server or list directories. """
+CONTROL_LANE = "control"
+
+""" Lane for long running uploads, downloads and submissions. """
+TRANSFER_LANE = "transfer"
+
+_current = threading.local()
+
+
+def current_request():
+    """Returns the Request executed by the calling thread or None."""
+    return getattr(_current, "request", None)
+
+
+class Request(QRunnable):
+    """
+    A single call executed on one of the registry thread pools.
+
+    Requests can be cancelled. Pending requests are not started anymore,
+    running requests are flagged and notify their cancel hooks, e.g. to stop
+    a running TransferEngine.
+    """
+
+    def __init__(self, executor, registry_name, lane, func, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.registry_name = registry_name
+        self.lane = lane
+        self._executor = executor
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._cancel_hooks = []
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    def add_cancel_hook(self, hook):
+        """hook is called once, when the request is cancelled while running."""
+        with self._lock:
+            if not self._cancelled:
+                self._cancel_hooks.append(hook)
+                return
+        hook()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            hooks = self._cancel_hooks
+            self._cancel_hooks = []
+        self._executor._try_take(self)
+        for hook in hooks:
+            hook()
+
+    def run(self):
+        _current.request = self
+        try:
+            if not self._cancelled:
+                lock = self._executor.lock(self.registry_name)
+                if self.lane == CONTROL_LANE:
+                    with lock:
+                        self._func(*self._args, **self._kwargs)
+                else:
+                    self._func(*self._args, **self._kwargs)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            _current.request = None
+            self._finish()
+
+    def _finish(self):
+        self._done.set()
+        self._executor._forget(self)
+
+
+class RequestExecutor:
+    """
+    Runs ClusterManager I/O off the GUI thread.
+
+    Every registry has a control lane with a single thread, so server and
+    listing requests keep their order, and a transfer lane with up to
+    max_transfer_workers threads. Control requests hold the registry lock while
+    they run. Transfer requests have to take it themselves around calls, which
+    use the shared connection of the ClusterManager.
+    """
+
+    def __init__(self, max_transfer_workers=3):
+        self._max_transfer_workers = max(1, max_transfer_workers)
+        self._pools = {}
+        self._locks = {}
+        self._requests = set()
+        self._lock = threading.Lock()
+
+    def lock(self, registry_name):
+        with self._lock:
+            lock = self._locks.get(registry_name)
+            if lock is None:
+                lock = threading.RLock()
+                self._locks[registry_name] = lock
+            return lock
+
+    def _pool(self, registry_name, lane) -> QThreadPool:
+        key = (registry_name, lane)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = QThreadPool()
+            if lane == CONTROL_LANE:
+                pool.setMaxThreadCount(1)
+            else:
+                pool.setMaxThreadCount(self._max_transfer_workers)
+            self._pools[key] = pool
+        return pool
+
+    def submit(self, registry_name, lane, func, *args, **kwargs) -> Request:
+        request = Request(self, registry_name, lane, func, args, kwargs)
+        with self._lock:
+            self._requests.add(request)
+            pool = self._pool(registry_name, lane)
+        pool.start(request)
+        return request
+
+    def cancel(self, registry_name=None, lane=None):
+        """Cancels all pending and running requests matching the arguments."""
+        with self._lock:
+            requests = [
+                r
+                for r in self._requests
+                if (registry_name is None or r.registry_name == registry_name)
+                and (lane is None or r.lane == lane)
+            ]
+        for request in requests:
+            request.cancel()
+
+    def is_busy(self, registry_name) -> bool:
+        """True, if requests of the registry are pending or running."""
+        with self._lock:
+            return any(r.registry_name == registry_name for r in self._requests)
+
+    def wait(self, msecs=-1) -> bool:
+        """Waits for all pools to finish. Returns False on timeout."""
+        with self._lock:
+            pools = list(self._pools.values())
+        return all(pool.waitForDone(msecs) for pool in pools)
+
+    def _try_take(self, request):
+        with self._lock:
+            pool = self._pools.get((request.registry_name, request.lane))
+        if pool is not None and pool.tryTake(request):
+            request._finish()
+
+    def _forget(self, request):
+        with self._lock:
+            self._requests.discard(request)
@@ -0,0 +1,100 @@
+from PySide6.QtCore import QObject, QTimer
+
+from SimStackServer.MessageTypes import JobStatus
+
+
+""" Seconds between two status polls, while workflows are changing. """
+MIN_POLL_INTERVAL = 5
+
+""" Seconds between two status polls after a long time without changes. """
+MAX_POLL_INTERVAL = 120
+
+""" Statuses, which don't change anymore. """
+FINAL_STATUSES = frozenset(
+    (
+        JobStatus.SUCCESSFUL,
+        JobStatus.FAILED,
+        JobStatus.ABORTED,
+        JobStatus.MARKED_FOR_DELETION,
+    )
+)
+
+
+def status_changes(old, new):
+    """
+    Compares two listings of workflows or jobs.
+
+    :return: [(id, status)] of the entries in both listings, whose status
+             differs. Entries added or removed in between are left out.
+    """
+    old_status = {entry["id"]: entry.get("status") for entry in old if "id" in entry}
+    return [
+        (entry["id"], entry.get("status"))
+        for entry in new
+        if entry.get("id") in old_status
+        and old_status[entry["id"]] != entry.get("status")
+    ]
+
+
+class StatusPoller(QObject):
+    """
+    Calls poll repeatedly with adaptive backoff. The interval starts at
+    min_interval and doubles after every poll without changes up to
+    max_interval. Polls with changes and reset() start over at min_interval.
+
+    Only one poll is outstanding at a time: poll starts a request and its
+    result is reported with poll_finished, which schedules the next one.
+    """
+
+    def __init__(
+        self,
+        poll,
+        min_interval=MIN_POLL_INTERVAL,
+        max_interval=MAX_POLL_INTERVAL,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._poll = poll
+        self._min_interval = min_interval
+        self._max_interval = max(min_interval, max_interval)
+        self._interval = min_interval
+        self._polling = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.__timeout)
+
+    def interval(self):
+        return self._interval
+
+    def is_active(self) -> bool:
+        return self._timer.isActive() or self._polling
+
+    def start(self):
+        self._interval = self._min_interval
+        self._polling = False
+        self._timer.start(self._interval * 1000)
+
+    def stop(self):
+        self._timer.stop()
+        self._polling = False
+
+    def reset(self):
+        """Polls soon again, e.g. after the user submitted or reloaded."""
+        self._interval = self._min_interval
+        if self._timer.isActive():
+            self._timer.start(self._interval * 1000)
+
+    def poll_finished(self, changed):
+        if not self._polling:
+            # Stopped while the poll was running.
+            return
+        self._polling = False
+        if changed:
+            self._interval = self._min_interval
+        else:
+            self._interval = min(self._interval * 2, self._max_interval)
+        self._timer.start(self._interval * 1000)
+
+    def __timeout(self):
+        self._polling = True
+        self._poll()
@@ -0,0 +1,333 @@
+import os
+import queue
+import shlex
+import tarfile
+import threading
+import posixpath
+
+import paramiko
+
+from SimStackServer.ClusterManager import ClusterManager
+from SimStackServer.LocalClusterManager import LocalClusterManager
+
+
+""" Maximum number of directories created by a single remote mkdir call. """
+MKDIR_BATCH_SIZE = 256
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+def get_ssh_client(cm: ClusterManager):
+    """
+    Returns the paramiko SSHClient of a connected ClusterManager or None.
+
+    ClusterManager does not expose its client publicly, but we need the
+    transport to open additional SFTP and exec channels on the same connection.
+    LocalClusterManagers never return a client.
+    """
+    if isinstance(cm, LocalClusterManager):
+        return None
+    return getattr(cm, "_ssh_client", None)
+
+
+def resolve_remote_path(cm: ClusterManager, path: str) -> str:
+    """Resolves a path relative to the calculation basepath, like put_file does."""
+    path = path.replace("\\", "/")
+    if path.startswith("/"):
+        return path
+    return posixpath.join(cm.get_calculation_basepath(), path)
+
+
+def exec_remote_command(cm: ClusterManager, command: str, stdin_data=None):
+    """
+    Executes command on the remote and waits for it to finish.
+
+    :return: Tuple of (exit_status, stdout bytes, stderr bytes)
+    """
+    client = get_ssh_client(cm)
+    if client is None:
+        raise ConnectionError("Clustermanager does not provide a SSH connection.")
+    stdin, stdout, stderr = client.exec_command(command)
+    if stdin_data is not None:
+        stdin.write(stdin_data)
+    stdin.channel.shutdown_write()
+    out = stdout.read()
+    err = stderr.read()
+    exit_status = stdout.channel.recv_exit_status()
+    return exit_status, out, err
+
+
+class _ProgressReader:
+    """File wrapper, which reports the number of bytes read to callback."""
+
+    def __init__(self, fileobj, callback):
+        self._fileobj = fileobj
+        self._callback = callback
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        if data:
+            self._callback(len(data))
+        return data
+
+
+class _SFTPChannel:
+    """A dedicated SFTP session multiplexed over the transport of cm."""
+
+    def __init__(self, cm: ClusterManager):
+        self._cm = cm
+        transport = get_ssh_client(cm).get_transport()
+        self._sftp = paramiko.SFTPClient.from_transport(transport)
+
+    def put(self, local_file, remote_file, callback):
+        self._sftp.put(
+            local_file, resolve_remote_path(self._cm, remote_file), callback=callback
+        )
+
+    def close(self):
+        self._sftp.close()
+
+
+class _ClusterManagerChannel:
+    """Fallback channel, which goes through the public ClusterManager API."""
+
+    def __init__(self, cm: ClusterManager):
+        self._cm = cm
+
+    def put(self, local_file, remote_file, callback):
+        self._cm.put_file(local_file, remote_file)
+        size = os.path.getsize(local_file)
+        callback(size, size)
+
+    def close(self):
+        pass
+
+
+class TransferEngine:
+    """
+    Uploads many files to a ClusterManager.
+
+    The remote directory tree is created in one batch first. Afterwards the
+    files are fed through a bounded queue to a pool of workers, each of which
+    owns its own SFTP channel. Progress is reported in aggregate as
+    progress_callback(transferred_bytes, total_bytes) from the calling thread.
+    """
+
+    def __init__(self, cm: ClusterManager, max_workers=3, queue_size=None):
+        self._cm = cm
+        self._max_workers = max(1, max_workers)
+        self._queue_size = queue_size if queue_size else 4 * self._max_workers
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _open_channel(self):
+        if get_ssh_client(self._cm) is None:
+            return _ClusterManagerChannel(self._cm)
+        return _SFTPChannel(self._cm)
+
+    def make_dirs(self, directories):
+        directories = sorted(
+            {d.replace("\\", "/") for d in directories if d not in ("", ".")}
+        )
+        if not directories:
+            return
+        if get_ssh_client(self._cm) is None:
+            for directory in directories:
+                self._cm.mkdir_p(directory)
+            return
+
+        resolved = [resolve_remote_path(self._cm, d) for d in directories]
+        for start in range(0, len(resolved), MKDIR_BATCH_SIZE):
+            chunk = resolved[start : start + MKDIR_BATCH_SIZE]
+            command = "mkdir -p -- %s" % " ".join(shlex.quote(d) for d in chunk)
+            exit_status, _, err = exec_remote_command(self._cm, command)
+            if exit_status != 0:
+                raise OSError(
+                    "Could not create remote directories: %s"
+                    % err.decode(errors="replace")
+                )
+
+    def upload(self, file_pairs, progress_callback=None):
+        """
+        :param file_pairs: List of (local_file, remote_file) tuples. Remote
+                           files are relative to the calculation basepath.
+        :param progress_callback: Optional callable(transferred, total).
+        """
+        file_pairs = list(file_pairs)
+        if not file_pairs:
+            return
+        self.make_dirs(
+            posixpath.dirname(remote.replace("\\", "/")) for _, remote in file_pairs
+        )
+
+        total = sum(os.path.getsize(local) for local, _ in file_pairs)
+        num_workers = min(self._max_workers, len(file_pairs))
+        work = queue.Queue(maxsize=self._queue_size)
+        progress = queue.Queue()
+        errors = []
+
+        def worker():
+            channel = None
+            try:
+                channel = self._open_channel()
+                while True:
+                    item = work.get()
+                    if item is None:
+                        return
+                    if self._cancel.is_set() or errors:
+                        continue
+                    local_file, remote_file = item
+                    last = [0]
+
+                    def file_callback(transferred, _total, last=last):
+                        progress.put(transferred - last[0])
+                        last[0] = transferred
+
+                    channel.put(local_file, remote_file, file_callback)
+            except Exception as e:
+                errors.append(e)
+                # Keep draining, so the producer never blocks on a dead pool.
+                while work.get() is not None:
+                    pass
+            finally:
+                if channel is not None:
+                    channel.close()
+                progress.put(None)
+
+        threads = [
+            threading.Thread(target=worker, name="TransferEngineWorker", daemon=True)
+            for _ in range(num_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        transferred = 0
+        finished = 0
+        pending = iter(file_pairs)
+        next_item = next(pending, None)
+        producing = True
+        while finished < num_workers:
+            # Feed the bounded queue without blocking progress reporting.
+            while producing:
+                if next_item is None or self._cancel.is_set() or errors:
+                    producing = False
+                    for _ in threads:
+                        work.put(None)
+                    break
+                try:
+                    work.put(next_item, timeout=0.05)
+                except queue.Full:
+                    break
+                next_item = next(pending, None)
+            try:
+                delta = progress.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if delta is None:
+                finished += 1
+                continue
+            transferred += delta
+            if progress_callback is not None:
+                progress_callback(transferred, total)
+
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        if self._cancel.is_set():
+            raise TransferCancelled("Upload was cancelled.")
+
+    def upload_archive(self, file_pairs, remote_dir, progress_callback=None):
+        """
+        Streams all files as a single gzipped tar to the remote and unpacks it
+        into remote_dir. Afterwards file count and sizes are verified.
+
+        :param file_pairs: List of (local_file, remote_file) tuples. All remote
+                           files have to be located below remote_dir.
+        :param remote_dir: Target directory relative to the calculation basepath.
+        :param progress_callback: Optional callable(transferred, total).
+        """
+        file_pairs = list(file_pairs)
+        if not file_pairs:
+            return
+        remote_dir = remote_dir.replace("\\", "/").rstrip("/")
+        expected = {}
+        for local_file, remote_file in file_pairs:
+            arcname = posixpath.relpath(remote_file.replace("\\", "/"), remote_dir)
+            if arcname.startswith(".."):
+                raise ValueError(
+                    "Remote file %s is not located in %s." % (remote_file, remote_dir)
+                )
+            expected[arcname] = os.path.getsize(local_file)
+
+        client = get_ssh_client(self._cm)
+        if client is None:
+            raise ConnectionError("Clustermanager does not provide a SSH connection.")
+        target = shlex.quote(resolve_remote_path(self._cm, remote_dir))
+        total = sum(expected.values())
+        transferred = [0]
+
+        def read_callback(num_bytes):
+            if self._cancel.is_set():
+                raise TransferCancelled("Upload was cancelled.")
+            transferred[0] += num_bytes
+            if progress_callback is not None:
+                progress_callback(transferred[0], total)
+
+        stdin, stdout, stderr = client.exec_command(
+            "mkdir -p -- %s && tar -xzf - -C %s" % (target, target)
+        )
+        try:
+            with tarfile.open(fileobj=stdin, mode="w|gz") as tar:
+                for local_file, remote_file in file_pairs:
+                    arcname = posixpath.relpath(
+                        remote_file.replace("\\", "/"), remote_dir
+                    )
+                    tarinfo = tar.gettarinfo(local_file, arcname=arcname)
+                    with open(local_file, "rb") as infile:
+                        tar.addfile(tarinfo, _ProgressReader(infile, read_callback))
+        finally:
+            stdin.channel.shutdown_write()
+        err = stderr.read()
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status != 0:
+            raise OSError(
+                "Could not unpack archive in %s: %s"
+                % (remote_dir, err.decode(errors="replace"))
+            )
+        self._verify_remote_tree(remote_dir, expected)
+
+    def _verify_remote_tree(self, remote_dir, expected):
+        """
+        Compares the regular files in remote_dir with {relpath: size}. Other
+        files, like the ones copied from the blob store, are ignored.
+        """
+        command = "cd %s && find . -type f -printf '%%s %%P\\n'" % shlex.quote(
+            resolve_remote_path(self._cm, remote_dir)
+        )
+        exit_status, out, err = exec_remote_command(self._cm, command)
+        if exit_status != 0:
+            raise OSError(
+                "Could not verify %s: %s" % (remote_dir, err.decode(errors="replace"))
+            )
+        found = {}
+        for line in out.decode(errors="replace").splitlines():
+            size, _, relpath = line.partition(" ")
+            if relpath:
+                found[relpath] = int(size)
+        missing = [relpath for relpath in expected if relpath not in found]
+        if missing:
+            raise OSError(
+                "Archive upload to %s is incomplete: %d of %d files are missing."
+                % (remote_dir, len(missing), len(expected))
+            )
+        for relpath, size in expected.items():
+            if found.get(relpath) != size:
+                raise OSError(
+                    "Archive upload to %s is corrupt: %s has size %s, expected %d."
+                    % (remote_dir, relpath, found.get(relpath), size)
+                )
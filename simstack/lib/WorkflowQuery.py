@@ -0,0 +1,78 @@
+import datetime
+import re
+
+
+""" Format of the submission time, which prefixes the names of submitted workflows. """
+SUBMIT_TIME_FORMAT = "%Y-%m-%d-%Hh%Mm%Ss"
+
+_SUBMIT_TIME_LENGTH = len(datetime.datetime(2000, 1, 1).strftime(SUBMIT_TIME_FORMAT))
+
+
+def submit_time(name):
+    """
+    :return: The submission time encoded in the workflow name or None, if the
+             name has no such prefix.
+    """
+    try:
+        return datetime.datetime.strptime(
+            name[:_SUBMIT_TIME_LENGTH], SUBMIT_TIME_FORMAT
+        )
+    except ValueError:
+        return None
+
+
+class WorkflowQuery:
+    """
+    Filter of remote workflow listings by name, status and submission time.
+    Unset criteria match every workflow. It is evaluated locally on listings
+    fetched in full.
+
+    :param name: Substring of the workflow name, or a regular expression if
+                 regex is True. Both are matched case insensitive.
+    :param statuses: JobStatus values to show, all if empty.
+    :param submitted_after: datetime. Workflows without submission time in
+                            their name don't match, if it is set.
+    :raises re.error: If name is not a valid regular expression.
+    """
+
+    def __init__(self, name="", regex=False, statuses=(), submitted_after=None):
+        self.name = name
+        self.regex = regex
+        self.statuses = frozenset(statuses)
+        self.submitted_after = submitted_after
+        self._pattern = re.compile(name if regex else re.escape(name), re.IGNORECASE)
+
+    def is_empty(self) -> bool:
+        return not self.name and not self.statuses and self.submitted_after is None
+
+    def matches(self, workflow) -> bool:
+        if self.name and self._pattern.search(workflow["name"]) is None:
+            return False
+        if self.statuses and workflow.get("status") not in self.statuses:
+            return False
+        if self.submitted_after is not None:
+            submitted = submit_time(workflow["name"])
+            if submitted is None or submitted < self.submitted_after:
+                return False
+        return True
+
+    def filter(self, workflows):
+        if self.is_empty():
+            return list(workflows)
+        return [workflow for workflow in workflows if self.matches(workflow)]
+
+    def __eq__(self, other):
+        return isinstance(other, WorkflowQuery) and (
+            self.name,
+            self.regex,
+            self.statuses,
+            self.submitted_after,
+        ) == (other.name, other.regex, other.statuses, other.submitted_after)
+
+    def __repr__(self):
+        return "WorkflowQuery(name=%r, regex=%r, statuses=%r, submitted_after=%r)" % (
+            self.name,
+            self.regex,
+            sorted(self.statuses),
+            self.submitted_after,
+        )
@@ -36,10 +36,15 @@ class WFEditor(QWidget):
 
     request_job_list_update = Signal(name="requestJobListUpdate")
     request_worflow_list_update = Signal(name="requestWorkflowListUpdate")
+    request_more_workflows = Signal(int, name="requestMoreWorkflows")
+    workflow_query_changed = Signal(object, name="workflowQueryChanged")
     request_job_update = Signal(str, name="requestJobUpdate")
     request_worflow_update = Signal(str, name="requestWorkflowUpdate")
     request_directory_update = Signal(str, name="requestDirectoryUpdate")
+    request_reload = Signal(name="requestReload")
     download_file = Signal(str, name="downloadFile")
+    download_files = Signal(list, name="downloadFiles")
+    download_directory = Signal(str, name="downloadDirectory")
     upload_file_to = Signal(str, name="uploadFile")
     delete_file = Signal(str, name="deleteFile")
     delete_job = Signal(str, name="deleteJob")
@@ -152,12 +157,17 @@ class WFEditor(QWidget):
         self.remoteFileTree.request_worflow_list_update.connect(
             self.request_worflow_list_update
         )
+        self.remoteFileTree.request_more_workflows.connect(self.request_more_workflows)
+        self.remoteFileTree.workflow_query_changed.connect(self.workflow_query_changed)
         self.remoteFileTree.request_job_update.connect(self.request_job_update)
         self.remoteFileTree.request_worflow_update.connect(self.request_worflow_update)
         self.remoteFileTree.request_directory_update.connect(
             self.request_directory_update
         )
+        self.remoteFileTree.request_reload.connect(self.request_reload)
         self.remoteFileTree.download_file.connect(self.download_file)
+        self.remoteFileTree.download_files.connect(self.download_files)
+        self.remoteFileTree.download_directory.connect(self.download_directory)
         self.remoteFileTree.upload_file_to.connect(self.upload_file_to)
         self.remoteFileTree.delete_job.connect(self.delete_job)
         self.remoteFileTree.abort_job.connect(self.abort_job)
@@ -194,15 +204,24 @@ class WFEditor(QWidget):
     def update_filesystem_model(self, path, files):
         self.remoteFileTree.update_file_tree_node(path, files)
 
+    def update_filesystem_models(self, listings):
+        self.remoteFileTree.update_file_tree_nodes(listings)
+
     def update_job_list(self, jobs):
         self.remoteFileTree.update_job_list(jobs)
 
-    def update_workflow_list(self, wfs):
-        self.remoteFileTree.update_workflow_list(wfs)
+    def update_workflow_list(self, wfs, offset=0, total=None):
+        self.remoteFileTree.update_workflow_list(wfs, offset, total)
+
+    def update_status(self, changes):
+        self.remoteFileTree.update_status(changes)
 
     def set_registry_connection_status(self, status):
         self.registrySelection.setStatus(status)
 
+    def set_registry_status(self, registry_name, status):
+        self.registrySelection.setRegistryStatus(registry_name, status)
+
     def deactivateWidget(self):
         if self.lastActive is not None:
             self.lastActive.setColor(Qt.lightGray)
@@ -218,7 +237,8 @@ class WFEditor(QWidget):
         self.workflowWidget.openWorkFlow(workFlow)
 
     def remove(self, wfwanowidget):
-        if wfwanowidget.is_wano:
+        # WaNos, which were never constructed, cannot be open in the editor.
+        if wfwanowidget.is_wano and wfwanowidget.constructed:
             self.wanoEditor.remove_if_open(wfwanowidget.wano_view)
 
     """
@@ -63,12 +63,25 @@ class StatusMessageManager:
 
         self._timer.update_interval(duration)
 
+    def replace_message(self, key, message, duration=5):
+        """Like add_message, but replaces the last message added with key."""
+        self._list_lock.lock()
+        previous = self._keyed_messages.get(key)
+        if previous is not None:
+            self._list = [e for e in self._list if e[0] != previous]
+            self._stringlist = [m for m in self._stringlist if m != previous]
+        self._keyed_messages[key] = message
+        self._list_lock.unlock()
+
+        self.add_message(message, duration)
+
     def __init__(self, callback):
         self._list = []
         self._list_lock = QMutex()
         self._callback = callback
         self._timer = ViewTimer(self.update)
         self._stringlist = []
+        self._keyed_messages = {}
 
 
 class WFEditorMainWindow(QtWidgets.QMainWindow):
@@ -80,6 +93,7 @@ class WFEditorMainWindow(QtWidgets.QMainWindow):
     save_paths = Signal(dict, name="SavePaths")
     open_registry_settings = Signal(name="OpenRegistrySettings")
     open_path_settings = Signal(name="OpenPathSettings")
+    connect_on_startup_changed = Signal(bool, name="ConnectOnStartupChanged")
     exit_client = Signal(name="ExitClient")
     run = Signal(name="Run")
 
@@ -106,6 +120,8 @@ class WFEditorMainWindow(QtWidgets.QMainWindow):
         self.settingsMenu = self.menuBar().addMenu("&Configuration")
         self.settingsMenu.addAction(self.configServAct)
         self.settingsMenu.addAction(self.configPathSettingsAct)
+        self.settingsMenu.addSeparator()
+        self.settingsMenu.addAction(self.connectOnStartupAct)
 
         message = "Welcome to the SimStack Framework"
         self.statusBar().showMessage(message)
@@ -121,6 +137,9 @@ class WFEditorMainWindow(QtWidgets.QMainWindow):
     def show_status_message(self, message, duration):
         self._status_manager.add_message(message, duration)
 
+    def show_progress_message(self, key, message, duration):
+        self._status_manager.replace_message(key, message, duration)
+
     def closeEvent(self, event):
         if (
             QMessageBox.question(
@@ -148,6 +167,13 @@ class WFEditorMainWindow(QtWidgets.QMainWindow):
     def action_openPathSettingsDialog(self):
         self.open_path_settings.emit()
 
+    def action_connectOnStartup(self, checked):
+        self.connect_on_startup_changed.emit(checked)
+
+    def set_connect_on_startup(self, enabled):
+        # triggered is only emitted by the user, not by setChecked.
+        self.connectOnStartupAct.setChecked(enabled)
+
     def open_dialog_registry_settings(self, current_registries):
         dialog = SimStackClusterSettingsView()
 
@@ -267,3 +293,11 @@ class WFEditorMainWindow(QtWidgets.QMainWindow):
             statusTip="Configure Paths",
             triggered=self.action_openPathSettingsDialog,
         )
+
+        self.connectOnStartupAct = QtGui.QAction(
+            "&Connect all Servers on Startup",
+            self,
+            checkable=True,
+            statusTip="Connect to all servers in the background, when SimStack starts",
+            triggered=self.action_connectOnStartup,
+        )
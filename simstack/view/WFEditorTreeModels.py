@@ -1,9 +1,9 @@
 from abc import abstractmethod
 
 
-from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, QSize
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, QSize, Signal
 from PySide6.QtWidgets import QFileIconProvider
-from PySide6.QtGui import QIcon, QPainter, QColor, qGray, QPixmap
+from PySide6.QtGui import QIcon, QImage, QPainter, QColor, QPixmap
 
 from enum import Enum
 
@@ -58,12 +58,77 @@ WF_STATUS_TO_DATA_TYPE = {
 }
 
 
+def _contiguous_runs(rows):
+    """Returns [(start, count)] of the ascending rows."""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][0] + runs[-1][1] == row:
+            runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+        else:
+            runs.append((row, 1))
+    return runs
+
+
+""" Size of the pixmaps colorized status icons are rendered with. """
+STATUS_ICON_SIZE = QSize(16, 16)
+
+_icon_cache = {}
+
+
+def _inverted_grayscale(pixmap):
+    # Converted by Qt in bulk, per pixel access from Python is very slow.
+    image = pixmap.toImage().convertToFormat(QImage.Format_Grayscale8)
+    image.invertPixels()
+    return QPixmap.fromImage(image)
+
+
+def _colorized(icon, color, size):
+    pixmap = _inverted_grayscale(icon.pixmap(size))
+    painter = QPainter()
+    painter.begin(pixmap)
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Screen)
+    painter.fillRect(pixmap.rect(), color)
+    painter.end()
+    return QIcon(pixmap)
+
+
+def cached_icon(icon_type, color=None, size=STATUS_ICON_SIZE):
+    """
+    Returns the QFileIconProvider icon of icon_type, colorized with color if
+    given. Icons are created once per process and shared by all models, so
+    painting a row is a dictionary lookup.
+    """
+    key = (
+        icon_type,
+        None if color is None else QColor(color).rgba(),
+        size.width(),
+        size.height(),
+    )
+    icon = _icon_cache.get(key)
+    if icon is None:
+        icon = QFileIconProvider().icon(icon_type)
+        if color is not None:
+            icon = _colorized(icon, color, size)
+        _icon_cache[key] = icon
+    return icon
+
+
+def clear_icon_cache():
+    _icon_cache.clear()
+
+
 class DataNode(object):
+    # Trees of remote listings hold many thousand nodes, so no per-node __dict__.
+    __slots__ = ("_data", "_parent", "_children", "_row")
+
     def __init__(self, data, parent=None):
         self._data = data
 
         self._parent = parent
         self._children = []
+        # Row in the parent. Healed lazily by rowOfChild after the siblings
+        # before it were inserted or removed.
+        self._row = -1
 
         self.setParent(parent)
 
@@ -75,23 +140,49 @@ class DataNode(object):
             self._parent = None
 
     def appendChild(self, child):
+        child._row = len(self._children)
         self._children.append(child)
 
+    def insertChild(self, row, child):
+        child._parent = self
+        child._row = row
+        self._children.insert(row, child)
+
     def childAtRow(self, row):
         return self._children[row] if row >= 0 and row < len(self._children) else None
 
     def rowOfChild(self, child):
-        for i, item in enumerate(self._children):
-            if item == child:
-                return i
-        return -1
+        # Qt asks for the row of parents all the time while painting, so this
+        # has to be O(1). Stale rows are renumbered once after modifications.
+        children = self._children
+        row = child._row
+        if row < 0 or row >= len(children) or children[row] is not child:
+            for i, item in enumerate(children):
+                item._row = i
+            row = child._row
+            if row < 0 or row >= len(children) or children[row] is not child:
+                return -1
+        return row
 
     def removeChild(self, row):
-        value = self._children[row]
-        self._children.remove(value)
+        del self._children[row]
 
         return True
 
+    def release(self):
+        """
+        Detaches this node and its subtree. Without the parent references
+        removed nodes are freed immediately instead of by the cyclic garbage
+        collector.
+        """
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node._children)
+            node._children = []
+            node._parent = None
+            node._row = -1
+
     def __len__(self):
         return len(self._children)
 
@@ -115,7 +206,6 @@ class DataTreeModel(QAbstractItemModel):
         self._root = DataNode("root node")
         self._columns = 1
         self._items = []
-        self.junk = []
 
     def getNodeByIndex(self, index):
         return index.internalPointer() if index.isValid() else self._root
@@ -131,26 +221,100 @@ class DataTreeModel(QAbstractItemModel):
             added = True
         return added
 
+    def updateDataRows(self, parent, data_rows):
+        """
+        Makes the children of parent match data_rows. Rows are matched by
+        rowKey. Only removed, inserted and changed rows emit signals, so
+        unchanged rows keep their children, expansion state and selection.
+        """
+        parentNode = self.getNodeByIndex(parent)
+        keys = self._uniqueRowKeys(data_rows)
+        wanted = dict(zip(keys, data_rows))
+        old_keys = self._uniqueRowKeys([child._data for child in parentNode._children])
+
+        # Remove vanished rows bottom up in contiguous runs.
+        for start, count in reversed(
+            _contiguous_runs([r for r, k in enumerate(old_keys) if k not in wanted])
+        ):
+            self.removeRows(start, count, parent)
+        kept = [key for key in old_keys if key in wanted]
+
+        for row, key in enumerate(kept):
+            node = parentNode.childAtRow(row)
+            if node._data != wanted[key]:
+                node._data = wanted[key]
+                index = self.createIndex(row, 0, node)
+                self.dataChanged.emit(index, index)
+
+        kept_set = set(kept)
+        order = [key for key in keys if key in kept_set]
+        if order != kept:
+            self._reorderChildren(parentNode, kept, order)
+
+        start = 0
+        new_rows = []
+        for row, key in enumerate(keys):
+            if key not in kept_set:
+                if not new_rows:
+                    start = row
+                new_rows.append(wanted[key])
+            elif new_rows:
+                self._insertNodes(parent, parentNode, start, new_rows)
+                new_rows = []
+        if new_rows:
+            self._insertNodes(parent, parentNode, start, new_rows)
+
+    def appendDataRows(self, parent, data_rows):
+        """Appends the data_rows, which are not shown below parent yet."""
+        parentNode = self.getNodeByIndex(parent)
+        shown = {self.rowKey(child._data) for child in parentNode._children}
+        new_rows = [data for data in data_rows if self.rowKey(data) not in shown]
+        if new_rows:
+            self._insertNodes(parent, parentNode, len(parentNode), new_rows)
+
+    def _uniqueRowKeys(self, data_rows):
+        counts = {}
+        keys = []
+        for data in data_rows:
+            key = self.rowKey(data)
+            counts[key] = counts.get(key, 0) + 1
+            keys.append((key, counts[key]))
+        return keys
+
+    def _reorderChildren(self, parentNode, keys, order):
+        self.layoutAboutToBeChanged.emit()
+        nodes = dict(zip(keys, parentNode._children))
+        parentNode._children = [nodes[key] for key in order]
+        for row, node in enumerate(parentNode._children):
+            node._row = row
+        moved_from = []
+        moved_to = []
+        for index in self.persistentIndexList():
+            node = index.internalPointer() if index.isValid() else None
+            if node is not None and node.getParent() is parentNode:
+                moved_from.append(index)
+                moved_to.append(self.createIndex(node._row, index.column(), node))
+        self.changePersistentIndexList(moved_from, moved_to)
+        self.layoutChanged.emit()
+
+    def _insertNodes(self, parent, parentNode, row, data_rows):
+        self.beginInsertRows(parent, row, row + len(data_rows) - 1)
+        for offset, data in enumerate(data_rows):
+            node = self.createNode(data)
+            parentNode.insertChild(row + offset, node)
+        self.endInsertRows()
+
     def removeRow(self, row, parentIndex):
         return self.removeRows([row], 1, parentIndex)
 
     def _removeRows(self, row, count, parentIndex, emitSignals=False):
+        # Views drop the subtrees of removed rows themselves, so the rows are
+        # only detached and their nodes released.
         parentNode = self.getNodeByIndex(parentIndex)
-        for i in range(row + count - 1, row - 1, -1):
-            child = parentNode.childAtRow(i)
-
-            if child is None:
-                continue
-
-            childLength = len(child)
-            if len(child) > 0:
-                childIndex = self.index(row, count, parentIndex)
-                # print("removing %d subchildren of %s" % (childLength, child._data))
-                self.beginRemoveRows(parentIndex, 0, childLength)
-                self._removeRows(0, childLength, childIndex, emitSignals)
-                self.endRemoveRows()
-            # print("\tremoving: %s with %d children\n" % (child._data, childLength))
-            parentNode.removeChild(i)
+        removed = parentNode._children[row : row + count]
+        del parentNode._children[row : row + count]
+        for child in removed:
+            child.release()
         return True
 
     def removeRows(self, row, count, parentIndex):
@@ -242,15 +406,20 @@ class DataTreeModel(QAbstractItemModel):
         # return DataNode(name, self._root if parent is None else parent)
         raise NotImplementedError()
 
-    def addNode(self, data, parent=None):
-        temp = self.createNode(data, self._root if parent is None else parent)
-        # This is a huge memory leak. Currently it's the only way and I have to talk about it with Flo when he's back
+    @abstractmethod
+    def rowKey(self, data):
+        # Return a hashable identity of the row data for updateDataRows
+        raise NotImplementedError()
 
-        self.junk.append(temp)
-        return temp
+    def addNode(self, data, parent=None):
+        # The tree owns its nodes. Indexes don't keep them alive, so removed rows
+        # must only be referenced by QPersistentModelIndex, which Qt invalidates.
+        return self.createNode(data, self._root if parent is None else parent)
 
 
 class WFEFileSystemEntry(DataNode):
+    __slots__ = ()
+
     def __init__(self, data, parent=None):
         super().__init__(data, parent)
 
@@ -297,24 +466,24 @@ class WFEFileSystemModel(DataTreeModel):
             )
         )
 
+    _FILE_ICONS = {
+        DATA_TYPE.FILE: QFileIconProvider.File,
+        DATA_TYPE.DIRECTORY: QFileIconProvider.Folder,
+        DATA_TYPE.UNDELETEABLE_DIRECTORY: QFileIconProvider.Folder,
+        DATA_TYPE.LOADING: QFileIconProvider.File,
+    }
+
     def _getDecorationIcon(self, index):
         node = self.getNodeByIndex(index)
-        icon_type = node.getIconType()
-        icon = None
-        if icon_type == DATA_TYPE.FILE:
-            icon = QFileIconProvider().icon(QFileIconProvider.File)
-        elif (
-            icon_type == DATA_TYPE.DIRECTORY
-            or icon_type == DATA_TYPE.UNDELETEABLE_DIRECTORY
-        ):
-            icon = QFileIconProvider().icon(QFileIconProvider.Folder)
-        elif icon_type == DATA_TYPE.LOADING:
-            icon = QFileIconProvider().icon(QFileIconProvider.File)
-        return icon
+        icon_type = self._FILE_ICONS.get(node.getIconType())
+        return None if icon_type is None else cached_icon(icon_type)
 
     def createNode(self, data, parent=None):
         return WFEFileSystemEntry(data, parent)
 
+    def rowKey(self, data):
+        return data["abspath"]
+
     def filePath(self, index):
         path = None
         if index.isValid():
@@ -347,6 +516,8 @@ class WFEFileSystemModel(DataTreeModel):
 
 
 class WFERemoteFileSystemEntry(WFEFileSystemEntry):
+    __slots__ = ()
+
     def __init__(self, data, parent=None):
         super().__init__(data, parent)
 
@@ -408,78 +579,50 @@ class WFERemoteFileSystemModel(WFEFileSystemModel):
     HEADER_TYPE_WORKFLOW = DATA_TYPE.SEPARATOR4
     HEADER_TYPE_DIRECTORY = DATA_TYPE.UNDELETEABLE_DIRECTORY
 
+    more_workflows_requested = Signal(int)
+
+    _STATUS_ICONS = {
+        DATA_TYPE.SEPARATOR1: (QFileIconProvider.Computer, None),
+        DATA_TYPE.SEPARATOR2: (QFileIconProvider.Desktop, None),
+        DATA_TYPE.SEPARATOR3: (QFileIconProvider.Trashcan, None),
+        DATA_TYPE.SEPARATOR4: (QFileIconProvider.Drive, None),
+        # DATA_TYPE.JOB_QUEUED: (QFileIconProvider.Computer, Qt.darkYellow),
+        DATA_TYPE.JOB_QUEUED: (QFileIconProvider.Computer, None),
+        DATA_TYPE.JOB_RUNNING: (QFileIconProvider.Computer, Qt.yellow),
+        DATA_TYPE.JOB_READY: (QFileIconProvider.Computer, None),
+        DATA_TYPE.JOB_FAILED: (QFileIconProvider.Computer, Qt.red),
+        DATA_TYPE.JOB_SUCCESSFUL: (QFileIconProvider.Computer, Qt.green),
+        DATA_TYPE.JOB_ABORTED: (QFileIconProvider.Computer, Qt.red),
+        DATA_TYPE.JOB_REUSED_RESULT: (QFileIconProvider.Computer, Qt.blue),
+        # DATA_TYPE.WF_QUEUED: (QFileIconProvider.Desktop, Qt.darkYellow),
+        DATA_TYPE.WF_QUEUED: (QFileIconProvider.Desktop, None),
+        DATA_TYPE.WF_RUNNING: (QFileIconProvider.Desktop, Qt.yellow),
+        DATA_TYPE.WF_READY: (QFileIconProvider.Desktop, None),
+        DATA_TYPE.WF_FAILED: (QFileIconProvider.Desktop, Qt.red),
+        DATA_TYPE.WF_SUCCESSFUL: (QFileIconProvider.Desktop, Qt.green),
+        DATA_TYPE.WF_ABORTED: (QFileIconProvider.Desktop, Qt.red),
+    }
+
     def pixmap_to_grayscale(self, pixmap):
-        image = pixmap.toImage()
-        # data = image.bits()
-        # data.setsize(image.byteCount())
-        for i in range(0, image.width()):
-            for j in range(0, image.height()):
-                pixel = image.pixel(i, j)
-                gray_value = qGray(pixel)
-                gray_value = 255 - gray_value
-                image.setPixel(
-                    i, j, QColor(gray_value, gray_value, gray_value, 255).rgba()
-                )
-        return QPixmap.fromImage(image)
+        return _inverted_grayscale(pixmap)
 
     def colorize_icon(self, icon, color):
         if isinstance(icon, QIcon):
-            pixmap = icon.pixmap(QSize(16, 16))
-            pixmap = self.pixmap_to_grayscale(pixmap)
-            painter = QPainter()
-            painter.begin(pixmap)
-            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Screen)
-            painter.fillRect(pixmap.rect(), color)
-            painter.end()
-            return QIcon(pixmap)
+            return _colorized(icon, color, STATUS_ICON_SIZE)
 
     def icons(self, itype):
         if itype in self._icons.keys():
             return self._icons[itype]
         else:
-            icon = QFileIconProvider().icon(QFileIconProvider.Computer)
-            return icon
+            return cached_icon(QFileIconProvider.Computer)
 
     def __init__(self, parent=None):
         self._icons = {
-            DATA_TYPE.SEPARATOR1: QFileIconProvider().icon(QFileIconProvider.Computer),
-            DATA_TYPE.SEPARATOR2: QFileIconProvider().icon(QFileIconProvider.Desktop),
-            DATA_TYPE.SEPARATOR3: QFileIconProvider().icon(QFileIconProvider.Trashcan),
-            DATA_TYPE.SEPARATOR4: QFileIconProvider().icon(QFileIconProvider.Drive),
-            DATA_TYPE.JOB_QUEUED: QFileIconProvider().icon(QFileIconProvider.Computer),
-            # DATA_TYPE.JOB_QUEUED: self.colorize_icon(QFileIconProvider().icon(QFileIconProvider.Computer),Qt.darkYellow),
-            DATA_TYPE.JOB_RUNNING: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Computer), Qt.yellow
-            ),
-            DATA_TYPE.JOB_READY: QFileIconProvider().icon(QFileIconProvider.Computer),
-            DATA_TYPE.JOB_FAILED: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Computer), Qt.red
-            ),
-            DATA_TYPE.JOB_SUCCESSFUL: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Computer), Qt.green
-            ),
-            DATA_TYPE.JOB_ABORTED: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Computer), Qt.red
-            ),
-            DATA_TYPE.JOB_REUSED_RESULT: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Computer), Qt.blue
-            ),
-            # DATA_TYPE.WF_QUEUED: self.colorize_icon(QFileIconProvider().icon(QFileIconProvider.Desktop),Qt.darkYellow),
-            DATA_TYPE.WF_QUEUED: QFileIconProvider().icon(QFileIconProvider.Desktop),
-            DATA_TYPE.WF_RUNNING: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Desktop), Qt.yellow
-            ),
-            DATA_TYPE.WF_READY: QFileIconProvider().icon(QFileIconProvider.Desktop),
-            DATA_TYPE.WF_FAILED: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Desktop), Qt.red
-            ),
-            DATA_TYPE.WF_SUCCESSFUL: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Desktop), Qt.green
-            ),
-            DATA_TYPE.WF_ABORTED: self.colorize_icon(
-                QFileIconProvider().icon(QFileIconProvider.Desktop), Qt.red
-            ),
+            itype: cached_icon(icon_type, color)
+            for itype, (icon_type, color) in self._STATUS_ICONS.items()
         }
+        self._workflow_count = 0
+        self._workflows_requested_from = -1
 
         super().__init__(parent)
         self._add_headers()
@@ -566,8 +709,60 @@ class WFERemoteFileSystemModel(WFEFileSystemModel):
 
     def clear(self):
         super().clear()
+        self._workflow_count = 0
+        self._workflows_requested_from = -1
         self._add_headers()
 
+    def set_workflow_count(self, count):
+        """Total number of workflows, of which only the first pages are shown."""
+        self._workflow_count = count
+
+    def canFetchMore(self, parent):
+        return (
+            parent.isValid()
+            and self.get_type(parent) == self.HEADER_TYPE_WORKFLOW
+            and self.rowCount(parent) < self._workflow_count
+        )
+
+    def fetchMore(self, parent):
+        # Qt asks again while the page is loading, request every page once.
+        shown = self.rowCount(parent)
+        if self.canFetchMore(parent) and shown != self._workflows_requested_from:
+            self._workflows_requested_from = shown
+            self.more_workflows_requested.emit(shown)
+
+    def update_status(self, changes):
+        """
+        Applies status changes [(wfid, job_id, status)] to the shown workflows
+        and jobs, job_id being None for workflows. Only the changed rows are
+        repainted, rows not shown are skipped.
+        """
+        workflows = {}
+        for header in self._root._children:
+            if header.getDataType() == self.HEADER_TYPE_WORKFLOW:
+                workflows.update(
+                    (node.getID(), node)
+                    for node in header._children
+                    if node.getDataType() == self.DATA_TYPE_WORKFLOW
+                )
+        for wfid, job_id, status in changes:
+            node = workflows.get(wfid)
+            if node is not None and job_id is not None:
+                node = next(
+                    (
+                        child
+                        for child in node._children
+                        if child.getDataType() == self.DATA_TYPE_JOB
+                        and child.getID() == job_id
+                    ),
+                    None,
+                )
+            if node is None or node.getStatus() == status:
+                continue
+            node._data = dict(node._data, status=status)
+            index = self.createIndex(node.getParent().rowOfChild(node), 0, node)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
     def get_separator_indices(self):
         indices = []
         for i in range(0, len(self._root)):
@@ -2,28 +2,50 @@ from PySide6.QtWidgets import (
     QWidget,
     QTreeView,
     QVBoxLayout,
+    QHBoxLayout,
     QPushButton,
     QAbstractItemView,
     QMenu,
     QApplication,
+    QLineEdit,
+    QCheckBox,
+    QComboBox,
+    QDateEdit,
 )
 from PySide6.QtGui import QCursor
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import (
+    Signal,
+    Qt,
+    QDate,
+    QModelIndex,
+    QPersistentModelIndex,
+    QTimer,
+)
+
+from SimStackServer.MessageTypes import JobStatus
 
 from .WFEditorTreeModels import WFERemoteFileSystemModel as FSModel
 from .WFEditorTreeModels import WFERemoteFileSystemEntry
+from simstack.lib.WorkflowQuery import WorkflowQuery
 
 
+import datetime
 import os
+import re
 
 
 class WFRemoteFileSystem(QWidget):
     request_job_list_update = Signal(name="requestJobListUpdate")
     request_worflow_list_update = Signal(name="requestWorkflowListUpdate")
+    request_more_workflows = Signal(int, name="requestMoreWorkflows")
+    workflow_query_changed = Signal(object, name="workflowQueryChanged")
     request_job_update = Signal(str, name="requestJobUpdate")
     request_worflow_update = Signal(str, name="requestWorkflowUpdate")
     request_directory_update = Signal(str, name="requestDirectoryUpdate")
+    request_reload = Signal(name="requestReload")
     download_file = Signal(str, name="downloadFile")
+    download_files = Signal(list, name="downloadFiles")
+    download_directory = Signal(str, name="downloadDirectory")
     upload_file_to = Signal(str, name="uploadFile")
     delete_file = Signal(str, name="deleteFile")
     delete_job = Signal(str, name="deleteJob")
@@ -33,13 +55,41 @@ class WFRemoteFileSystem(QWidget):
     abort_workflow = Signal(str, name="abortWorkflow")
     _WF_PATH = "?wf?"
     _JOB_PATH = "?job?"
+    _ANY_DATE = QDate(2000, 1, 1)
+
+    def __init_filter_ui(self):
+        self.__filter_name.setPlaceholderText("Filter workflows")
+        self.__filter_name.setClearButtonEnabled(True)
+        self.__filter_regex.setText("Regex")
+        self.__filter_status.addItem("All states", None)
+        for status in JobStatus:
+            self.__filter_status.addItem(status.name.capitalize(), status)
+        self.__filter_date.setCalendarPopup(True)
+        self.__filter_date.setDisplayFormat("yyyy-MM-dd")
+        self.__filter_date.setMinimumDate(self._ANY_DATE)
+        self.__filter_date.setSpecialValueText("Any date")
+        self.__filter_date.setDate(self._ANY_DATE)
+        self.__filter_date.setToolTip("Submitted on or after")
+        # Typing should not send a query per key press.
+        self.__filter_timer.setSingleShot(True)
+        self.__filter_timer.setInterval(300)
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.__filter_name, 1)
+        layout.addWidget(self.__filter_regex)
+        layout.addWidget(self.__filter_status)
+        layout.addWidget(self.__filter_date)
+        return layout
 
     def __init_ui(self):
         layout = QVBoxLayout(self)
+        layout.addLayout(self.__init_filter_ui())
 
         self.__fileTree.setModel(self.__fs_model)
         self.__fileTree.setHeaderHidden(True)
         self.__fileTree.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.__fileTree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.__fileTree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.__btn_reload.setText("Reload")
 
@@ -49,63 +99,130 @@ class WFRemoteFileSystem(QWidget):
     def update_job_list(self, jobs):
         self.update_file_tree_node(self._JOB_PATH, jobs)
 
-    def update_workflow_list(self, wfs):
-        self.update_file_tree_node(self._WF_PATH, wfs)
+    def update_workflow_list(self, wfs, offset=0, total=None):
+        """
+        Shows the page of workflows starting at offset. The first page replaces
+        the shown workflows, later pages are appended.
+        """
+        if total is not None:
+            self.__fs_model.set_workflow_count(total)
+        if offset == 0:
+            self.update_file_tree_node(self._WF_PATH, wfs)
+            return
+        listed = self.__listed.get(self._WF_PATH)
+        if listed is not None and listed.isValid():
+            self.__fs_model.appendDataRows(
+                QModelIndex(listed), self.__create_entries(self._WF_PATH, wfs)
+            )
+
+    def update_status(self, changes):
+        """Applies polled status changes [(wfid, job_id, status)]."""
+        self.__fs_model.update_status(changes)
 
     def update_file_tree_node(self, path, subelements):
         # print("new file tree nodes for path: %s:\n%s" % (path, subelements))
         filePath = path if not path == "" else "none"
 
+        index = None
         if filePath in self.__current_requests:
-            index = self.__current_requests[filePath]
-            self.__fs_model.removeSubRows(index)
             # remove request
-            self.__current_requests.pop(filePath)
+            requested = self.__current_requests.pop(filePath)
+            if requested.isValid():
+                index = QModelIndex(requested)
+                self.__listed[filePath] = QPersistentModelIndex(requested)
+        elif filePath in self.__listed:
+            # A cached listing was shown before, this is the refreshed one.
+            if self.__listed[filePath].isValid():
+                index = QModelIndex(self.__listed[filePath])
+            else:
+                self.__listed.pop(filePath)
 
-            if subelements is not None and len(subelements) > 0:
-                if filePath == "?wf?":
-                    subelements.sort(key=lambda k: k["name"], reverse=True)
-                else:
-                    subelements.sort(key=lambda k: k["name"])
-                # print("i(id=%s): %s" % (i['id'] if 'id' in i else '', i))
-                # print(path,i['path'],i['name'])
-
-                entries = [
-                    WFERemoteFileSystemEntry.createData(
-                        i["id"] if "id" in i else i["name"],
-                        i["name"],
-                        os.path.basename(
-                            i["name"][:-1] if i["name"].endswith("/") else i["name"]
-                        ),
-                        "%s/%s"
-                        % (
-                            path if i["type"] == "f" or i["type"] == "d" else "",
-                            i["path"]
-                            if i["type"] != "f" and i["type"] != "d"
-                            else i["name"],
-                        ),
-                        FSModel.DATA_TYPE_FILE
-                        if i["type"] == "f"
-                        else FSModel.DATA_TYPE_DIRECTORY
-                        if i["type"] == "d"
-                        else FSModel.DATA_TYPE_JOB
-                        if i["type"] == "j"
-                        else FSModel.DATA_TYPE_WORKFLOW
-                        if i["type"] == "w"
-                        else FSModel.DATA_TYPE_UNKNOWN,
-                        status=i["status"] if "status" in i else None,
-                        original_result_directory=i["original_result_directory"]
-                        if "original_result_directory" in i
-                        else None,
-                    )
-                    for i in subelements
-                ]
-
-                self.__fs_model.insertDataRows(0, entries, index)
+        if index is not None:
+            entries = self.__create_entries(path, subelements)
+            # Diff against the shown rows, so expanded and selected rows stay.
+            self.__fs_model.updateDataRows(index, entries)
             # print(subelements)
         else:
             print("Path '%s' not in current_requests." % filePath)
 
+    def __create_entries(self, path, subelements):
+        entries = []
+        if subelements is not None and len(subelements) > 0:
+            if path == self._WF_PATH:
+                subelements.sort(key=lambda k: k["name"], reverse=True)
+            else:
+                subelements.sort(key=lambda k: k["name"])
+            # print("i(id=%s): %s" % (i['id'] if 'id' in i else '', i))
+            # print(path,i['path'],i['name'])
+
+            entries = [
+                WFERemoteFileSystemEntry.createData(
+                    i["id"] if "id" in i else i["name"],
+                    i["name"],
+                    os.path.basename(
+                        i["name"][:-1] if i["name"].endswith("/") else i["name"]
+                    ),
+                    "%s/%s"
+                    % (
+                        path if i["type"] == "f" or i["type"] == "d" else "",
+                        i["path"]
+                        if i["type"] != "f" and i["type"] != "d"
+                        else i["name"],
+                    ),
+                    FSModel.DATA_TYPE_FILE
+                    if i["type"] == "f"
+                    else FSModel.DATA_TYPE_DIRECTORY
+                    if i["type"] == "d"
+                    else FSModel.DATA_TYPE_JOB
+                    if i["type"] == "j"
+                    else FSModel.DATA_TYPE_WORKFLOW
+                    if i["type"] == "w"
+                    else FSModel.DATA_TYPE_UNKNOWN,
+                    status=i["status"] if "status" in i else None,
+                    original_result_directory=i["original_result_directory"]
+                    if "original_result_directory" in i
+                    else None,
+                )
+                for i in subelements
+            ]
+
+        return entries
+
+    def update_file_tree_nodes(self, listings):
+        """
+        Applies the listings of several paths, e.g. of a directory and its
+        subdirectories, parents first and with a single repaint.
+        """
+        self.__fileTree.setUpdatesEnabled(False)
+        try:
+            children = {}
+            for path in sorted(listings, key=lambda p: p.count("/")):
+                listed = self.__listed.get(path)
+                if path not in self.__current_requests and (
+                    listed is None or not listed.isValid()
+                ):
+                    # Prefetched subdirectory of a path listed just before.
+                    index = self.__child_index(path, children)
+                    if index is None:
+                        continue
+                    self.__current_requests[path] = index
+                self.update_file_tree_node(path, listings[path])
+        finally:
+            self.__fileTree.setUpdatesEnabled(True)
+
+    def __child_index(self, path, children):
+        parent = path.rpartition("/")[0]
+        if parent not in children:
+            rows = {}
+            listed = self.__listed.get(parent)
+            if listed is not None and listed.isValid():
+                parent_index = QModelIndex(listed)
+                for row in range(self.__fs_model.rowCount(parent_index)):
+                    child = self.__fs_model.index(row, 0, parent_index)
+                    rows[self.__fs_model.get_abspath(child)] = child
+            children[parent] = rows
+        return children[parent].get(path)
+
     # TODO rename
     def __got_request(self, model_index):
         update_list = []
@@ -137,7 +254,9 @@ class WFRemoteFileSystem(QWidget):
             ]
 
         for index, filePath, index_type in update_list:
-            self.__fs_model.loading(index, "Loading...")
+            # Rows shown already are kept and updated, when the listing arrives.
+            if self.__fs_model.rowCount(index) == 0:
+                self.__fs_model.loading(index, "Loading...")
 
             if (
                 index_type == FSModel.HEADER_TYPE_JOB
@@ -153,7 +272,8 @@ class WFRemoteFileSystem(QWidget):
             #    model_index.isValid() if not model_index is None else None))
 
     def __request_header_entry_update(self, index, path, index_type):
-        self.__current_requests.update({path: index})
+        # Persistent, because the row may be removed until the answer arrives.
+        self.__current_requests.update({path: QPersistentModelIndex(index)})
         # print("current_requests: %s" % self.__current_requests)
 
         # print("Emitting request for %s." % path)
@@ -178,7 +298,7 @@ class WFRemoteFileSystem(QWidget):
         if index_type == FSModel.DATA_TYPE_WORKFLOW:
             abspath = self.__fs_model.get_id(index)
 
-        self.__current_requests.update({abspath: index})
+        self.__current_requests.update({abspath: QPersistentModelIndex(index)})
         # print("current_requests: %s" % self.__current_requests)
 
         # print("Emitting request for %s." % abspath)
@@ -208,13 +328,34 @@ class WFRemoteFileSystem(QWidget):
         self.upload_file_to.emit(abspath)
 
     def __on_cm_download(self):
-        # TODO modify to handle all selected.
-        index = self.__fileTree.selectedIndexes()[0]
+        downloadable = [
+            index
+            for index in self.__fileTree.selectedIndexes()
+            if self.__fs_model.get_type(index)
+            in (FSModel.DATA_TYPE_FILE, FSModel.DATA_TYPE_DIRECTORY)
+        ]
         if (
-            index is not None
-            and self.__fs_model.get_type(index) == FSModel.DATA_TYPE_FILE
+            len(downloadable) == 1
+            and self.__fs_model.get_type(downloadable[0]) == FSModel.DATA_TYPE_FILE
         ):
-            self.__download_file(index)
+            self.__download_file(downloadable[0])
+        elif len(downloadable) > 0:
+            # Selected directories are downloaded with their whole subtree.
+            self.download_files.emit(
+                [self.__fs_model.get_abspath(index) for index in downloadable]
+            )
+
+    def __on_cm_download_directory(self):
+        index = self.__fileTree.selectedIndexes()[0]
+        if index is not None:
+            index_type = self.__fs_model.get_type(index)
+            if index_type == FSModel.DATA_TYPE_WORKFLOW:
+                self.download_directory.emit(self.__fs_model.get_id(index))
+            elif (
+                index_type == FSModel.DATA_TYPE_DIRECTORY
+                or index_type == FSModel.DATA_TYPE_JOB
+            ):
+                self.download_directory.emit(self.__fs_model.get_abspath(index))
 
     def __on_cm_upload(self):
         index = self.__fileTree.selectedIndexes()[0]
@@ -335,8 +476,11 @@ class WFRemoteFileSystem(QWidget):
         action_2 = menu.addAction("Upload File")
         action_2.triggered.connect(self.__on_cm_upload)
 
-        action_3 = menu.addAction("Delete Directory")
-        action_3.triggered.connect(self.__on_cm_delete_file)
+        action_3 = menu.addAction("Download Directory")
+        action_3.triggered.connect(self.__on_cm_download_directory)
+
+        action_4 = menu.addAction("Delete Directory")
+        action_4.triggered.connect(self.__on_cm_delete_file)
 
     def __create_workflow_context_menu(self, menu, index, success):
         action_1 = menu.addAction("Browse Workflow")
@@ -344,6 +488,8 @@ class WFRemoteFileSystem(QWidget):
         if success:
             action_1 = menu.addAction("Show Report")
             action_1.triggered.connect(self.__on_cm_show_report)
+        action_1 = menu.addAction("Download Workflow")
+        action_1.triggered.connect(self.__on_cm_download_directory)
         action_1 = menu.addAction("Delete Workflow")
         action_1.triggered.connect(self.__on_cm_delete_workflow)
         action_1 = menu.addAction("Abort Workflow")
@@ -390,7 +536,40 @@ class WFRemoteFileSystem(QWidget):
             pass
         menu.exec_(QCursor.pos())
 
+    def __schedule_filter(self, *args):
+        self.__filter_timer.start()
+
+    def __workflow_query(self):
+        date = self.__filter_date.date()
+        status = self.__filter_status.currentData()
+        return WorkflowQuery(
+            name=self.__filter_name.text(),
+            regex=self.__filter_regex.isChecked(),
+            statuses=() if status is None else (status,),
+            submitted_after=None
+            if date == self._ANY_DATE
+            else datetime.datetime(date.year(), date.month(), date.day()),
+        )
+
+    def __apply_filter(self):
+        try:
+            query = self.__workflow_query()
+        except re.error:
+            self.__filter_name.setStyleSheet("color: red")
+            return
+        self.__filter_name.setStyleSheet("")
+        self.workflow_query_changed.emit(None if query.is_empty() else query)
+
+        for index in self.__fs_model.get_separator_indices():
+            if self.__fs_model.get_type(index) == FSModel.HEADER_TYPE_WORKFLOW:
+                if self.__fileTree.isExpanded(index):
+                    self.__got_request(index)
+                else:
+                    # Requests the workflows through the expanded signal.
+                    self.__fileTree.expand(index)
+
     def __reload(self):
+        self.request_reload.emit()
         self.__got_request(None)
 
     def __connect_signals(self):
@@ -398,12 +577,24 @@ class WFRemoteFileSystem(QWidget):
         self.__fileTree.doubleClicked.connect(self.__got_request)
         self.__fileTree.expanded.connect(self.__got_request)
         self.__btn_reload.clicked.connect(self.__reload)
+        self.__filter_name.textChanged.connect(self.__schedule_filter)
+        self.__filter_regex.toggled.connect(self.__schedule_filter)
+        self.__filter_status.currentIndexChanged.connect(self.__schedule_filter)
+        self.__filter_date.dateChanged.connect(self.__schedule_filter)
+        self.__filter_timer.timeout.connect(self.__apply_filter)
+        self.__fs_model.more_workflows_requested.connect(self.request_more_workflows)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.__fs_model = FSModel(self)
         self.__fileTree = QTreeView(self)
         self.__btn_reload = QPushButton()
+        self.__filter_name = QLineEdit(self)
+        self.__filter_regex = QCheckBox(self)
+        self.__filter_status = QComboBox(self)
+        self.__filter_date = QDateEdit(self)
+        self.__filter_timer = QTimer(self)
         self.__init_ui()
         self.__connect_signals()
         self.__current_requests = {}
+        self.__listed = {}
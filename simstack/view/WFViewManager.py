@@ -4,7 +4,7 @@ from .WFEditorMainWindow import WFEditorMainWindow
 from .WFEditor import WFEditor
 
 from PySide6.QtCore import Signal, QObject, QFileInfo, QStandardPaths
-from PySide6.QtWidgets import QFileDialog
+from PySide6.QtWidgets import QFileDialog, QInputDialog
 
 from .MessageDialog import MessageDialog
 
@@ -15,6 +15,7 @@ class WFViewManager(QObject):
     save_paths = Signal(dict, name="SavePaths")
     open_registry_settings = Signal(name="OpenRegistrySettings")
     open_path_settings = Signal(name="OpenPathSettings")
+    connect_on_startup_changed = Signal(bool, name="ConnectOnStartupChanged")
     registry_changed = Signal(str, name="RegistryChanged")
     disconnect_registry = Signal(name="disconnectRegistry")
     connect_registry = Signal(str, name="connectRegistry")
@@ -22,11 +23,16 @@ class WFViewManager(QObject):
     exit_client = Signal(name="exitClient")
     request_job_list_update = Signal(name="requestJobListUpdate")
     request_worflow_list_update = Signal(name="requestWorkflowListUpdate")
+    request_more_workflows = Signal(int, name="requestMoreWorkflows")
+    workflow_query_changed = Signal(object, name="workflowQueryChanged")
     request_job_update = Signal(str, name="requestJobUpdate")
     request_worflow_update = Signal(str, name="requestWorkflowUpdate")
     request_directory_update = Signal(str, name="requestDirectoryUpdate")
     request_saved_workflows_update = Signal(str, name="requestSavedWorkflowsUpdate")
+    request_reload = Signal(name="requestReload")
     download_file_to = Signal(str, str, name="downloadFileTo")
+    download_files_to = Signal(list, str, name="downloadFilesTo")
+    download_directory_to = Signal(str, str, str, name="downloadDirectoryTo")
     upload_file = Signal(str, str, name="uploadFile")
     delete_file = Signal(str, name="deleteFile")
     delete_job = Signal(str, name="deleteJob")
@@ -64,6 +70,10 @@ class WFViewManager(QObject):
     def show_status_message(self, message, duration=5):
         self._mainwindow.show_status_message(message, duration)
 
+    def show_progress_message(self, key, message, duration=5):
+        """Status message, which replaces the previous one with the same key."""
+        self._mainwindow.show_progress_message(key, message, duration)
+
     def clear_editor(self):
         self._editor.clear()
 
@@ -85,6 +95,9 @@ class WFViewManager(QObject):
     def open_dialog_path_settings(self, pathsettings):
         self._mainwindow.open_dialog_path_settings(pathsettings)
 
+    def set_connect_on_startup(self, enabled):
+        self._mainwindow.set_connect_on_startup(enabled)
+
     def update_wano_list(self, wanos):
         self._editor.update_wano_list(wanos)
 
@@ -94,6 +107,9 @@ class WFViewManager(QObject):
     def set_registry_connection_status(self, status):
         self._editor.set_registry_connection_status(status)
 
+    def set_registry_status(self, registry_name, status):
+        self._editor.set_registry_status(registry_name, status)
+
     def open_new_workflow(self):
         # TODO
         pass
@@ -104,11 +120,17 @@ class WFViewManager(QObject):
     def update_filesystem_model(self, path, files):
         self._editor.update_filesystem_model(path, files)
 
+    def update_filesystem_models(self, listings):
+        self._editor.update_filesystem_models(listings)
+
     def update_job_list(self, jobs):
         self._editor.update_job_list(jobs)
 
-    def update_workflow_list(self, wfs):
-        self._editor.update_workflow_list(wfs)
+    def update_workflow_list(self, wfs, offset=0, total=None):
+        self._editor.update_workflow_list(wfs, offset, total)
+
+    def update_status(self, changes):
+        self._editor.update_status(changes)
 
     def test(self):
         print("WFViewManager")
@@ -127,6 +149,30 @@ class WFViewManager(QObject):
             # self._view_timer.add_callback(self._update_timeout.emit,
             #        self._dl_update_interval)
 
+    def _on_files_download(self, filepaths):
+        save_to = QFileDialog.getExistingDirectory(
+            self._editor, "Download Files to Directory", self.last_used_path
+        )
+        if save_to:
+            self.last_used_path = save_to
+            self.download_files_to.emit(filepaths, save_to)
+
+    def _on_directory_download(self, dirpath):
+        save_to = QFileDialog.getExistingDirectory(
+            self._editor, "Download Directory to", self.last_used_path
+        )
+        if not save_to:
+            return
+        pattern, ok = QInputDialog.getText(
+            self._editor,
+            "Download Directory",
+            "Only download files matching (e.g. ForEach/*/outputs/*), "
+            "leave empty for all files:",
+        )
+        if ok:
+            self.last_used_path = save_to
+            self.download_directory_to.emit(dirpath, save_to, pattern.strip())
+
     def _on_file_upload(self, dirpath):
         upload = QFileDialog.getOpenFileName(self._editor, "Select file for upload", "")
         if upload[0]:
@@ -184,6 +230,9 @@ class WFViewManager(QObject):
         self._mainwindow.save_paths.connect(self.save_paths)
         self._mainwindow.open_registry_settings.connect(self.open_registry_settings)
         self._mainwindow.open_path_settings.connect(self.open_path_settings)
+        self._mainwindow.connect_on_startup_changed.connect(
+            self.connect_on_startup_changed
+        )
         self._mainwindow.exit_client.connect(self.exit_client)
         self._editor.registry_changed.connect(self.registry_changed)
         self._editor.connect_registry.connect(self.connect_registry)
@@ -193,10 +242,15 @@ class WFViewManager(QObject):
         self._editor.request_worflow_list_update.connect(
             self.request_worflow_list_update
         )
+        self._editor.request_more_workflows.connect(self.request_more_workflows)
+        self._editor.workflow_query_changed.connect(self.workflow_query_changed)
         self._editor.request_job_update.connect(self.request_job_update)
         self._editor.request_worflow_update.connect(self.request_worflow_update)
         self._editor.request_directory_update.connect(self.request_directory_update)
+        self._editor.request_reload.connect(self.request_reload)
         self._editor.download_file.connect(self._on_file_download)
+        self._editor.download_files.connect(self._on_files_download)
+        self._editor.download_directory.connect(self._on_directory_download)
         self._editor.upload_file_to.connect(self._on_file_upload)
         self._editor.delete_job.connect(self.delete_job)
         self._editor.abort_job.connect(self.abort_job)
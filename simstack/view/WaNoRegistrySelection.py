@@ -63,15 +63,29 @@ class WaNoRegistrySelection(QWidget):
         imagepath = os.path.join(media_path, icon)
         return imagepath
 
+    def __status_icon(self, status):
+        icon = self.__status_icons.get(status)
+        if icon is None:
+            icon = QIcon(QPixmap(self.get_iconpath(self.__icons[status.value])))
+            self.__status_icons[status] = icon
+        return icon
+
     def __update_status(self):
-        p = QPixmap(self.get_iconpath(self.__icons[self.__status.value]))
-        buttonIcon = QIcon(p)
-        self.isConnectedIcon.setIcon(buttonIcon)
+        self.isConnectedIcon.setIcon(self.__status_icon(self.__status))
         self.isConnectedIcon.setText(self.__text[self.__status.value])
 
     def setStatus(self, status):
         self.__status = status
         self.__update_status()
+        index = self.registryComboBox.currentIndex()
+        if index >= 0:
+            self.registryComboBox.setItemIcon(index, self.__status_icon(status))
+
+    def setRegistryStatus(self, registry_name, status):
+        """Shows the status of a registry, which is connected in the background."""
+        index = self.registryComboBox.findText(registry_name)
+        if index >= 0:
+            self.registryComboBox.setItemIcon(index, self.__status_icon(status))
 
     def __init_ui(self, parent):
         button_height = 20
@@ -110,6 +124,7 @@ class WaNoRegistrySelection(QWidget):
         WaNoRegistrySelection.instance = self
 
         self.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
+        self.__status_icons = {}
         self.__init_ui(parent)
         self.setStatus(WaNoRegistrySelection.CONNECTION_STATES.disconnected)
         self.__emit_signal = True
@@ -2,9 +2,30 @@
 from simstack.view.AbstractWaNoView import AbstractWanoQTView, AbstractWanoView
 from PySide6 import QtGui, QtCore, QtWidgets
 import os
+import threading
+import weakref
 
 from simstack.view.ResourcesView import ResourcesView
 
+# All file views, so the files referenced by a WaNo are found without walking
+# its models.
+_file_views = weakref.WeakSet()
+_file_views_lock = threading.Lock()
+
+
+def referenced_files(wano_model_root):
+    """Sorted local files named by the file parameters of a WaNo."""
+    with _file_views_lock:
+        views = list(_file_views)
+    files = set()
+    for view in views:
+        if view.model is None or view.model.get_root() is not wano_model_root:
+            continue
+        filename = view.model.get_data()
+        if filename and os.path.isfile(filename):
+            files.add(filename)
+    return sorted(files)
+
 
 class GroupBoxWithButton(QtWidgets.QGroupBox):
     def __init__(self, *args, **kwargs):
@@ -576,6 +597,8 @@ class WanoQtViewRoot(AbstractWanoQTView):
 class WaNoItemFileView(AbstractWanoQTView):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        with _file_views_lock:
+            _file_views.add(self)
         """ Widget code here """
         self.actual_widget = QtWidgets.QWidget(None)
         hbox = QtWidgets.QHBoxLayout()
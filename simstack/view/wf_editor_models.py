@@ -7,8 +7,8 @@ import os
 
 import abc
 
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from os.path import join
 import posixpath
 from pathlib import Path
 
@@ -32,15 +32,29 @@ from SimStackServer.WorkflowModel import (
     VariableElement,
     Resources,
 )
-from simstack.SimStackPaths import SimStackPaths
-from simstack.WaNoSettingsProvider import WaNoSettingsProvider
-from simstack.Constants import SETTING_KEYS
+from simstack.lib.AtomicFolder import (
+    abort_replace,
+    begin_replace,
+    commit_replace,
+    recover_folder,
+)
+from simstack.lib.IdlePrefetcher import IdlePrefetcher
+from simstack.lib.RenderCache import RenderCache
 
 
 def linuxjoin(*args, **kwargs):
     return posixpath.join(*args, **kwargs)
 
 
+def _file_fingerprint(filename):
+    """Size, modification time and inode of filename or None, if it is missing."""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
 def merge_path(path, name, var):
     newpath = "%s.%s.%s" % (path, name, var)
     if newpath.startswith("."):
@@ -48,6 +62,46 @@ def merge_path(path, name, var):
     return newpath
 
 
+""" Maximum number of WaNos, whose input files are rendered concurrently. """
+MAX_RENDER_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class _ParallelWaNoRenderer:
+    """
+    Renders the WaNos of a workflow in two phases. During the first walk over
+    the workflow, render() only records the arguments of every WaNo and hands
+    out placeholders, so the ids and paths of the graph can be computed. run()
+    then writes the input files of all WaNos in a thread pool. The second walk
+    receives the real results in the same order as the serial renderer.
+
+    WaNos read lazily are constructed during the first walk, because their
+    views are Qt widgets, which must only be created in the GUI thread.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._results = None
+
+    def render(self, wano, path_list, output_path_list, wano_dir, stageout_basedir):
+        if self._results is not None:
+            return self._results[wano]
+        wano.construct_wano()
+        self._calls[wano] = (
+            (list(path_list), list(output_path_list), wano_dir),
+            {"stageout_basedir": stageout_basedir},
+        )
+        return None, WorkflowExecModule(), path_list + [wano.name]
+
+    def run(self, max_workers=MAX_RENDER_WORKERS):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                wano: pool.submit(wano.render, *args, **kwargs)
+                for wano, (args, kwargs) in self._calls.items()
+            }
+        # Errors are raised for the first failing WaNo in workflow order.
+        self._results = {wano: future.result() for wano, future in futures.items()}
+
+
 class SubmitType(Enum):
     SINGLE_WANO = 0
     WORKFLOW = 1
@@ -235,7 +289,8 @@ class SubWFModel(WFItemModel, WFItemListInterface):
 
                 stageout_basedir = "%s/%s" % (basepath, elename)
 
-                jsdl, wem, wem_path_list = ele.render(
+                jsdl, wem, wem_path_list = self.get_root().render_wano(
+                    ele,
                     path_list,
                     output_path_list,
                     wano_dir,
@@ -325,7 +380,7 @@ class SubWFModel(WFItemModel, WFItemListInterface):
                     # backwards compat to v1 workflows
                     basewanodir = wanofolder
                 widget = WFWaNoWidget.instantiate_from_folder(
-                    basewanodir, wanofolder, type, parent=self.view
+                    basewanodir, wanofolder, type, parent=self.view, lazy=True
                 )
                 widget.setText(name)
                 self.elements.append(widget)
@@ -1124,6 +1179,12 @@ class WFModel:
         self.view = kwargs["view"]
         self.elements = []  # List of Elements,Workflows, ControlElements
         self._base_resource_during_render = None
+        self._wano_renderer = None
+        self._render_cache = RenderCache()
+        self._save_staging = None
+        # Path, text and fingerprint of the last saved workflow XML
+        self._saved_xml = None
+        self._wano_prefetcher = None
         # Name of the saved folder
         self.elementnames = []
         self.foldername = None
@@ -1195,7 +1256,42 @@ class WFModel:
                     myvars.append(myvar)
         return myvars
 
+    def render_wano(
+        self, wano, path_list, output_path_list, wano_dir, stageout_basedir
+    ):
+        if self._wano_renderer is not None:
+            return self._wano_renderer.render(
+                wano, path_list, output_path_list, wano_dir, stageout_basedir
+            )
+        return wano.render(
+            path_list, output_path_list, wano_dir, stageout_basedir=stageout_basedir
+        )
+
     def render_to_simple_wf(self, submitdir, jobdir):
+        if len(self.collect_wano_widgets()) < 2:
+            activities, transitions = self._render_graph(submitdir, jobdir)
+        else:
+            self._wano_renderer = _ParallelWaNoRenderer()
+            try:
+                self._render_graph(submitdir, jobdir)
+                self._wano_renderer.run()
+                activities, transitions = self._render_graph(submitdir, jobdir)
+            finally:
+                self._wano_renderer = None
+
+        wf = Workflow(
+            elements=WorkflowElementList(activities),
+            graph=DirectedGraph(transitions),
+            name=self.wf_name,
+            storage="${BASEFOLDER}",
+            queueing_system="${QUEUE}",
+        )
+        xml = etree.Element("Workflow")
+        wf.to_xml(parent_element=xml)
+
+        return xml
+
+    def _render_graph(self, submitdir, jobdir):
         activities = []
         transitions = []
         # start = WFtoXML.xml_start()
@@ -1213,8 +1309,12 @@ class WFModel:
                     pass
                 # stageout_basedir = "wanos/%s" % (elename)
                 my_path_list = path_list.copy()
-                jsdl, wem, other = ele.render(
-                    my_path_list, output_path_list, wano_dir, stageout_basedir=elename
+                jsdl, wem, other = self.render_wano(
+                    ele,
+                    my_path_list,
+                    output_path_list,
+                    wano_dir,
+                    stageout_basedir=elename,
                 )
                 wem.set_given_name(elename)
                 mypath = "/".join(path_list + [elename])
@@ -1246,17 +1346,7 @@ class WFModel:
 
             fromids = toids
 
-        wf = Workflow(
-            elements=WorkflowElementList(activities),
-            graph=DirectedGraph(transitions),
-            name=self.wf_name,
-            storage="${BASEFOLDER}",
-            queueing_system="${QUEUE}",
-        )
-        xml = etree.Element("Workflow")
-        wf.to_xml(parent_element=xml)
-
-        return xml
+        return activities, transitions
 
     # this function assembles all files relative to the workflow root
     # The files will be export to c9m:${WORKFLOW_ID}/the file name below
@@ -1290,52 +1380,89 @@ class WFModel:
         names = {wfwn.wano.name for wfwn in self.collect_wano_widgets()}
         return names
 
+    def save_destination(self, folder):
+        """
+        Folder, which folder becomes once the running save is committed. While
+        saving, elements write to a staging directory next to the workflow.
+        """
+        if self._save_staging is not None and Path(folder) == self._save_staging:
+            return Path(self.foldername)
+        return Path(folder)
+
     def save_to_disk(self, foldername):
+        """
+        Saves the workflow to foldername. The new state is built in a staging
+        directory and swapped in atomically. If anything fails, foldername is
+        left untouched.
+        """
         success = True
         self.wf_name = os.path.basename(foldername)
         self.foldername = foldername
-        settings = WaNoSettingsProvider.get_instance()
-        wdir = settings.get_value(SETTING_KEYS["workflows"])
-        if wdir == "<embedded>":
-            wdir = join(SimStackPaths.get_embedded_path(), "workflows")
+        widgets = self.collect_wano_widgets()
+        wano_folders = [
+            (widget.wano.folder, widget.pending_delta) for widget in widgets
+        ]
 
-        mydir = os.path.join(wdir, self.wf_name)
+        staging = begin_replace(foldername)
+        self._save_staging = staging
         try:
-            os.makedirs(mydir)
-        except OSError:
-            pass
-
-        root = etree.Element("root")
-        root.attrib["wfxml_version"] = "2.0"
-        # TODO revert changes in filesystem in case instantiate_in_folder fails
-        for myid, (ele, name) in enumerate(zip(self.elements, self.elementnames)):
-            if ele.is_wano:
-                subxml = ele.get_xml()
-                subxml.attrib["id"] = str(myid)
-                subxml.attrib["name"] = name
-                # print("Instantiating in folder: %s, wanocheat: %s"%(foldername,ele.wano[1]))
-                # This call copies everything:
-                success = ele.instantiate_in_folder(foldername)
-                # We also need to save the delta xml here:
-                ele.save_delta(foldername)
-                root.append(subxml)
-                if not success:
-                    break
-            else:
-                root.append(ele.save_to_disk(foldername))
-
-        if success:
-            xml_path = os.path.join(mydir, self.wf_name + ".xml")
-            with open(xml_path, "w") as outfile:
-                outfile.write(
-                    etree.tostring(root, encoding="unicode", pretty_print=True)
-                )
-        else:
+            root = etree.Element("root")
+            root.attrib["wfxml_version"] = "2.0"
+            for myid, (ele, name) in enumerate(zip(self.elements, self.elementnames)):
+                if ele.is_wano:
+                    subxml = ele.get_xml()
+                    subxml.attrib["id"] = str(myid)
+                    subxml.attrib["name"] = name
+                    # This call copies everything:
+                    success = ele.instantiate_in_folder(staging)
+                    # We also need to save the delta xml here:
+                    ele.save_delta(staging)
+                    root.append(subxml)
+                    if not success:
+                        break
+                else:
+                    root.append(ele.save_to_disk(staging))
+
+            if success:
+                xml_path = staging / (self.wf_name + ".xml")
+                xml_text = etree.tostring(root, encoding="unicode", pretty_print=True)
+                saved_xml = Path(foldername) / (self.wf_name + ".xml")
+                linked = False
+                if self._saved_xml == (
+                    saved_xml,
+                    xml_text,
+                    _file_fingerprint(saved_xml),
+                ):
+                    # Unchanged workflows keep their XML file, where the file
+                    # system supports hard links.
+                    try:
+                        os.link(saved_xml, xml_path)
+                        linked = True
+                    except OSError:
+                        pass
+                if not linked:
+                    with open(xml_path, "w") as outfile:
+                        outfile.write(xml_text)
+                commit_replace(staging, foldername)
+                self._saved_xml = (saved_xml, xml_text, _file_fingerprint(saved_xml))
+        except BaseException:
+            success = False
+            raise
+        finally:
+            self._save_staging = None
+            if not success:
+                abort_replace(staging)
+                for widget, (wano_folder, pending_delta) in zip(widgets, wano_folders):
+                    widget.set_wano_folder(wano_folder)
+                    widget.pending_delta = pending_delta
+
+        if not success:
             print("Error while writing wano")
             raise Exception("This should be a custom exception")
         return success
 
     def read_from_disk(self, foldername):
+        recover_folder(foldername)
         self.foldername = foldername
         self.wf_name = os.path.basename(foldername)
         xml_filename = os.path.join(foldername, os.path.basename(foldername)) + ".xml"
@@ -1365,7 +1492,7 @@ class WFModel:
                     basewanodir = wanofolder
 
                 widget = WFWaNoWidget.instantiate_from_folder(
-                    basewanodir, wanofolder, type, parent=self.view
+                    basewanodir, wanofolder, type, parent=self.view, lazy=True
                 )
                 widget.setText(name)
                 self.elements.append(widget)
@@ -1386,10 +1513,25 @@ class WFModel:
 
                 model.read_from_disk(full_foldername=foldername, xml_subelement=child)
         self.view.updateGeometry()
+        if self._wano_prefetcher is None:
+            self._wano_prefetcher = IdlePrefetcher(self._prefetch_wano)
+        self._wano_prefetcher.start()
+
+    def _prefetch_wano(self):
+        """Constructs the next WaNo, which was read lazily and is not used yet."""
+        for widget in self.collect_wano_widgets():
+            if not widget.constructed:
+                widget.construct_wano()
+                return True
+        return False
 
     def base_resource_during_render(self):
         return self._base_resource_during_render
 
+    def render_cache(self):
+        """Rendered WaNos of previous submissions of this workflow."""
+        return self._render_cache
+
     def render(self, given_name, current_registry: Resources):
         self._base_resource_during_render = current_registry
         assert self.foldername is not None
@@ -1,5 +1,4 @@
 import pathlib
-import shutil
 import os
 
 import logging
@@ -570,7 +569,8 @@ class WFTabsWidget(QtWidgets.QTabWidget):
             return True
         return False
 
-    def _remove_wf_contents(self, foldername: pathlib.Path):
+    def _check_wf_overwritable(self, foldername: pathlib.Path):
+        # The old contents are replaced by the save, apart from submissions.
         fullpath_path = Path(foldername)
         assert fullpath_path.is_dir(), "Given path has to be directory."
         assert (
@@ -578,13 +578,6 @@ class WFTabsWidget(QtWidgets.QTabWidget):
         ).is_dir(), "When overwriting an old workflow, the old directory has to include a wanos directory."
         assert fullpath_path != Path.home(), "Path cannot be home directory."
         assert fullpath_path != fullpath_path.anchor, "Path cannot be filesystem root."
-        wanodir = fullpath_path / "wanos"
-        wanoconfigdir = fullpath_path / "wano_configurations"
-        xmlpath = fullpath_path / f"{fullpath_path.name}.xml"
-        shutil.rmtree(wanodir)
-        if wanoconfigdir.is_dir():
-            shutil.rmtree(wanoconfigdir)
-        os.unlink(xmlpath)
 
     def saveAs(self):  # pragma: no cover
         foldername, ok = QtWidgets.QInputDialog.getText(
@@ -632,7 +625,7 @@ class WFTabsWidget(QtWidgets.QTabWidget):
             if message == QtWidgets.QMessageBox.Cancel:
                 return False
             else:
-                self._remove_wf_contents(fullpath)
+                self._check_wf_overwritable(fullpath)
 
         return self.saveFile(fullpath)
 
@@ -2,6 +2,7 @@ import copy
 import hashlib
 import logging
 import os
+import tempfile
 import traceback
 import uuid
 from enum import Enum
@@ -19,8 +20,26 @@ from SimStackServer.Util.FileUtilities import copytree_pathlib
 from SimStackServer.WorkflowModel import WorkflowExecModule
 from SimStackServer.WaNo.WaNoModels import WaNoModelRoot
 
+from simstack.lib.AtomicFolder import link_tree
+from simstack.lib.DigestCache import file_digest
+from simstack.lib.RenderCache import (
+    copy_exec_module,
+    file_manifest,
+    update_digest_with_tree,
+)
+
+from .WaNoViews import referenced_files
 from .wf_editor_base import DragDropTargetTracker, widgetColors
 
+""" Memory backed directory deltas are serialized to for comparisons, if it exists. """
+DELTA_SCRATCH_DIR = "/dev/shm"
+
+
+def _delta_scratch_dir():
+    if os.path.isdir(DELTA_SCRATCH_DIR) and os.access(DELTA_SCRATCH_DIR, os.W_OK):
+        return DELTA_SCRATCH_DIR
+    return None
+
 
 class SubmitType(Enum):
     SINGLE_WANO = 0
@@ -28,7 +47,7 @@ class SubmitType(Enum):
 
 
 class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
-    def __init__(self, text, wano: WaNoListEntry, parent):
+    def __init__(self, text, wano: WaNoListEntry, parent, lazy=False):
         super().__init__(parent)
         self.manual_init()
         self.logger = logging.getLogger("WFELOG")
@@ -63,17 +82,48 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
         self.wano = copy.copy(wano)
         self.model = self
         self.view = self
-        self.wano_model: WaNoModelRoot = None
-        self.wano_view = None
+        self._wano_model: WaNoModelRoot = None
+        self._wano_view = None
         self.constructed = False
+        # Delta read on construction of a lazily instantiated WaNo
+        self.pending_delta = None
+        self._saved_delta = None
         self.uuid = str(uuid.uuid4())
-        self.construct_wano()
+        if not lazy:
+            self.construct_wano()
         self.name = self.text()
         # today int he evening: add info on aiida node ids, while executing workflow.
         # read output and check if it actually works
 
+    @property
+    def wano_model(self) -> WaNoModelRoot:
+        """The WaNo model, which is constructed on first use."""
+        self.construct_wano()
+        return self._wano_model
+
+    @wano_model.setter
+    def wano_model(self, wano_model):
+        self._wano_model = wano_model
+        self.constructed = True
+
+    @property
+    def wano_view(self):
+        """The WaNo view, which is constructed on first use."""
+        self.construct_wano()
+        return self._wano_view
+
+    @wano_view.setter
+    def wano_view(self, wano_view):
+        self._wano_view = wano_view
+
     @classmethod
-    def instantiate_from_folder(cls, folder, delta_wano_dir, wanotype, parent):
+    def instantiate_from_folder(
+        cls, folder, delta_wano_dir, wanotype, parent, lazy=False
+    ):
+        """
+        Instantiates a saved WaNo. With lazy, only the icon and name are shown
+        and the WaNo is constructed on first use.
+        """
         folder = Path(folder)
         iconpath = folder / (wanotype + ".png")
         if not os.path.isfile(iconpath):
@@ -86,9 +136,14 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
         uuid = delta_wano_dir.name
         wano = WaNoListEntry(name=wanotype, folder=folder, icon=wano_icon)
         # [wanotype,folder,os.path.join(folder,wanotype) + ".xml", wano_icon]
-        returnobject = cls(text=wano.name, wano=wano, parent=parent)
+        # V1 workflows might not have a delta, which is only noticed on reading.
+        lazy = lazy and delta_wano_dir != folder
+        returnobject = cls(text=wano.name, wano=wano, parent=parent, lazy=lazy)
         # overwrite old uuid
         returnobject.uuid = uuid
+        if lazy:
+            returnobject.pending_delta = delta_wano_dir
+            return returnobject
         try:
             returnobject._read_delta(delta_wano_dir)
         except FileNotFoundError as e:
@@ -99,12 +154,49 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
                 raise e from e
         return returnobject
 
+    def _delta_digest(self):
+        """
+        Digest of the delta the WaNo model would save. WaNo models have no
+        reliable change notification, so the delta itself is compared. It is
+        serialized to memory, where possible.
+        """
+        digest = hashlib.blake2b()
+        with tempfile.TemporaryDirectory(
+            prefix="wano-delta-", dir=_delta_scratch_dir()
+        ) as delta_dir:
+            self.wano_model.save(Path(delta_dir))
+            update_digest_with_tree(digest, delta_dir)
+        return digest.hexdigest()
+
     def save_delta(self, foldername):
         outfolder = foldername / "wano_configurations" / str(self.uuid)
+        final_outfolder = (
+            self.wf_model.save_destination(foldername)
+            / "wano_configurations"
+            / str(self.uuid)
+        )
+        if not self.constructed:
+            # The delta did not change since it was read, so it is linked.
+            if self.pending_delta is not None and self.pending_delta != outfolder:
+                link_tree(self.pending_delta, outfolder)
+                self.pending_delta = final_outfolder
+            os.makedirs(outfolder, exist_ok=True)
+            return
+        if self.wano_model is None:
+            os.makedirs(outfolder, exist_ok=True)
+            return
+        # The delta is only written, when the model changed since the last
+        # save or the saved files were touched. Otherwise they are linked.
+        delta_digest = self._delta_digest()
+        saved_manifest = file_manifest(final_outfolder)
+        if self._saved_delta == (final_outfolder, delta_digest, saved_manifest):
+            if outfolder != final_outfolder:
+                link_tree(final_outfolder, outfolder)
+            return
         os.makedirs(outfolder, exist_ok=True)
         print(f"Saving to {outfolder}")
-        if self.wano_model is not None:
-            self.wano_model.save(outfolder)
+        self.wano_model.save(outfolder)
+        self._saved_delta = (final_outfolder, delta_digest, file_manifest(outfolder))
 
     def _read_delta(self, foldername):
         self.wano_model.read(foldername)
@@ -133,17 +225,14 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
 
     def _compare_wano_equality(self, wano1: WaNoListEntry, wano2: WaNoListEntry):
         xml1 = get_wano_xml_path(wano1.folder, wano_name_override=wano1.name)
-        md51 = hashlib.md5()
-        with xml1.open("rb") as infile:
-            md51.update(infile.read())
-        md52 = hashlib.md5()
         xml2 = get_wano_xml_path(wano2.folder, wano_name_override=wano1.name)
-        with xml2.open("rb") as infile:
-            md52.update(infile.read())
-        return md51.hexdigest() == md52.hexdigest()
+        return file_digest(xml1) == file_digest(xml2)
 
     def instantiate_in_folder(self, folder):
         outfolder: Path = folder / "wanos" / self.wano.name
+        final_outfolder: Path = (
+            self.wf_model.save_destination(folder) / "wanos" / self.wano.name
+        )
 
         folder_exists = outfolder.is_dir()
         if not folder_exists:
@@ -159,8 +248,7 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
                 newfolderwle = copy.copy(self.wano)
                 newfolderwle.folder = outfolder
                 if self._compare_wano_equality(newfolderwle, self.wano):
-                    self.wano.folder = outfolder
-                    self.wano_model.set_wano_dir_root(outfolder)
+                    self.set_wano_folder(final_outfolder)
                     # self.logger.info(f"Directory {outfolder} already instantiated with equivalent WaNo.")
                     return True
                 else:
@@ -168,8 +256,12 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
                         f"Directory {outfolder} already instantiated with different WaNo with equivalent name in folder {self.wano.folder}. Please check, if you imported two different WaNos (e.g. by porting an old version workflow)."
                     )
             try:
-                print("Copying %s to %s" % (self.wano.folder, outfolder))
-                copytree_pathlib(self.wano.folder, outfolder)
+                if self.wano.folder == final_outfolder:
+                    # Unchanged WaNo of the workflow, which is replaced.
+                    link_tree(self.wano.folder, outfolder)
+                else:
+                    print("Copying %s to %s" % (self.wano.folder, outfolder))
+                    copytree_pathlib(self.wano.folder, outfolder)
 
             except Exception as e:
                 self.logger.error("Failed to copy tree: %s." % str(e))
@@ -177,24 +269,55 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
                 traceback.print_exc()
                 return False
 
-        self.wano.folder = outfolder
-        self.wano_model.set_wano_dir_root(outfolder)
+        self.set_wano_folder(final_outfolder)
 
         # self.wano_model.save(outfolder)
         return True
 
+    def set_wano_folder(self, folder):
+        self.wano.folder = folder
+        if self.constructed:
+            self.wano_model.set_wano_dir_root(folder)
+
+    def _render_key(self, stageout_basedir):
+        """
+        Digest of everything render depends on: The delta of the WaNo model, the
+        files of the WaNo, the contents of local files its parameters reference,
+        the default resources and the stageout path.
+        """
+        digest = hashlib.blake2b()
+        digest.update(str(self.wano_model.name).encode() + b"\0")
+        digest.update(str(stageout_basedir).encode() + b"\0")
+        digest.update(self._delta_digest().encode())
+        for filename in referenced_files(self.wano_model):
+            digest.update(filename.encode() + b"\0")
+            digest.update(file_digest(filename).encode() + b"\0")
+        update_digest_with_tree(digest, self.wano.folder, contents=False)
+        resources = etree.Element("Resources")
+        self.wf_model.base_resource_during_render().to_xml(parent_element=resources)
+        digest.update(etree.tostring(resources))
+        return digest.hexdigest()
+
     def render(self, path_list, output_path_list, basefolder, stageout_basedir=""):
         # myfolder = os.path.join(basefolder,self.uuid)
+        render_cache = self.wf_model.render_cache()
+        key = self._render_key(stageout_basedir)
+        cached = render_cache.get(key, basefolder)
+        if cached is not None:
+            jsdl, mywem = cached
+            return jsdl, mywem, path_list + [mywem.name]
+
         print("rendering wano with stageout_basedir %s" % stageout_basedir)
         jsdl, wem = self.wano_model.render_and_write_input_files_newmodel(
             basefolder, stageout_basedir=stageout_basedir
         )
         wem: WorkflowExecModule
-        mywem = copy.deepcopy(wem)
+        mywem = copy_exec_module(wem)
         mywem.resources.overwrite_unset_fields_from_default_resources(
             self.wf_model.base_resource_during_render()
         )
         mywem.set_wano_xml(self.wano_model.name + ".xml")
+        render_cache.put(key, basefolder, jsdl, mywem)
         return jsdl, mywem, path_list + [wem.name]
 
     def clear(self):
@@ -202,14 +325,16 @@ class WFWaNoWidget(QtWidgets.QToolButton, DragDropTargetTracker):
 
     def construct_wano(self):
         if not self.constructed:
-            self.wano_model, self.wano_view = WaNoFactory.wano_constructor(self.wano)
-            self.wano_model.set_parent_wf(self.wf_model)
-            self.wano_model.datachanged_force()
+            self._wano_model, self._wano_view = WaNoFactory.wano_constructor(self.wano)
+            self._wano_model.set_parent_wf(self.wf_model)
+            self._wano_model.datachanged_force()
             self.constructed = True
+            if self.pending_delta is not None:
+                pending_delta, self.pending_delta = self.pending_delta, None
+                self._read_delta(pending_delta)
 
     def mouseDoubleClickEvent(self, e):
-        if self.wano_model is None:
-            self.construct_wano()
+        self.construct_wano()
         self.parent().openWaNoEditor(self)  # pass the widget to remember it
 
     def get_variables(self):
@@ -0,0 +1,86 @@
+"""
+Benchmark of the placeholder substitution in SSHConnector.run_workflow_job.
+
+Compares PlaceholderSubstitution.write against the former chained
+str.replace on a ForEach workflow XML of about 10 MB. Reports the best time
+and the peak of additionally allocated memory. Run with:
+
+    python tests/lib/bench_placeholders.py
+"""
+
+import io
+import time
+import tracemalloc
+
+from lxml import etree
+
+from simstack.lib.Placeholders import PlaceholderSubstitution
+
+TARGET_SIZE = 10 * 1024 * 1024
+REPEATS = 3
+
+REPLACEMENTS = {
+    "c9m:": "",
+    "${STORAGE}/": "",
+    "${SUBMIT_NAME}": "2024-01-01-12h00m00s-Benchmark",
+    "${BASEFOLDER}": "/home/user/calculations/2024-01-01-12h00m00s-Benchmark",
+    "${QUEUE}": "slurm",
+    "${QUEUE_NAME}": "default",
+}
+
+
+def _workflow():
+    root = etree.Element(
+        "Workflow", storage="${BASEFOLDER}", queueing_system="${QUEUE}"
+    )
+    foreach = etree.SubElement(root, "ForEachGraph")
+    files = etree.SubElement(foreach, "iterator_files")
+    i = 0
+    while len(etree.tostring(root)) < TARGET_SIZE:
+        for _ in range(10000):
+            entry = etree.SubElement(files, "Element", id=str(i))
+            entry.text = "c9m:${STORAGE}/workflow_data/inputs/structure_%d.xyz" % i
+            i += 1
+    return etree.tostring(root, encoding="utf8", pretty_print=True)
+
+
+def _chained(data):
+    outfile = io.StringIO()
+    text = data.decode()
+    for placeholder, replacement in REPLACEMENTS.items():
+        text = text.replace(placeholder, replacement)
+    outfile.write(text)
+    return outfile
+
+
+def _chunked(data):
+    outfile = io.StringIO()
+    PlaceholderSubstitution(REPLACEMENTS).write(outfile, data)
+    return outfile
+
+
+def _measure(function, data):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    function(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    data = _workflow()
+    assert _chained(data).getvalue() == _chunked(data).getvalue()
+    print("workflow XML of %.1f MB, best of %d:" % (len(data) / 2**20, REPEATS))
+    for name, function in (("str.replace", _chained), ("chunked", _chunked)):
+        elapsed, peak = _measure(function, data)
+        print("  %-12s %8.1f ms %8.1f MB peak" % (name, elapsed * 1000, peak / 2**20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+
+import pytest
+
+from simstack.lib.AtomicFolder import (
+    abort_replace,
+    begin_replace,
+    commit_replace,
+    link_tree,
+    recover_folder,
+    recover_folders,
+    remove_snapshots,
+    snapshot_tree,
+)
+
+
+def _workflow(tmp_path):
+    folder = tmp_path / "TestWorkflow"
+    (folder / "wanos" / "OldWaNo").mkdir(parents=True)
+    (folder / "Submitted" / "run").mkdir(parents=True)
+    (folder / "TestWorkflow.xml").write_text("<old/>")
+    return folder
+
+
+def test_commit_replace(tmp_path):
+    """The new state replaces the old one, other entries are kept."""
+    folder = _workflow(tmp_path)
+    staging = begin_replace(folder)
+    assert staging.parent == tmp_path
+    (staging / "wanos" / "NewWaNo").mkdir(parents=True)
+    (staging / "TestWorkflow.xml").write_text("<new/>")
+
+    commit_replace(staging, folder)
+
+    assert os.listdir(tmp_path) == ["TestWorkflow"]
+    assert (folder / "TestWorkflow.xml").read_text() == "<new/>"
+    assert os.listdir(folder / "wanos") == ["NewWaNo"]
+    assert os.listdir(folder / "Submitted") == ["run"]
+
+
+def test_commit_replace_new_folder(tmp_path):
+    """A folder, which did not exist before, is created."""
+    folder = tmp_path / "TestWorkflow"
+    staging = begin_replace(folder)
+    (staging / "TestWorkflow.xml").write_text("<new/>")
+
+    commit_replace(staging, folder)
+
+    assert os.listdir(tmp_path) == ["TestWorkflow"]
+    assert (folder / "TestWorkflow.xml").read_text() == "<new/>"
+
+
+def test_abort_replace(tmp_path):
+    """Aborting leaves the folder untouched."""
+    folder = _workflow(tmp_path)
+    staging = begin_replace(folder)
+    (staging / "TestWorkflow.xml").write_text("<new/>")
+
+    abort_replace(staging)
+
+    assert os.listdir(tmp_path) == ["TestWorkflow"]
+    assert (folder / "TestWorkflow.xml").read_text() == "<old/>"
+
+
+def test_recover_folder_before_rename(tmp_path):
+    """A crash after moving the old state aside restores the old state."""
+    folder = _workflow(tmp_path)
+    staging = begin_replace(folder)
+    (staging / "TestWorkflow.xml").write_text("<partial/>")
+    os.replace(folder, tmp_path / ".TestWorkflow.previous")
+
+    recover_folder(folder)
+
+    assert os.listdir(tmp_path) == ["TestWorkflow"]
+    assert (folder / "TestWorkflow.xml").read_text() == "<old/>"
+
+
+def test_recover_folder_after_rename(tmp_path):
+    """A crash after renaming the new state into place completes the swap."""
+    folder = _workflow(tmp_path)
+    backup = tmp_path / ".TestWorkflow.previous"
+    os.replace(folder, backup)
+    folder.mkdir()
+    (folder / "TestWorkflow.xml").write_text("<new/>")
+
+    recover_folders(tmp_path)
+
+    assert os.listdir(tmp_path) == ["TestWorkflow"]
+    assert (folder / "TestWorkflow.xml").read_text() == "<new/>"
+    assert os.listdir(folder / "Submitted") == ["run"]
+
+
+@pytest.mark.parametrize("folder", ["/", "~"])
+def test_begin_replace_refuses(folder):
+    """The file system root and the home directory are never replaced."""
+    with pytest.raises(ValueError):
+        begin_replace(os.path.expanduser(folder))
+
+
+def test_link_tree(tmp_path):
+    """All files are linked, not copied."""
+    source = tmp_path / "source"
+    (source / "sub").mkdir(parents=True)
+    (source / "sub" / "file.txt").write_text("content")
+
+    link_tree(source, tmp_path / "target")
+
+    target = tmp_path / "target" / "sub" / "file.txt"
+    assert target.read_text() == "content"
+    assert os.path.samefile(target, source / "sub" / "file.txt")
+
+
+def test_snapshot_tree(tmp_path):
+    """The snapshot is kept, when the folder is replaced."""
+    folder = _workflow(tmp_path)
+    (folder / "Submitted" / "run" / "input.txt").write_text("input")
+
+    snapshot = snapshot_tree(folder / "Submitted" / "run", folder)
+    staging = begin_replace(folder)
+    (staging / "TestWorkflow.xml").write_text("<new/>")
+    commit_replace(staging, folder)
+
+    assert snapshot.parent == tmp_path
+    assert snapshot.name.startswith(".TestWorkflow.snapshot-")
+    assert (snapshot / "input.txt").read_text() == "input"
+    assert os.path.samefile(
+        snapshot / "input.txt", folder / "Submitted" / "run" / "input.txt"
+    )
+
+
+def test_remove_snapshots(tmp_path):
+    """Snapshots are removed, the workflows are kept."""
+    folder = _workflow(tmp_path)
+    snapshot_tree(folder / "Submitted", folder)
+
+    remove_snapshots(tmp_path)
+
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["TestWorkflow"]
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from simstack.lib.BlobStore import BlobStore
+
+
+@pytest.fixture
+def local_files(tmp_path):
+    """One large and one small local file."""
+    big = tmp_path / "big.bin"
+    big.write_bytes(b"b" * 2048)
+    small = tmp_path / "small.txt"
+    small.write_bytes(b"s")
+    return str(big), str(small)
+
+
+@pytest.fixture
+def cm():
+    cm = MagicMock()
+    cm.get_calculation_basepath.return_value = "/calc/base"
+    return cm
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    return str(tmp_path / "settings" / "blob_index" / "registry.json")
+
+
+def _digest(data):
+    return hashlib.blake2b(data).hexdigest()
+
+
+class TestBlobStore:
+    """Tests for the BlobStore class."""
+
+    def test_digest(self, cm, index_file, local_files):
+        """Large files are hashed with blake2b, small ones are not stored."""
+        store = BlobStore(cm, index_file, min_size=1024)
+        assert store._digest(local_files[0]) == _digest(b"b" * 2048)
+        assert store._digest(local_files[1]) is None
+
+    def test_index_file_for_registry(self):
+        """Registry names are sanitized for the filesystem."""
+        result = BlobStore.index_file_for_registry("/settings", "my cluster/1")
+        assert result.endswith("my_cluster_1.json")
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_copy_known_nothing_indexed(self, mock_exec, cm, index_file, local_files):
+        """Without index no remote command is executed."""
+        store = BlobStore(cm, index_file, min_size=1024)
+        pairs = [(local_files[0], "sub/big.bin"), (local_files[1], "sub/small.txt")]
+        assert store.copy_known(pairs) == pairs
+        mock_exec.assert_not_called()
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_copy_known(self, mock_exec, cm, index_file, local_files):
+        """Known files are copied on the remote and removed from the upload list."""
+        digest = _digest(b"b" * 2048)
+        store = BlobStore(cm, index_file, min_size=1024)
+        store._index = {digest: [2048, 12345, 0.0]}
+        mock_exec.return_value = (0, b"0\n", b"")
+
+        pairs = [(local_files[0], "sub/big.bin"), (local_files[1], "sub/small.txt")]
+        assert store.copy_known(pairs) == [(local_files[1], "sub/small.txt")]
+
+        script = mock_exec.call_args[1]["stdin_data"]
+        blob = "/calc/base/.simstack_blobs/%s/%s" % (digest[:2], digest)
+        assert "mkdir -p -- /calc/base/sub" in script
+        assert "= '2048 12345'" in script
+        assert "cp --reflink=auto -- %s /calc/base/sub/big.bin" % blob in script
+        assert "chmod u+w -- /calc/base/sub/big.bin" in script
+        assert "ln " not in script
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_copy_known_stale_blob(self, mock_exec, cm, index_file, local_files):
+        """Blobs failing the remote verification are uploaded again."""
+        digest = _digest(b"b" * 2048)
+        store = BlobStore(cm, index_file, min_size=1024)
+        store._index = {digest: [2048, 12345, 0.0]}
+        mock_exec.return_value = (0, b"", b"")
+
+        pairs = [(local_files[0], "sub/big.bin")]
+        assert store.copy_known(pairs) == pairs
+        assert store._index == {}
+        with open(index_file) as infile:
+            assert json.load(infile) == {}
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_add(self, mock_exec, cm, index_file, local_files):
+        """Uploaded files are stored and indexed."""
+        digest = _digest(b"b" * 2048)
+        mock_exec.return_value = (0, b"0 2048 12345\n", b"")
+        store = BlobStore(cm, index_file, min_size=1024, clock=lambda: 1000.0)
+
+        store.add([(local_files[0], "sub/big.bin"), (local_files[1], "sub/small.txt")])
+
+        script = mock_exec.call_args[1]["stdin_data"]
+        assert "small.txt" not in script
+        # The blob is a hard link of the submitted file, which stays writable
+        blob = "/calc/base/.simstack_blobs/%s/%s" % (digest[:2], digest)
+        assert "ln -- /calc/base/sub/big.bin %s.part.$$" % blob in script
+        assert "cp -p -- /calc/base/sub/big.bin %s.part.$$" % blob in script
+        assert "mv -f -- %s.part.$$ %s" % (blob, blob) in script
+        assert "chmod" not in script
+        assert store._index == {digest: [2048, 12345, 1000.0]}
+
+        # The index survives a restart
+        assert BlobStore(cm, index_file)._index == {digest: [2048, 12345, 1000.0]}
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_add_expires_blobs(self, mock_exec, cm, index_file):
+        """Blobs not submitted for max_age are removed."""
+        mock_exec.return_value = (0, b"", b"")
+        now = [1000.0]
+        store = BlobStore(cm, index_file, max_age=100.0, clock=lambda: now[0])
+        store._index = {"aa" * 32: [1, 2, 950.0], "bb" * 32: [1, 2, 850.0]}
+
+        store.add([])
+
+        script = mock_exec.call_args[1]["stdin_data"]
+        assert script == "rm -f -- /calc/base/.simstack_blobs/bb/%s\n" % ("bb" * 32)
+        assert list(store._index) == ["aa" * 32]
+
+        # Nothing to do
+        mock_exec.reset_mock()
+        store.add([])
+        mock_exec.assert_not_called()
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_copy_known_refreshes(self, mock_exec, cm, index_file, local_files):
+        """Copied blobs count as submitted again."""
+        digest = _digest(b"b" * 2048)
+        store = BlobStore(cm, index_file, min_size=1024, clock=lambda: 1000.0)
+        store._index = {digest: [2048, 12345, 0.0]}
+        mock_exec.return_value = (0, b"0\n", b"")
+
+        store.copy_known([(local_files[0], "sub/big.bin")])
+
+        assert store._index == {digest: [2048, 12345, 1000.0]}
+
+    def test_load_old_index(self, cm, index_file):
+        """Entries without submission time count as submitted on loading."""
+        os.makedirs(os.path.dirname(index_file))
+        with open(index_file, "wt") as outfile:
+            json.dump({"aa" * 32: [1, 2], "bb" * 32: "broken"}, outfile)
+        store = BlobStore(cm, index_file, clock=lambda: 1000.0)
+        assert store._index == {"aa" * 32: [1, 2, 1000.0]}
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_digest_memo(self, mock_exec, cm, index_file, local_files):
+        """Files are only hashed once, while they are unchanged."""
+        mock_exec.return_value = (0, b"", b"")
+        store = BlobStore(cm, index_file, min_size=1024)
+        with patch.object(
+            store._digests, "_new_digest", wraps=hashlib.blake2b
+        ) as mock_digest:
+            store.add([(local_files[0], "sub/big.bin")])
+            store.add([(local_files[0], "other/big.bin")])
+        mock_digest.assert_called_once_with()
+
+    @patch("simstack.lib.BlobStore.exec_remote_command")
+    def test_digest_unlocked(self, mock_exec, cm, index_file, local_files):
+        """Files are hashed without holding the index lock."""
+        mock_exec.return_value = (0, b"", b"")
+        store = BlobStore(cm, index_file, min_size=1024)
+        digest = store._digest
+
+        def unlocked_digest(local_file):
+            assert not store._lock.locked()
+            return digest(local_file)
+
+        store._index = {_digest(b"b" * 2048): [2048, 12345, 0.0]}
+        with patch.object(store, "_digest", side_effect=unlocked_digest) as mock_digest:
+            store.copy_known([(local_files[0], "sub/big.bin")])
+            store.add([(local_files[0], "sub/big.bin")])
+        assert mock_digest.call_count == 2
+
+    def test_local_clustermanager(self, index_file, local_files):
+        """Without SSH client the blob store is bypassed."""
+        cm = MagicMock()
+        cm._ssh_client = None
+        store = BlobStore(cm, index_file, min_size=1024)
+        pairs = [(local_files[0], "sub/big.bin")]
+        assert store.copy_known(pairs) == pairs
+        store.add(pairs)
+        cm.get_calculation_basepath.assert_not_called()
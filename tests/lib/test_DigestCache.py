@@ -0,0 +1,98 @@
+import hashlib
+import os
+from unittest.mock import patch
+
+import pytest
+
+import simstack.lib.DigestCache as DigestCacheModule
+from simstack.lib.DigestCache import DigestCache, file_digest
+
+
+@pytest.fixture
+def count_hashes():
+    """Counts the digests computed while the fixture is active."""
+    created = []
+
+    def new_digest():
+        created.append(1)
+        return hashlib.blake2b(digest_size=16)
+
+    with patch.object(DigestCacheModule, "_new_digest", side_effect=new_digest):
+        yield created
+
+
+def test_file_digest_memoised(tmp_path, count_hashes):
+    """Unchanged files are only hashed once."""
+    filename = tmp_path / "WaNo.xml"
+    filename.write_text("<WaNoTemplate/>")
+    cache = DigestCache()
+
+    first = cache.file_digest(filename)
+    assert cache.file_digest(str(filename)) == first
+    assert len(count_hashes) == 1
+    assert first == hashlib.blake2b(b"<WaNoTemplate/>", digest_size=16).hexdigest()
+
+
+def test_file_digest_changed(tmp_path, count_hashes):
+    """Files are hashed again, once their size or modification time changed."""
+    filename = tmp_path / "WaNo.xml"
+    filename.write_text("<WaNoTemplate/>")
+    cache = DigestCache()
+    first = cache.file_digest(filename)
+
+    filename.write_text("<WaNoTemplate />")
+    os.utime(filename, ns=(0, 1))
+
+    assert cache.file_digest(filename) != first
+    assert len(count_hashes) == 2
+    assert len(cache) == 1
+
+
+def test_file_digest_hard_links(tmp_path, count_hashes):
+    """Hard links of a file in new directories are not hashed again."""
+    filename = tmp_path / "WaNo.xml"
+    filename.write_text("<WaNoTemplate/>")
+    cache = DigestCache()
+    first = cache.file_digest(filename)
+
+    submitted = tmp_path / "Submitted" / "2024-01-01-00h00m00s"
+    submitted.mkdir(parents=True)
+    os.link(filename, submitted / "WaNo.xml")
+
+    assert cache.file_digest(submitted / "WaNo.xml") == first
+    assert len(count_hashes) == 1
+    assert len(cache) == 1
+
+
+def test_file_digest_evicts(tmp_path):
+    """Only max_entries digests are kept."""
+    cache = DigestCache(max_entries=2)
+    for i in range(3):
+        (tmp_path / str(i)).write_text(str(i))
+        cache.file_digest(tmp_path / str(i))
+
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_file_digest_fixed_hash(tmp_path):
+    """A given new_digest is used regardless of xxhash."""
+    filename = tmp_path / "big.bin"
+    filename.write_bytes(b"b" * 2048)
+    cache = DigestCache(new_digest=hashlib.blake2b)
+
+    assert cache.file_digest(filename) == hashlib.blake2b(b"b" * 2048).hexdigest()
+
+
+def test_file_digest_missing(tmp_path):
+    """Missing files raise like os.stat."""
+    with pytest.raises(FileNotFoundError):
+        file_digest(tmp_path / "missing.xml")
+
+
+def test_new_digest_without_xxhash():
+    """blake2b is used, if xxhash is not installed."""
+    with patch.object(DigestCacheModule, "xxhash", None):
+        digest = DigestCacheModule._new_digest()
+    assert digest.name == "blake2b"
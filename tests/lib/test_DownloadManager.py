@@ -0,0 +1,275 @@
+import io
+import os
+import tarfile
+import threading
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from simstack.lib.DownloadManager import (
+    DownloadManager,
+    TransferRate,
+    PART_SUFFIX,
+    PART_VERSION_SUFFIX,
+)
+
+
+class FakeChannel:
+    """In memory remote file system. Fails transfers as configured."""
+
+    def __init__(self, files, failures=None, lock=None, mtime=100):
+        self.files = files
+        self.mtime = mtime
+        self.failures = failures if failures is not None else {}
+        self.lock = lock or threading.Lock()
+        self.offsets = []
+        self.closed = False
+
+    def stat(self, remote_file):
+        if remote_file in self.files:
+            return False, len(self.files[remote_file]), self.mtime
+        return True, None, None
+
+    def list_tree(self, remote_dir):
+        prefix = remote_dir.rstrip("/") + "/"
+        return [
+            (name[len(prefix) :], len(data), self.mtime)
+            for name, data in sorted(self.files.items())
+            if name.startswith(prefix)
+        ]
+
+    def get(self, remote_file, local_file, offset, callback):
+        data = self.files[remote_file]
+        with self.lock:
+            self.offsets.append((remote_file, offset))
+            fail_at = self.failures.pop(remote_file, None)
+        with open(local_file, "ab" if offset else "wb") as lf:
+            end = len(data) if fail_at is None else fail_at
+            lf.write(data[offset:end])
+            callback(end - offset)
+        if fail_at is not None:
+            raise EOFError("Connection lost")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def remote_files():
+    return {
+        "/wf/job1/out.txt": b"a" * 1000,
+        "/wf/job1/sub/log.txt": b"b" * 10,
+        "/wf/job2/out.txt": b"c" * 500,
+        "/single.txt": b"single",
+    }
+
+
+def _manager(channels, **kwargs):
+    manager = DownloadManager(MagicMock(), **kwargs)
+    iterator = iter(channels)
+    manager._open_channel = lambda: next(iterator)
+    return manager
+
+
+class TestDownloadManager:
+    """Tests for the DownloadManager class."""
+
+    def test_download_tree_and_file(self, tmp_path, remote_files):
+        """Directories are expanded and downloaded in parallel."""
+        lock = threading.Lock()
+        channels = [FakeChannel(remote_files, lock=lock) for _ in range(3)]
+        manager = _manager(channels, max_workers=3)
+        on_done = MagicMock()
+        progress = MagicMock()
+
+        assert manager.add(
+            [("/wf", str(tmp_path / "wf")), ("/single.txt", str(tmp_path / "s.txt"))],
+            on_done,
+        )
+        manager.run(progress)
+
+        on_done.assert_called_once_with([])
+        assert (tmp_path / "wf" / "job1" / "sub" / "log.txt").read_bytes() == b"b" * 10
+        assert (tmp_path / "wf" / "job2" / "out.txt").read_bytes() == b"c" * 500
+        assert (tmp_path / "s.txt").read_bytes() == b"single"
+        assert not list(tmp_path.rglob("*" + PART_SUFFIX))
+        assert not list(tmp_path.rglob("*" + PART_VERSION_SUFFIX))
+        assert progress.call_args[0] == (1516, 1516)
+        assert all(channel.closed for channel in channels if channel.offsets)
+
+        # A finished manager does not accept new files anymore
+        assert not manager.add([("/single.txt", str(tmp_path / "x"))])
+
+    def test_retry_resumes_at_offset(self, tmp_path, remote_files):
+        """A broken transfer is resumed at the size of the partial file."""
+        failing = FakeChannel(remote_files, failures={"/wf/job1/out.txt": 400})
+        second = FakeChannel(remote_files)
+        manager = _manager([failing, second], max_workers=1)
+        manager._cancel.wait = MagicMock(return_value=False)
+        progress = MagicMock()
+        on_done = MagicMock()
+
+        manager.add([("/wf/job1/out.txt", str(tmp_path / "out.txt"))], on_done)
+        manager.run(progress)
+
+        on_done.assert_called_once_with([])
+        assert failing.offsets == [("/wf/job1/out.txt", 0)]
+        assert second.offsets == [("/wf/job1/out.txt", 400)]
+        assert (tmp_path / "out.txt").read_bytes() == b"a" * 1000
+        assert progress.call_args[0] == (1000, 1000)
+
+    def test_resume_existing_part_file(self, tmp_path, remote_files):
+        """Part files of earlier sessions are resumed."""
+        (tmp_path / ("out.txt" + PART_SUFFIX)).write_bytes(b"c" * 100)
+        (tmp_path / ("out.txt" + PART_VERSION_SUFFIX)).write_text("500 100\n")
+        channel = FakeChannel(remote_files)
+        manager = _manager([channel], max_workers=1)
+
+        manager.add([("/wf/job2/out.txt", str(tmp_path / "out.txt"))])
+        manager.run()
+
+        assert channel.offsets == [("/wf/job2/out.txt", 100)]
+        assert (tmp_path / "out.txt").read_bytes() == b"c" * 500
+        assert not (tmp_path / ("out.txt" + PART_VERSION_SUFFIX)).exists()
+
+    @pytest.mark.parametrize("version", [None, "500 99\n", "400 100\n"])
+    def test_restart_changed_part_file(self, tmp_path, remote_files, version):
+        """Part files of remote files, which changed since, are downloaded again."""
+        (tmp_path / ("out.txt" + PART_SUFFIX)).write_bytes(b"x" * 100)
+        if version is not None:
+            (tmp_path / ("out.txt" + PART_VERSION_SUFFIX)).write_text(version)
+        channel = FakeChannel(remote_files)
+        manager = _manager([channel], max_workers=1)
+
+        manager.add([("/wf/job2/out.txt", str(tmp_path / "out.txt"))])
+        manager.run()
+
+        assert channel.offsets == [("/wf/job2/out.txt", 0)]
+        assert (tmp_path / "out.txt").read_bytes() == b"c" * 500
+
+    def test_retries_exhausted(self, tmp_path, remote_files):
+        """Errors are reported to on_done after all retries failed."""
+        channels = [
+            FakeChannel(remote_files, failures={"/single.txt": 0}) for _ in range(2)
+        ]
+        manager = _manager(channels, max_workers=1, retries=2)
+        manager._cancel.wait = MagicMock(return_value=False)
+        on_done = MagicMock()
+
+        manager.add([("/single.txt", str(tmp_path / "s.txt"))], on_done)
+        manager.run()
+
+        errors = on_done.call_args[0][0]
+        assert len(errors) == 1
+        assert isinstance(errors[0], EOFError)
+        assert not os.path.exists(tmp_path / "s.txt")
+
+    def test_cancel(self, tmp_path, remote_files):
+        """Cancelled managers do not download anything."""
+        channel = FakeChannel(remote_files)
+        manager = _manager([channel], max_workers=1)
+        on_done = MagicMock()
+        manager.add([("/single.txt", str(tmp_path / "s.txt"))], on_done)
+        manager.cancel()
+        manager.run()
+
+        assert channel.offsets == []
+        assert len(on_done.call_args[0][0]) == 1
+
+
+def _tar_stream(members):
+    """Returns a stdout mock streaming a gzipped tar of {name: data}."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in members.items():
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+    buffer.seek(0)
+    stdout = MagicMock()
+    stdout.read.side_effect = buffer.read
+    stdout.channel.recv_exit_status.return_value = 0
+    return stdout
+
+
+class TestDownloadArchive:
+    """Tests for DownloadManager.download_archive."""
+
+    @patch("simstack.lib.DownloadManager.exec_remote_command")
+    @patch("simstack.lib.DownloadManager.get_ssh_client")
+    def test_download_archive(self, mock_client, mock_exec, tmp_path):
+        """The subtree is unpacked from a single stream."""
+        cm = MagicMock()
+        mock_exec.return_value = (0, b"15\n", b"")
+        stdout = _tar_stream(
+            {
+                "./ForEach/0/outputs/a.txt": b"a" * 5,
+                "./ForEach/1/outputs/b.txt": b"b" * 10,
+            }
+        )
+        stderr = MagicMock()
+        stderr.read.return_value = b""
+        client = mock_client.return_value
+        client.exec_command.return_value = (MagicMock(), stdout, stderr)
+        progress = MagicMock()
+
+        manager = DownloadManager(cm)
+        result = manager.download_archive(
+            "/calc/wf", str(tmp_path), "ForEach/*/outputs/*", progress
+        )
+
+        assert result == 2
+        assert (
+            tmp_path / "ForEach" / "1" / "outputs" / "b.txt"
+        ).read_bytes() == b"b" * 10
+        assert progress.call_args[0] == (15, 15)
+        command = client.exec_command.call_args[0][0]
+        assert "cd /calc/wf && find . -type f -path './ForEach/*/outputs/*'" in command
+        assert "tar --null --no-recursion -czf - -T -" in command
+
+    @patch("simstack.lib.DownloadManager.exec_remote_command")
+    @patch("simstack.lib.DownloadManager.get_ssh_client")
+    def test_download_archive_unsafe_path(self, mock_client, mock_exec, tmp_path):
+        """Members outside of the target directory are rejected."""
+        mock_exec.return_value = (0, b"1\n", b"")
+        stdout = _tar_stream({"../evil.txt": b"x"})
+        mock_client.return_value.exec_command.return_value = (
+            MagicMock(),
+            stdout,
+            MagicMock(),
+        )
+
+        with pytest.raises(OSError):
+            DownloadManager(MagicMock()).download_archive(
+                "/calc/wf", str(tmp_path / "target")
+            )
+        stdout.channel.close.assert_called_once()
+        assert not (tmp_path / "evil.txt").exists()
+
+    @patch("simstack.lib.DownloadManager.get_ssh_client", return_value=None)
+    def test_download_archive_without_ssh(self, mock_client, tmp_path, remote_files):
+        """Without SSH connection the files are downloaded one by one."""
+        manager = _manager([FakeChannel(remote_files)], max_workers=1)
+        with patch(
+            "simstack.lib.DownloadManager._ClusterManagerDownloadChannel",
+            return_value=FakeChannel(remote_files),
+        ):
+            result = manager.download_archive("/wf", str(tmp_path), "job1/*")
+
+        assert result == 2
+        assert (tmp_path / "job1" / "sub" / "log.txt").read_bytes() == b"b" * 10
+        assert not (tmp_path / "job2").exists()
+
+
+class TestTransferRate:
+    """Tests for the TransferRate class."""
+
+    def test_status_message(self):
+        """Throughput and remaining time are computed from the updates."""
+        clock = MagicMock(side_effect=[0.0, 1.0, 2.0])
+        rate = TransferRate(smoothing=1.0, clock=clock)
+        rate.update(0, 10_000_000)
+        assert rate.update(2_000_000, 10_000_000) == (2_000_000, 4.0)
+
+        message = rate.status_message("Downloading", 4_000_000, 10_000_000)
+        assert message == "Downloading 4.0 / 10.0 MB at 2.0 MB/s, 0:03 remaining"
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock
+
+from simstack.lib.IdlePrefetcher import IdlePrefetcher
+
+
+def test_prefetch_until_done(qtbot):
+    """prefetch_next is called until it returns False."""
+    prefetch_next = MagicMock(side_effect=[True, True, False])
+    prefetcher = IdlePrefetcher(prefetch_next, delay=0, interval=0)
+    prefetcher.start()
+    assert prefetcher.is_active()
+
+    qtbot.waitUntil(lambda: prefetch_next.call_count == 3)
+    assert not prefetcher.is_active()
+
+
+def test_prefetch_stops_on_error(qtbot):
+    """Prefetching stops at the first error."""
+    prefetch_next = MagicMock(side_effect=RuntimeError("broken WaNo"))
+    prefetcher = IdlePrefetcher(prefetch_next, delay=0, interval=0)
+    prefetcher.start()
+
+    qtbot.waitUntil(lambda: prefetch_next.call_count == 1)
+    assert not prefetcher.is_active()
+
+
+def test_stop(qapp):
+    """Stopped prefetchers do nothing."""
+    prefetcher = IdlePrefetcher(MagicMock())
+    prefetcher.start()
+    prefetcher.stop()
+    assert not prefetcher.is_active()
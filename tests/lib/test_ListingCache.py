@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock
+
+from simstack.lib.ListingCache import (
+    DIRECTORY_LISTING,
+    WORKFLOW_JOB_LISTING,
+    ListingCache,
+)
+
+
+def _cache(now):
+    clock = MagicMock(side_effect=lambda: now[0])
+    return ListingCache(ttl=10, max_age=100, clock=clock)
+
+
+def test_fresh_stale_and_expired():
+    """Listings are fresh up to ttl, stale up to max_age and dropped afterwards."""
+    now = [0.0]
+    cache = _cache(now)
+    key = ListingCache.key(DIRECTORY_LISTING, "/calc/dir/")
+    assert key == (DIRECTORY_LISTING, "/calc/dir")
+    assert cache.get(key) == (None, False)
+
+    assert cache.put(key, [{"name": "a"}])
+    assert cache.get(key) == ([{"name": "a"}], True)
+
+    now[0] = 50.0
+    assert cache.get(key) == ([{"name": "a"}], False)
+
+    now[0] = 150.0
+    assert cache.get(key) == (None, False)
+
+
+def test_put_reports_changes():
+    """put returns whether the listing differs from the cached one."""
+    cache = _cache([0.0])
+    key = ListingCache.key(DIRECTORY_LISTING, "/calc")
+    assert cache.put(key, ["a"])
+    assert not cache.put(key, ["a"])
+    assert cache.put(key, ["a", "b"])
+
+
+def test_returned_listings_are_copies():
+    """Callers may sort returned listings without changing the cache."""
+    cache = _cache([0.0])
+    key = ListingCache.key(DIRECTORY_LISTING, "/calc")
+    cache.put(key, ["b", "a"])
+    cache.get(key)[0].sort()
+    assert cache.get(key)[0] == ["b", "a"]
+
+
+def test_invalidate():
+    """Modifying a path drops its own, its parent's and all nested listings."""
+    cache = _cache([0.0])
+    paths = ["/calc", "/calc/wf", "/calc/wf/job", "/calc/other", "/calc/wf2"]
+    for path in paths:
+        cache.put(ListingCache.key(DIRECTORY_LISTING, path), [path])
+    cache.put(ListingCache.key(WORKFLOW_JOB_LISTING, "/calc/wf"), ["job"])
+
+    cache.invalidate("/calc/wf/")
+
+    remaining = [p for p in paths if cache.get((DIRECTORY_LISTING, p))[0]]
+    assert remaining == ["/calc/other", "/calc/wf2"]
+    assert cache.get((WORKFLOW_JOB_LISTING, "/calc/wf")) == (None, False)
+
+
+def test_paths():
+    """Cached paths are listed per kind."""
+    cache = _cache([0.0])
+    cache.put(ListingCache.key(DIRECTORY_LISTING, "/calc"), [])
+    cache.put(ListingCache.key(WORKFLOW_JOB_LISTING, "wf1"), [])
+    cache.put(ListingCache.key(WORKFLOW_JOB_LISTING, "wf2/"), [])
+    assert sorted(cache.paths(WORKFLOW_JOB_LISTING)) == ["wf1", "wf2"]
+
+
+def test_expire():
+    """Expired listings are kept, but not fresh anymore."""
+    cache = _cache([0.0])
+    key = ListingCache.key(DIRECTORY_LISTING, "/calc")
+    cache.put(key, ["a"])
+    cache.expire()
+    assert cache.get(key) == (["a"], False)
@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+from simstack.lib.Placeholders import PlaceholderSubstitution
+
+
+REPLACEMENTS = {
+    "c9m:": "",
+    "${STORAGE}/": "",
+    "${SUBMIT_NAME}": "submit",
+    "${BASEFOLDER}": "/calc/base/submit",
+    "${QUEUE}": "slurm",
+    "${QUEUE_NAME}": "default",
+}
+
+XML = (
+    "<Workflow storage='${BASEFOLDER}' queue='${QUEUE}'>\n"
+    "  <file>c9m:${STORAGE}/workflow_data/äöü/${SUBMIT_NAME}.txt</file>\n"
+    "  <queue>${QUEUE_NAME}</queue>\n"
+    "</Workflow>\n"
+)
+
+
+def _chained(text):
+    for placeholder, replacement in REPLACEMENTS.items():
+        text = text.replace(placeholder, replacement)
+    return text
+
+
+def test_substitute():
+    """All placeholders are replaced like chained str.replace calls."""
+    substitution = PlaceholderSubstitution(REPLACEMENTS)
+    assert substitution.substitute(XML.encode()).decode() == _chained(XML)
+
+
+def test_write_chunk_boundaries():
+    """Chunks never split placeholders or characters."""
+    substitution = PlaceholderSubstitution(REPLACEMENTS)
+    for chunk_size in range(1, 40):
+        outfile = io.StringIO()
+        substitution.write(outfile, XML.encode(), chunk_size=chunk_size)
+        assert outfile.getvalue() == _chained(XML), chunk_size
+
+
+def test_invalid_placeholder():
+    """Placeholders must not span chunks."""
+    with pytest.raises(ValueError):
+        PlaceholderSubstitution({"<tag>": ""})
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from simstack.lib.RemoteListing import list_dirs
+
+
+def _find_output(*entries):
+    return "".join("%s\0%s\0%s\0%s\0" % entry for entry in entries).encode()
+
+
+@pytest.fixture
+def cm():
+    cm = MagicMock()
+    cm.get_calculation_basepath.return_value = "/calc"
+    return cm
+
+
+@patch("simstack.lib.RemoteListing.get_ssh_client")
+@patch("simstack.lib.RemoteListing.exec_remote_command")
+def test_list_dirs(mock_exec, mock_client, cm):
+    """Several paths and their subdirectories are listed with one find."""
+    mock_exec.return_value = (
+        0,
+        _find_output(
+            ("d", "d", "/calc/wf", "job"),
+            ("f", "f", "/calc/wf", "job/out.txt"),
+            ("d", "d", "/calc/wf", "job/empty"),
+            ("l", "d", "/calc/wf", "link"),
+            ("f", "f", "/abs/dir", "a.txt"),
+        ),
+        b"",
+    )
+
+    listings = list_dirs(cm, ["wf", "/abs/dir", "wf"], depth=2)
+
+    command = mock_exec.call_args[0][1]
+    assert command.startswith("find /calc/wf /abs/dir -mindepth 1 -maxdepth 2 ")
+    assert listings == {
+        "wf": [
+            {"name": "job", "path": "/calc/wf", "type": "d"},
+            {"name": "link", "path": "/calc/wf", "type": "d"},
+        ],
+        "wf/job": [
+            {"name": "out.txt", "path": "/calc/wf/job", "type": "f"},
+            {"name": "empty", "path": "/calc/wf/job", "type": "d"},
+        ],
+        "/abs/dir": [{"name": "a.txt", "path": "/abs/dir", "type": "f"}],
+    }
+
+
+@patch("simstack.lib.RemoteListing.get_ssh_client")
+@patch("simstack.lib.RemoteListing.exec_remote_command")
+def test_list_dirs_depth_one(mock_exec, mock_client, cm):
+    """Empty directories have an empty listing, nested ones none at depth 1."""
+    mock_exec.return_value = (0, _find_output(("d", "d", "/calc/a", "sub")), b"")
+    assert list_dirs(cm, ["/calc/a", "/calc/b"]) == {
+        "/calc/a": [{"name": "sub", "path": "/calc/a", "type": "d"}],
+        "/calc/b": [],
+    }
+
+
+@patch("simstack.lib.RemoteListing.get_ssh_client")
+@patch("simstack.lib.RemoteListing.exec_remote_command")
+def test_list_dirs_errors(mock_exec, mock_client, cm):
+    """Failing paths are left out, if others could be listed."""
+    mock_exec.return_value = (1, _find_output(("f", "f", "/calc/a", "x")), b"error")
+    assert list(list_dirs(cm, ["/calc/a", "/calc/missing"])) == ["/calc/a"]
+
+    mock_exec.return_value = (1, b"", b"No such file or directory")
+    with pytest.raises(OSError):
+        list_dirs(cm, ["/calc/missing"])
+
+
+@patch("simstack.lib.RemoteListing.get_ssh_client", return_value=None)
+def test_list_dirs_without_ssh(mock_client, cm):
+    """Without SSH connection every directory is listed with list_dir."""
+    contents = {
+        "/calc/a": [{"name": "sub", "path": "/calc/a", "type": "d"}],
+        "/calc/a/sub": [{"name": "x", "path": "/calc/a/sub", "type": "f"}],
+    }
+    cm.list_dir.side_effect = contents.get
+    assert list_dirs(cm, ["/calc/a"], depth=3) == contents
@@ -0,0 +1,114 @@
+import hashlib
+import os
+
+from simstack.lib.RenderCache import (
+    RenderCache,
+    copy_exec_module,
+    update_digest_with_tree,
+)
+
+
+class _Resources:
+    def __init__(self):
+        self.queue = None
+
+
+class _ExecModule:
+    def __init__(self):
+        self._field_values = {
+            "name": "wano",
+            "resources": _Resources(),
+            "outputs": ["out.txt"],
+        }
+
+    @property
+    def resources(self):
+        return self._field_values["resources"]
+
+    def set_path(self, path):
+        self._field_values["path"] = path
+
+
+def _render(folder, text="rendered"):
+    folder.mkdir()
+    (folder / "sub").mkdir()
+    (folder / "input.txt").write_text(text)
+    (folder / "sub" / "data.txt").write_text("data")
+    return folder
+
+
+def _digest(folder, contents=True):
+    digest = hashlib.blake2b()
+    update_digest_with_tree(digest, folder, contents=contents)
+    return digest.hexdigest()
+
+
+def test_update_digest_with_tree(tmp_path):
+    """Digests change with file names and contents."""
+    folder = _render(tmp_path / "wano")
+    before = _digest(folder)
+    assert _digest(folder) == before
+
+    (folder / "input.txt").write_text("changed")
+    changed = _digest(folder)
+    assert changed != before
+    (folder / "input.txt").rename(folder / "other.txt")
+    assert _digest(folder) != changed
+
+    stat_only = _digest(folder, contents=False)
+    (folder / "other.txt").write_text("longer content")
+    assert _digest(folder, contents=False) != stat_only
+
+
+def test_get_links_cached_files(tmp_path):
+    """Hits link the rendered files into the new directory."""
+    cache = RenderCache()
+    source = _render(tmp_path / "first")
+    target = tmp_path / "second"
+    target.mkdir()
+    assert cache.get("key", target) is None
+
+    cache.put("key", source, "jsdl", _ExecModule())
+    jsdl, wem = cache.get("key", target)
+    assert jsdl == "jsdl"
+    assert wem._field_values["name"] == "wano"
+    assert (target / "sub" / "data.txt").read_text() == "data"
+    assert os.path.samefile(target / "input.txt", source / "input.txt")
+
+
+def test_get_modified_source(tmp_path):
+    """Entries with modified or deleted files are dropped."""
+    cache = RenderCache()
+    source = _render(tmp_path / "first")
+    cache.put("key", source, "jsdl", _ExecModule())
+
+    (source / "input.txt").write_text("modified by someone else")
+    assert cache.get("key", tmp_path) is None
+    assert len(cache) == 0
+
+
+def test_max_entries(tmp_path):
+    """The least recently used entries are dropped."""
+    cache = RenderCache(max_entries=2)
+    source = _render(tmp_path / "first")
+    cache.put("a", source, None, _ExecModule())
+    cache.put("b", source, None, _ExecModule())
+    target = tmp_path / "target"
+    target.mkdir()
+    assert cache.get("a", target) is not None
+
+    cache.put("c", source, None, _ExecModule())
+    assert len(cache) == 2
+    assert cache.get("b", tmp_path / "other") is None
+
+
+def test_copy_exec_module():
+    """Copies share all fields with the original except the resources."""
+    wem = _ExecModule()
+    mywem = copy_exec_module(wem)
+
+    mywem.resources.queue = "default"
+    mywem.set_path("wf/wano")
+    assert wem.resources.queue is None
+    assert "path" not in wem._field_values
+    assert mywem._field_values["outputs"] is wem._field_values["outputs"]
@@ -0,0 +1,125 @@
+import threading
+
+from unittest.mock import MagicMock
+
+from simstack.lib.RequestExecutor import (
+    CONTROL_LANE,
+    TRANSFER_LANE,
+    RequestExecutor,
+    current_request,
+)
+
+
+def test_submit_runs_off_calling_thread():
+    """Requests are executed on a pool thread."""
+    executor = RequestExecutor()
+    threads = []
+    request = executor.submit(
+        "registry", CONTROL_LANE, lambda: threads.append(threading.get_ident())
+    )
+    assert request.wait(5)
+    assert threads and threads[0] != threading.get_ident()
+    assert executor.wait(5000)
+
+
+def test_control_lane_is_serial():
+    """Control requests of one registry never run concurrently."""
+    executor = RequestExecutor()
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            running.append(1)
+            if len(running) > 1:
+                overlaps.append(1)
+        threading.Event().wait(0.01)
+        with lock:
+            running.pop()
+
+    requests = [executor.submit("registry", CONTROL_LANE, job) for _ in range(5)]
+    assert all(r.wait(5) for r in requests)
+    assert overlaps == []
+
+
+def test_transfer_lane_is_parallel():
+    """Transfer requests of one registry run concurrently."""
+    executor = RequestExecutor(max_transfer_workers=3)
+    barrier = threading.Barrier(3, timeout=5)
+    requests = [
+        executor.submit("registry", TRANSFER_LANE, barrier.wait) for _ in range(3)
+    ]
+    assert all(r.wait(5) for r in requests)
+    assert not barrier.broken
+
+
+def test_cancel_pending_request():
+    """Pending requests are removed from the pool and never run."""
+    executor = RequestExecutor()
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    executor.submit("registry", CONTROL_LANE, blocker)
+    assert started.wait(5)
+    pending = MagicMock()
+    request = executor.submit("registry", CONTROL_LANE, pending)
+    request.cancel()
+    assert request.is_done()
+    release.set()
+    assert executor.wait(5000)
+    pending.assert_not_called()
+
+
+def test_cancel_running_request():
+    """Cancel hooks of running requests are called."""
+    executor = RequestExecutor()
+    hook = MagicMock()
+    started = threading.Event()
+    cancelled = threading.Event()
+
+    def job():
+        request = current_request()
+        request.add_cancel_hook(hook)
+        request.add_cancel_hook(cancelled.set)
+        started.set()
+        cancelled.wait(5)
+
+    request = executor.submit("registry", TRANSFER_LANE, job)
+    assert started.wait(5)
+    executor.cancel("registry")
+    assert request.wait(5)
+    assert request.cancelled
+    hook.assert_called_once()
+    assert current_request() is None
+
+
+def test_exception_does_not_kill_pool():
+    """Exceptions in requests are printed and the pool continues."""
+
+    def fail():
+        raise ValueError("expected")
+
+    executor = RequestExecutor()
+    assert executor.submit("registry", CONTROL_LANE, fail).wait(5)
+    ok = MagicMock()
+    assert executor.submit("registry", CONTROL_LANE, ok).wait(5)
+    ok.assert_called_once()
+
+
+def test_is_busy():
+    """Registries are busy, while requests are pending or running."""
+    executor = RequestExecutor()
+    release = threading.Event()
+    request = executor.submit("registry", TRANSFER_LANE, release.wait, 5)
+    assert executor.is_busy("registry")
+    assert not executor.is_busy("other")
+
+    release.set()
+    assert request.wait(5)
+    assert executor.wait(5000)
+    assert not executor.is_busy("registry")
@@ -0,0 +1,49 @@
+from unittest.mock import MagicMock
+
+from SimStackServer.MessageTypes import JobStatus
+
+from simstack.lib.StatusPoller import StatusPoller, status_changes
+
+
+def test_status_changes():
+    """Only entries in both listings with a different status are reported."""
+    old = [
+        {"id": "a", "status": JobStatus.RUNNING},
+        {"id": "b", "status": JobStatus.QUEUED},
+        {"id": "c", "status": JobStatus.RUNNING},
+    ]
+    new = [
+        {"id": "b", "status": JobStatus.RUNNING},
+        {"id": "c", "status": JobStatus.RUNNING},
+        {"id": "d", "status": JobStatus.QUEUED},
+        {"name": "without id"},
+    ]
+    assert status_changes(old, new) == [("b", JobStatus.RUNNING)]
+
+
+def test_backoff(qapp):
+    """The interval doubles without changes and starts over with changes."""
+    poll = MagicMock()
+    poller = StatusPoller(poll, min_interval=5, max_interval=30)
+    poller.start()
+    assert poller.is_active()
+
+    intervals = []
+    for changed in [False, False, False, False, True]:
+        poller._StatusPoller__timeout()
+        poller.poll_finished(changed)
+        intervals.append(poller.interval())
+    assert intervals == [10, 20, 30, 30, 5]
+    assert poll.call_count == 5
+
+    poller.poll_finished(False)
+    poller._StatusPoller__timeout()
+    poller.poll_finished(False)
+    poller.reset()
+    assert poller.interval() == 5
+
+    # Results arriving after stop don't restart polling
+    poller._StatusPoller__timeout()
+    poller.stop()
+    poller.poll_finished(True)
+    assert not poller.is_active()
@@ -0,0 +1,292 @@
+import io
+import tarfile
+import threading
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from simstack.lib.TransferEngine import (
+    TransferEngine,
+    TransferCancelled,
+    resolve_remote_path,
+    exec_remote_command,
+    get_ssh_client,
+)
+
+
+@pytest.fixture
+def local_files(tmp_path):
+    """Create a few local files of known size."""
+    files = []
+    for i in range(10):
+        myfile = tmp_path / ("file%d.txt" % i)
+        myfile.write_bytes(b"x" * (100 + i))
+        files.append(str(myfile))
+    return files
+
+
+@pytest.fixture
+def ssh_cm():
+    """A ClusterManager mock with a paramiko client."""
+    cm = MagicMock()
+    cm.get_calculation_basepath.return_value = "/calc/base"
+    stdout = MagicMock()
+    stdout.read.return_value = b""
+    stdout.channel.recv_exit_status.return_value = 0
+    stderr = MagicMock()
+    stderr.read.return_value = b""
+    cm._ssh_client.exec_command.return_value = (MagicMock(), stdout, stderr)
+    return cm
+
+
+class TestHelpers:
+    """Tests for the module level helpers."""
+
+    def test_resolve_remote_path_relative(self, ssh_cm):
+        """Relative paths are resolved against the calculation basepath."""
+        assert resolve_remote_path(ssh_cm, "sub\\file") == "/calc/base/sub/file"
+
+    def test_resolve_remote_path_absolute(self, ssh_cm):
+        """Absolute paths are kept."""
+        assert resolve_remote_path(ssh_cm, "/abs/file") == "/abs/file"
+
+    def test_get_ssh_client_local(self):
+        """LocalClusterManagers never provide a client."""
+        with patch("simstack.lib.TransferEngine.LocalClusterManager", MagicMock):
+            assert get_ssh_client(MagicMock()) is None
+
+    def test_exec_remote_command(self, ssh_cm):
+        """exec_remote_command waits for the exit status."""
+        status, out, err = exec_remote_command(ssh_cm, "true")
+        assert status == 0
+        ssh_cm._ssh_client.exec_command.assert_called_once_with("true")
+
+    def test_exec_remote_command_without_client(self):
+        """A ConnectionError is raised, if there is no ssh client."""
+        cm = MagicMock()
+        cm._ssh_client = None
+        with pytest.raises(ConnectionError):
+            exec_remote_command(cm, "true")
+
+
+class TestTransferEngine:
+    """Tests for the TransferEngine class."""
+
+    def test_make_dirs_batched(self, ssh_cm):
+        """Directories are created with a single remote mkdir."""
+        engine = TransferEngine(ssh_cm)
+        engine.make_dirs(["a/b", "a/b", "c", ""])
+
+        ssh_cm._ssh_client.exec_command.assert_called_once_with(
+            "mkdir -p -- /calc/base/a/b /calc/base/c"
+        )
+        ssh_cm.mkdir_p.assert_not_called()
+
+    def test_make_dirs_failure(self, ssh_cm):
+        """A failing mkdir raises an OSError."""
+        _, stdout, stderr = ssh_cm._ssh_client.exec_command.return_value
+        stdout.channel.recv_exit_status.return_value = 1
+        stderr.read.return_value = b"Permission denied"
+        engine = TransferEngine(ssh_cm)
+        with pytest.raises(OSError, match="Permission denied"):
+            engine.make_dirs(["a"])
+
+    def test_make_dirs_local(self):
+        """Without SSH client, mkdir_p is used once per directory."""
+        cm = MagicMock()
+        cm._ssh_client = None
+        engine = TransferEngine(cm)
+        engine.make_dirs(["a", "b", "a"])
+        assert cm.mkdir_p.call_count == 2
+
+    @patch("simstack.lib.TransferEngine.paramiko")
+    def test_upload_parallel(self, mock_paramiko, ssh_cm, local_files):
+        """All files are uploaded over several SFTP channels."""
+        sftp_clients = []
+        lock = threading.Lock()
+
+        def make_sftp(transport):
+            sftp = MagicMock()
+
+            def put(local, remote, callback):
+                size = len(open(local, "rb").read())
+                callback(size // 2, size)
+                callback(size, size)
+
+            sftp.put.side_effect = put
+            with lock:
+                sftp_clients.append(sftp)
+            return sftp
+
+        mock_paramiko.SFTPClient.from_transport.side_effect = make_sftp
+        progress_callback = MagicMock()
+
+        pairs = [
+            (f, "submit/workflow_data/%d.txt" % i) for i, f in enumerate(local_files)
+        ]
+        engine = TransferEngine(ssh_cm, max_workers=3, queue_size=2)
+        engine.upload(pairs, progress_callback=progress_callback)
+
+        assert len(sftp_clients) == 3
+        uploaded = sorted(
+            call.args[1] for sftp in sftp_clients for call in sftp.put.call_args_list
+        )
+        assert uploaded == sorted("/calc/base/" + remote for _, remote in pairs)
+        for sftp in sftp_clients:
+            sftp.close.assert_called_once()
+
+        total = sum(100 + i for i in range(10))
+        assert progress_callback.call_args[0] == (total, total)
+        ssh_cm._ssh_client.exec_command.assert_called_once_with(
+            "mkdir -p -- /calc/base/submit/workflow_data"
+        )
+
+    @patch("simstack.lib.TransferEngine.paramiko")
+    def test_upload_error_is_raised(self, mock_paramiko, ssh_cm, local_files):
+        """Errors in workers are raised in the calling thread."""
+        sftp = MagicMock()
+        sftp.put.side_effect = OSError("Broken pipe")
+        mock_paramiko.SFTPClient.from_transport.return_value = sftp
+
+        engine = TransferEngine(ssh_cm, max_workers=2, queue_size=1)
+        with pytest.raises(OSError, match="Broken pipe"):
+            engine.upload([(f, "remote/%s" % i) for i, f in enumerate(local_files)])
+
+    def test_upload_local_channel(self, local_files):
+        """Without SSH client, put_file of the ClusterManager is used."""
+        cm = MagicMock()
+        cm._ssh_client = None
+        progress_callback = MagicMock()
+        engine = TransferEngine(cm, max_workers=2)
+        engine.upload(
+            [(local_files[0], "a/0.txt"), (local_files[1], "b/1.txt")],
+            progress_callback=progress_callback,
+        )
+        assert cm.put_file.call_count == 2
+        assert cm.mkdir_p.call_count == 2
+        assert progress_callback.call_args[0] == (201, 201)
+
+    def test_upload_empty(self, ssh_cm):
+        """Nothing happens for an empty upload."""
+        TransferEngine(ssh_cm).upload([])
+        ssh_cm._ssh_client.exec_command.assert_not_called()
+
+    def test_upload_cancelled(self, local_files):
+        """A cancelled engine raises TransferCancelled."""
+        cm = MagicMock()
+        cm._ssh_client = None
+        engine = TransferEngine(cm)
+        engine.cancel()
+        with pytest.raises(TransferCancelled):
+            engine.upload([(local_files[0], "a/0.txt")])
+        cm.put_file.assert_not_called()
+
+
+class _FakeStdin(io.BytesIO):
+    """Collects the bytes written to a remote command."""
+
+    def __init__(self):
+        super().__init__()
+        self.channel = MagicMock()
+
+
+def _remote_result(status=0, out=b"", err=b""):
+    stdout = MagicMock()
+    stdout.read.return_value = out
+    stdout.channel.recv_exit_status.return_value = status
+    stderr = MagicMock()
+    stderr.read.return_value = err
+    return stdout, stderr
+
+
+class TestUploadArchive:
+    """Tests for the archive based upload."""
+
+    def _setup_remote(self, ssh_cm, local_files, find_out=None):
+        stdin = _FakeStdin()
+        if find_out is None:
+            find_out = "".join(
+                "%d %s/%s\n" % (100 + i, "sub" if i % 2 else "top", "f%d" % i)
+                for i in range(len(local_files))
+            ).encode()
+        tar_out, tar_err = _remote_result()
+        find_stdout, find_stderr = _remote_result(out=find_out)
+        ssh_cm._ssh_client.exec_command.side_effect = [
+            (stdin, tar_out, tar_err),
+            (MagicMock(), find_stdout, find_stderr),
+        ]
+        return stdin
+
+    def _pairs(self, local_files):
+        return [
+            (f, "submit/workflow_data/%s/f%d" % ("sub" if i % 2 else "top", i))
+            for i, f in enumerate(local_files)
+        ]
+
+    def test_upload_archive(self, ssh_cm, local_files):
+        """All files are streamed as one tar.gz and verified afterwards."""
+        stdin = self._setup_remote(ssh_cm, local_files)
+        progress_callback = MagicMock()
+
+        engine = TransferEngine(ssh_cm)
+        engine.upload_archive(
+            self._pairs(local_files),
+            "submit/workflow_data",
+            progress_callback=progress_callback,
+        )
+
+        commands = [c.args[0] for c in ssh_cm._ssh_client.exec_command.call_args_list]
+        assert commands[0] == (
+            "mkdir -p -- /calc/base/submit/workflow_data && "
+            "tar -xzf - -C /calc/base/submit/workflow_data"
+        )
+        assert commands[1].startswith("cd /calc/base/submit/workflow_data && find")
+        stdin.channel.shutdown_write.assert_called_once()
+
+        with tarfile.open(fileobj=io.BytesIO(stdin.getvalue()), mode="r:gz") as tar:
+            names = sorted(tar.getnames())
+            assert tar.extractfile("sub/f1").read() == b"x" * 101
+        assert names == sorted(
+            remote.split("/", 2)[2] for _, remote in self._pairs(local_files)
+        )
+
+        total = sum(100 + i for i in range(10))
+        assert progress_callback.call_args[0] == (total, total)
+
+    def test_upload_archive_incomplete(self, ssh_cm, local_files):
+        """Missing files on the remote raise an OSError."""
+        self._setup_remote(ssh_cm, local_files, find_out=b"100 top/f0\n")
+        engine = TransferEngine(ssh_cm)
+        with pytest.raises(OSError, match="incomplete"):
+            engine.upload_archive(self._pairs(local_files), "submit/workflow_data")
+
+    def test_upload_archive_with_copied_files(self, ssh_cm, local_files):
+        """Files copied from the blob store next to the archive are accepted."""
+        pairs = self._pairs(local_files)
+        find_out = b"".join(
+            b"%d %s\n" % (100 + i, remote.split("/", 2)[2].encode())
+            for i, (_, remote) in enumerate(pairs)
+        )
+        find_out += b"2000000 top/copied.dat\n"
+        self._setup_remote(ssh_cm, local_files, find_out=find_out)
+
+        engine = TransferEngine(ssh_cm)
+        engine.upload_archive(pairs, "submit/workflow_data")
+
+    def test_upload_archive_size_mismatch(self, ssh_cm, local_files):
+        """Files with wrong size on the remote raise an OSError."""
+        find_out = b"".join(
+            b"1 %s\n" % remote.split("/", 2)[2].encode()
+            for _, remote in self._pairs(local_files)
+        )
+        self._setup_remote(ssh_cm, local_files, find_out=find_out)
+        engine = TransferEngine(ssh_cm)
+        with pytest.raises(OSError, match="corrupt"):
+            engine.upload_archive(self._pairs(local_files), "submit/workflow_data")
+
+    def test_upload_archive_outside_target(self, ssh_cm, local_files):
+        """Remote files outside of the target directory are rejected."""
+        engine = TransferEngine(ssh_cm)
+        with pytest.raises(ValueError):
+            engine.upload_archive([(local_files[0], "elsewhere/f0")], "submit")
+        ssh_cm._ssh_client.exec_command.assert_not_called()
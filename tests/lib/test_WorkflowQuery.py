@@ -0,0 +1,60 @@
+import datetime
+import re
+
+import pytest
+
+from SimStackServer.MessageTypes import JobStatus
+
+from simstack.lib.WorkflowQuery import WorkflowQuery, submit_time
+
+
+@pytest.fixture
+def workflows():
+    return [
+        {"name": "2024-03-01-10h00m00s-Relax", "status": JobStatus.RUNNING},
+        {"name": "2024-02-01-10h00m00s-relax_Nr_1", "status": JobStatus.FAILED},
+        {"name": "2023-12-24-18h30m00s-Deposit", "status": JobStatus.SUCCESSFUL},
+        {"name": "unnamed", "status": JobStatus.SUCCESSFUL},
+    ]
+
+
+def _names(workflows):
+    return [wf["name"][21:] or wf["name"] for wf in workflows]
+
+
+def test_submit_time():
+    """The submission time is parsed from the name prefix."""
+    assert submit_time("2024-03-01-10h05m09s-Relax") == datetime.datetime(
+        2024, 3, 1, 10, 5, 9
+    )
+    assert submit_time("Relax") is None
+
+
+def test_empty_query(workflows):
+    """Queries without criteria match everything."""
+    query = WorkflowQuery()
+    assert query.is_empty()
+    assert query.filter(workflows) == workflows
+
+
+def test_name(workflows):
+    """Names are matched case insensitive, as substring or regex."""
+    assert _names(WorkflowQuery("relax").filter(workflows)) == ["Relax", "relax_Nr_1"]
+    assert _names(WorkflowQuery("Nr_.", regex=False).filter(workflows)) == []
+    assert _names(WorkflowQuery(r"relax$", regex=True).filter(workflows)) == ["Relax"]
+
+    with pytest.raises(re.error):
+        WorkflowQuery("(", regex=True)
+
+
+def test_status_and_date(workflows):
+    """Status and submission time criteria are combined."""
+    query = WorkflowQuery(
+        statuses=[JobStatus.SUCCESSFUL, JobStatus.RUNNING],
+        submitted_after=datetime.datetime(2023, 12, 1),
+    )
+    assert _names(query.filter(workflows)) == ["Relax", "Deposit"]
+    assert query == WorkflowQuery(
+        statuses=[JobStatus.RUNNING, JobStatus.SUCCESSFUL],
+        submitted_after=datetime.datetime(2023, 12, 1),
+    )
@@ -24,6 +24,7 @@ def test_setting_keys_values():
         "registry.is_default",
         "wanoRepo",
         "workflows",
+        "connectOnStartup",
     ]
 
     # Check that all expected keys are in SETTING_KEYS
@@ -49,3 +50,4 @@ def test_setting_keys_values():
     assert SETTING_KEYS["registry.is_default"] == "is_default"
     assert SETTING_KEYS["wanoRepo"] == "WaNo_Repository_Path"
     assert SETTING_KEYS["workflows"] == "workflow_path"
+    assert SETTING_KEYS["connectOnStartup"] == "connect_all_registries_on_startup"
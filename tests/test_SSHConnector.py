@@ -1,7 +1,21 @@
+import os
+import threading
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
+
+from SimStackServer.MessageTypes import ErrorCodes, JobStatus
 
-from simstack.SSHConnector import SSHConnector, OPERATIONS, ERROR
+from simstack.SSHConnector import (
+    SSHConnector,
+    OPERATIONS,
+    ERROR,
+    MAX_DT_WORKERS_PER_REGISTRY,
+    MAX_POOLED_CONNECTIONS,
+    POOL_IDLE_TIMEOUT,
+)
+from simstack.lib.ListingCache import WORKFLOW_LIST_KEY
+from simstack.lib.WorkflowQuery import WorkflowQuery
 
 
 # Skip the eagain_catcher tests as they require more complex mocking
@@ -28,6 +42,14 @@ def mock_qtcluster_provider():
         yield mock
 
 
+@pytest.fixture
+def mock_blobstore():
+    with patch("simstack.SSHConnector.BlobStore") as mock:
+        # Nothing is known to the blob store
+        mock.return_value.copy_known.side_effect = list
+        yield mock
+
+
 @pytest.fixture
 def mock_clustermanager():
     with patch("simstack.SSHConnector.ClusterManager") as mock:
@@ -57,7 +79,7 @@ def mock_local_clustermanager():
 @pytest.fixture
 def ssh_connector(mock_qtcluster_provider):
     with patch("simstack.SSHConnector.logging"):
-        connector = SSHConnector()
+        connector = SSHConnector(threaded=False)
         yield connector
 
 
@@ -162,6 +184,120 @@ class TestSSHConnector:
         with pytest.raises(TypeError):
             ssh_connector.connect_registry("test_registry")
 
+    def test_connect_registry_reuses_pooled_connection(
+        self, ssh_connector, mock_clustermanager
+    ):
+        """Test connect_registry keeps live connections, if reuse is set."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        registry = ssh_connector._registries["test_registry"]
+        callback = MagicMock()
+
+        # Call the method
+        ssh_connector.connect_registry("test_registry", callback, reuse=True)
+
+        # Verify
+        callback.assert_called_once_with(
+            registry.base_URI, ErrorCodes.NO_ERROR, "Connected."
+        )
+        cm_class.assert_not_called()
+        cm_instance.disconnect.assert_not_called()
+
+        # Dead connections are replaced
+        cm_instance._ssh_client.get_transport.return_value.is_active.return_value = (
+            False
+        )
+        with (
+            patch("simstack.SSHConnector.SimStackPaths"),
+            patch.object(ssh_connector, "start_server"),
+        ):
+            ssh_connector.connect_registry("test_registry", callback, reuse=True)
+        cm_instance.disconnect.assert_called_once()
+        cm_class.assert_called_once()
+
+    @patch("simstack.SSHConnector.time.monotonic", return_value=10000.0)
+    def test_evict_idle_connections(self, mock_monotonic, ssh_connector):
+        """Test unused connections are closed, busy and kept ones are not."""
+        # Setup
+        cms = {name: MagicMock() for name in "abcdef"}
+        ssh_connector._clustermanagers = dict(cms)
+        ssh_connector._last_used = {
+            "a": 10000.0,
+            "b": 10000.0 - POOL_IDLE_TIMEOUT - 1,
+            "c": 9900.0,
+            "d": 9800.0,
+            "e": 9700.0,
+            "f": 9600.0,
+        }
+        busy = {"b"}
+        evicted = MagicMock()
+        ssh_connector.connection_evicted.connect(evicted)
+
+        # Call the method
+        with patch.object(
+            ssh_connector._executor, "is_busy", side_effect=busy.__contains__
+        ):
+            ssh_connector._evict_idle_connections(keep="a")
+
+        # Verify the least recently used beyond MAX_POOLED_CONNECTIONS are closed
+        assert MAX_POOLED_CONNECTIONS == 4
+        assert sorted(ssh_connector._clustermanagers) == ["a", "b", "c", "d", "e"]
+        cms["f"].disconnect.assert_called_once()
+        assert "f" not in ssh_connector._last_used
+        evicted.assert_called_once_with("f")
+
+        busy.clear()
+        with patch.object(
+            ssh_connector._executor, "is_busy", side_effect=busy.__contains__
+        ):
+            ssh_connector._evict_idle_connections(keep="a")
+        assert sorted(ssh_connector._clustermanagers) == ["a", "c", "d", "e"]
+        cms["b"].disconnect.assert_called_once()
+
+        # Connections kept open are never closed
+        ssh_connector._kept_open = {"c", "d", "e"}
+        ssh_connector._last_used = {name: 0.0 for name in "acde"}
+        ssh_connector._evict_idle_connections(keep="a")
+        assert sorted(ssh_connector._clustermanagers) == ["a", "c", "d", "e"]
+
+    @patch("simstack.SSHConnector.time.monotonic", return_value=10000.0)
+    def test_evict_idle_connections_locked(self, mock_monotonic, ssh_connector):
+        """Test registries locked or busy by now are not closed."""
+        # Setup
+        cms = {name: MagicMock() for name in "ab"}
+        ssh_connector._clustermanagers = dict(cms)
+        ssh_connector._last_used = {name: 0.0 for name in "ab"}
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with ssh_connector._executor.lock("a"):
+                locked.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(5)
+
+        # "b" gets a request after it was found idle
+        busy = iter([False, False, True])
+        try:
+            with patch.object(
+                ssh_connector._executor,
+                "is_busy",
+                side_effect=lambda name: next(busy),
+            ):
+                ssh_connector._evict_idle_connections()
+        finally:
+            release.set()
+            holder.join()
+
+        # Verify
+        assert sorted(ssh_connector._clustermanagers) == ["a", "b"]
+        cms["a"].disconnect.assert_not_called()
+        cms["b"].disconnect.assert_not_called()
+
     def test_disconnect_registry(self, ssh_connector, mock_clustermanager):
         """Test disconnect_registry method."""
         # Setup
@@ -176,6 +312,22 @@ class TestSSHConnector:
         cm_instance.disconnect.assert_called_once()
         callback.assert_called_once()
 
+    def test_connect_registry_keep_open(self, ssh_connector, mock_clustermanager):
+        """Test registries connected with keep_open are kept until disconnected."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        callback = MagicMock()
+
+        # Call the method
+        ssh_connector.connect_registry(
+            "test_registry", callback, reuse=True, keep_open=True
+        )
+        assert ssh_connector._kept_open == {"test_registry"}
+
+        ssh_connector.disconnect_registry("test_registry", callback)
+        assert ssh_connector._kept_open == set()
+
     def test_exit(self, ssh_connector, mock_clustermanager):
         """Test exit method."""
         # Setup
@@ -195,7 +347,8 @@ class TestSSHConnector:
         ssh_connector._clustermanagers = {"test_registry": cm_instance}
 
         # Configure get_workflow_list to return test data
-        cm_instance.get_workflow_list.return_value = ["workflow1", "workflow2"]
+        workflows = [{"name": "2024-01-01-wf1"}, {"name": "2024-02-01-wf2"}]
+        cm_instance.get_workflow_list.return_value = workflows
 
         # Create mock callback
         callback = MagicMock()
@@ -203,9 +356,153 @@ class TestSSHConnector:
         # Call the method
         ssh_connector.update_workflow_list("test_registry", callback)
 
+        # Verify newest first
+        cm_instance.get_workflow_list.assert_called_once()
+        callback.assert_called_once_with(
+            "test_registry", workflows[::-1], 0, len(workflows)
+        )
+
+    def test_update_workflow_list_pages(self, ssh_connector, mock_clustermanager):
+        """Test update_workflow_list cuts pages from a single listing."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        workflows = [{"name": "wf%02d" % i} for i in range(5)]
+        cm_instance.get_workflow_list.return_value = workflows
+        callback = MagicMock()
+
+        # Call the method
+        ssh_connector.update_workflow_list("test_registry", callback, limit=2)
+        ssh_connector.update_workflow_list("test_registry", callback, 2, 2)
+        ssh_connector.update_workflow_list("test_registry", callback, 4, 2)
+
         # Verify
         cm_instance.get_workflow_list.assert_called_once()
-        callback.assert_called_once_with("test_registry", ["workflow1", "workflow2"])
+        assert callback.call_args_list == [
+            call("test_registry", [workflows[4], workflows[3]], 0, 5),
+            call("test_registry", [workflows[2], workflows[1]], 2, 5),
+            call("test_registry", [workflows[0]], 4, 5),
+        ]
+
+    def test_query_workflows(self, ssh_connector, mock_clustermanager):
+        """Test query_workflows delivers only the matching workflows."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        workflows = [{"name": "relax%d" % i} for i in range(3)] + [{"name": "other"}]
+        cm_instance.get_workflow_list.return_value = workflows
+        callback = MagicMock()
+
+        # Call the method
+        ssh_connector.query_workflows(
+            "test_registry", WorkflowQuery("relax"), callback, limit=2
+        )
+        ssh_connector.query_workflows(
+            "test_registry", WorkflowQuery("relax"), callback, offset=2
+        )
+
+        # Verify the listing is cached and only matches are delivered
+        cm_instance.get_workflow_list.assert_called_once()
+        assert callback.call_args_list == [
+            call("test_registry", [workflows[2], workflows[1]], 0, 3),
+            call("test_registry", [workflows[0]], 2, 3),
+        ]
+
+    def test_poll_status(self, ssh_connector, mock_clustermanager):
+        """Test poll_status reports status changes against the cached listings."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+
+        def workflow(wfid, status):
+            return {"id": wfid, "name": wfid, "status": status}
+
+        cm_instance.get_workflow_list.return_value = [
+            workflow("wf1", JobStatus.RUNNING),
+            workflow("wf2", JobStatus.SUCCESSFUL),
+        ]
+        cm_instance.get_workflow_job_list.return_value = [
+            {"id": "job", "name": "job", "status": JobStatus.QUEUED}
+        ]
+        callback = MagicMock()
+        ssh_connector.update_workflow_list("test_registry", callback)
+        ssh_connector.update_workflow_job_list("test_registry", "wf1", callback)
+        ssh_connector.update_workflow_job_list("test_registry", "wf2", callback)
+        cm_instance.get_workflow_job_list.reset_mock()
+        callback.reset_mock()
+        cache = ssh_connector._get_listing_cache("test_registry")
+
+        # Fresh listings are not fetched again
+        ssh_connector.poll_status("test_registry", callback)
+        callback.assert_called_once_with("test_registry", [])
+        cm_instance.get_workflow_list.assert_called_once()
+        cm_instance.get_workflow_job_list.assert_called_once_with("wf1")
+        cm_instance.get_workflow_job_list.reset_mock()
+        callback.reset_mock()
+
+        # Call the method
+        cache.expire()
+        cm_instance.get_workflow_list.return_value = [
+            workflow("wf3", JobStatus.QUEUED),
+            workflow("wf1", JobStatus.SUCCESSFUL),
+            workflow("wf2", JobStatus.SUCCESSFUL),
+        ]
+        ssh_connector.poll_status("test_registry", callback)
+
+        # Verify only the job list of the unfinished workflow was polled
+        callback.assert_called_once_with(
+            "test_registry", [("wf1", None, JobStatus.SUCCESSFUL)]
+        )
+        cm_instance.get_workflow_job_list.assert_not_called()
+
+        cm_instance.get_workflow_list.return_value[1] = workflow(
+            "wf1", JobStatus.RUNNING
+        )
+        cm_instance.get_workflow_job_list.return_value = [
+            {"id": "job", "name": "job", "status": JobStatus.RUNNING}
+        ]
+        cache.expire()
+        ssh_connector.poll_status("test_registry", callback)
+        assert callback.call_args == call(
+            "test_registry",
+            [("wf1", None, JobStatus.RUNNING), ("wf1", "job", JobStatus.RUNNING)],
+        )
+        cm_instance.get_workflow_job_list.assert_called_once_with("wf1")
+
+        # Dropped listings, e.g. after a submit, are polled again
+        cache.discard(WORKFLOW_LIST_KEY)
+        ssh_connector.poll_status("test_registry", callback)
+        assert callback.call_args == call(
+            "test_registry",
+            [
+                ("wf3", None, JobStatus.QUEUED),
+                ("wf2", None, JobStatus.SUCCESSFUL),
+                ("wf1", None, JobStatus.RUNNING),
+            ],
+        )
+        cm_instance.get_workflow_list.return_value[0] = workflow(
+            "wf3", JobStatus.RUNNING
+        )
+        cache.expire()
+        ssh_connector.poll_status("test_registry", callback)
+        assert callback.call_args == call(
+            "test_registry", [("wf3", None, JobStatus.RUNNING)]
+        )
+
+        # Stale listings without unfinished workflows are not fetched again
+        finished = [workflow("wf1", JobStatus.SUCCESSFUL)]
+        cache.put(WORKFLOW_LIST_KEY, finished)
+        cache.expire()
+        cm_instance.get_workflow_list.reset_mock()
+        ssh_connector.poll_status("test_registry", callback)
+        assert callback.call_args == call("test_registry", [])
+        cm_instance.get_workflow_list.assert_not_called()
+
+        # Errors are reported as failed poll
+        cm_instance.get_workflow_list.side_effect = OSError("timeout")
+        cache.discard(WORKFLOW_LIST_KEY)
+        ssh_connector.poll_status("test_registry", callback)
+        assert callback.call_args == call("test_registry", None)
 
     def test_get_cm_not_connected(self, ssh_connector):
         """Test _get_cm method when not connected."""
@@ -255,6 +552,17 @@ class TestSSHConnector:
             "cb_arg1", "cb_arg2", "arg1", "arg2", cb_kwarg="cb_value"
         )
 
+    def test_exec_callback_tuple_merges_kwargs(self, ssh_connector):
+        """Test _exec_callback keeps the kwargs passed by the caller."""
+        callback_func = MagicMock()
+        callback = (callback_func, (), {"cb_kwarg": "cb_value"})
+
+        ssh_connector._exec_callback(callback, "arg1", kwarg1="value1")
+
+        callback_func.assert_called_once_with(
+            "arg1", kwarg1="value1", cb_kwarg="cb_value"
+        )
+
     def test_quit(self, ssh_connector):
         """Test quit method."""
         # Mock exit
@@ -433,6 +741,121 @@ class TestSSHConnector:
             "test_registry", "/test/path", ["file1", "file2"]
         )
 
+    def test_update_dir_list_cached(self, ssh_connector, mock_clustermanager):
+        """Test fresh listings are served from the cache."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        cm_instance.list_dir.return_value = ["file1"]
+        callback = MagicMock()
+
+        # Call method twice
+        ssh_connector.update_dir_list("test_registry", "/test/path/", callback)
+        ssh_connector.update_dir_list("test_registry", "/test/path", callback)
+
+        # Verify only the first call went to the remote
+        cm_instance.list_dir.assert_called_once_with("/test/path/")
+        assert callback.call_count == 2
+        callback.assert_called_with("test_registry", "/test/path", ["file1"])
+
+    def test_update_dir_list_stale(self, ssh_connector, mock_clustermanager):
+        """Test stale listings are shown at once and revalidated."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        cm_instance.list_dir.return_value = ["file1"]
+        callback = MagicMock()
+        ssh_connector.update_dir_list("test_registry", "/test/path", callback)
+        ssh_connector.expire_listings("test_registry")
+        callback.reset_mock()
+
+        # Unchanged listings are delivered once
+        ssh_connector.update_dir_list("test_registry", "/test/path", callback)
+        assert cm_instance.list_dir.call_count == 2
+        callback.assert_called_once_with("test_registry", "/test/path", ["file1"])
+
+        # Changed listings are delivered again
+        ssh_connector.expire_listings("test_registry")
+        cm_instance.list_dir.return_value = ["file1", "file2"]
+        callback.reset_mock()
+        ssh_connector.update_dir_list("test_registry", "/test/path", callback)
+        assert callback.call_args_list == [
+            call("test_registry", "/test/path", ["file1"]),
+            call("test_registry", "/test/path", ["file1", "file2"]),
+        ]
+
+    @patch("simstack.SSHConnector.list_dirs")
+    def test_update_dir_lists(self, mock_list_dirs, ssh_connector, mock_clustermanager):
+        """Test update_dir_lists fetches several paths at once and caches them."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        listings = {"/a": ["sub"], "/a/sub": ["file"], "/b": []}
+        mock_list_dirs.return_value = listings
+        callback = MagicMock()
+
+        # Call method
+        ssh_connector.update_dir_lists(
+            "test_registry", ["/a", "/b"], depth=2, callback=callback
+        )
+
+        # Verify
+        mock_list_dirs.assert_called_once_with(cm_instance, ["/a", "/b"], 2)
+        callback.assert_called_once_with("test_registry", listings)
+
+        # The subdirectory listing is served from the cache afterwards
+        single = MagicMock()
+        ssh_connector.update_dir_list("test_registry", "/a/sub", single)
+        single.assert_called_once_with("test_registry", "/a/sub", ["file"])
+        cm_instance.list_dir.assert_not_called()
+
+        # Fresh paths are not fetched again
+        callback.reset_mock()
+        ssh_connector.update_dir_lists("test_registry", ["/a", "/b"], callback=callback)
+        callback.assert_called_once_with("test_registry", {"/a": ["sub"], "/b": []})
+        mock_list_dirs.assert_called_once()
+
+    @patch("simstack.SSHConnector.list_dirs")
+    def test_update_dir_lists_stale(
+        self, mock_list_dirs, ssh_connector, mock_clustermanager
+    ):
+        """Test update_dir_lists delivers only changed listings on revalidation."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        mock_list_dirs.return_value = {"/a": ["x"], "/b": ["y"]}
+        ssh_connector.update_dir_lists(
+            "test_registry", ["/a", "/b"], callback=MagicMock()
+        )
+        ssh_connector.expire_listings("test_registry")
+        mock_list_dirs.return_value = {"/a": ["x"], "/b": ["y", "z"]}
+        callback = MagicMock()
+
+        # Call method
+        ssh_connector.update_dir_lists("test_registry", ["/a", "/b"], callback=callback)
+
+        # Verify
+        assert callback.call_args_list == [
+            call("test_registry", {"/a": ["x"], "/b": ["y"]}),
+            call("test_registry", {"/b": ["y", "z"]}),
+        ]
+
+    def test_delete_file_invalidates_listing(self, ssh_connector, mock_clustermanager):
+        """Test delete_file drops the cached listing of the parent directory."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        cm_instance.list_dir.return_value = ["file.txt"]
+        cm_instance.is_directory.return_value = False
+        ssh_connector.update_dir_list("test_registry", "/test", MagicMock())
+
+        # Call method
+        ssh_connector.delete_file("test_registry", "/test/file.txt", MagicMock())
+        ssh_connector.update_dir_list("test_registry", "/test", MagicMock())
+
+        # Verify
+        assert cm_instance.list_dir.call_count == 2
+
     def test_delete_file_directory(self, ssh_connector, mock_clustermanager):
         """Test delete_file method for directory."""
         # Setup
@@ -540,12 +963,15 @@ class TestSSHConnector:
         # Configure get_url_for_workflow to return test URL
         cm_instance.get_url_for_workflow.return_value = "http://test.url/workflow1"
 
+        callback = MagicMock()
+
         # Call method
-        result = ssh_connector.get_workflow_url("test_registry", "workflow1")
+        result = ssh_connector.get_workflow_url("test_registry", "workflow1", callback)
 
         # Verify
         cm_instance.get_url_for_workflow.assert_called_once_with("workflow1")
         assert result == "http://test.url/workflow1"
+        callback.assert_called_once_with("http://test.url/workflow1")
 
     def test_delete_workflow(self, ssh_connector, mock_clustermanager):
         """Test delete_workflow method."""
@@ -579,7 +1005,10 @@ class TestSSHConnector:
         cm_instance.abort_wf.assert_called_once_with("workflow1")
         ssh_connector.logger.debug.assert_called_once()
 
-    def test_download_file_single_file(self, ssh_connector, mock_clustermanager):
+    @patch("simstack.SSHConnector.DownloadManager")
+    def test_download_file_single_file(
+        self, mock_manager_class, ssh_connector, mock_clustermanager
+    ):
         """Test download_file method with single file."""
         # Setup
         cm_class, cm_instance = mock_clustermanager
@@ -598,11 +1027,19 @@ class TestSSHConnector:
         )
 
         # Verify
-        cm_instance.get_file.assert_called_once_with(
-            "/remote/file.txt", "/local/dest", progress_callback
+        mock_manager_class.assert_called_once_with(
+            cm_instance, max_workers=MAX_DT_WORKERS_PER_REGISTRY
         )
-
-    def test_download_file_multiple_files(self, ssh_connector, mock_clustermanager):
+        manager = mock_manager_class.return_value
+        manager.add.assert_called_once()
+        assert manager.add.call_args[0][0] == [("/remote/file.txt", "/local/dest")]
+        manager.run.assert_called_once_with(progress_callback)
+        assert ssh_connector._downloads == {}
+
+    @patch("simstack.SSHConnector.DownloadManager")
+    def test_download_file_multiple_files(
+        self, mock_manager_class, ssh_connector, mock_clustermanager
+    ):
         """Test download_file method with multiple files."""
         # Setup
         cm_class, cm_instance = mock_clustermanager
@@ -610,21 +1047,94 @@ class TestSSHConnector:
 
         callback = MagicMock()
         progress_callback = MagicMock()
-        files = ["/remote/file1.txt", "/remote/file2.txt"]
+        files = ["/remote/file1.txt", "/remote/dir/"]
 
         # Call method
         ssh_connector.download_file(
             "test_registry", files, "/local/dest", progress_callback, callback
         )
 
-        # Verify get_file was called for each file
-        assert cm_instance.get_file.call_count == 2
-        cm_instance.get_file.assert_any_call(
-            "/remote/file1.txt", "/local/dest", progress_callback
+        # Verify all files are queued into the destination directory
+        manager = mock_manager_class.return_value
+        assert manager.add.call_args[0][0] == [
+            ("/remote/file1.txt", os.path.join("/local/dest", "file1.txt")),
+            ("/remote/dir/", os.path.join("/local/dest", "dir")),
+        ]
+        manager.run.assert_called_once()
+
+    @patch("simstack.SSHConnector.DownloadManager")
+    def test_download_file_callbacks(
+        self, mock_manager_class, ssh_connector, mock_clustermanager
+    ):
+        """Test download_file calls back on success and shows errors otherwise."""
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        callback = MagicMock()
+        manager = mock_manager_class.return_value
+
+        ssh_connector.download_file(
+            "test_registry", "/remote/file.txt", "/local/dest", None, (callback, (), {})
+        )
+        on_done = manager.add.call_args[0][1]
+
+        on_done([])
+        callback.assert_called_once_with()
+
+        with patch(
+            "simstack.view.WFViewManager.WFViewManager.show_error"
+        ) as mock_show_error:
+            on_done([OSError("Broken pipe")])
+        assert "Broken pipe" in mock_show_error.call_args[0][0]
+        assert callback.call_count == 1
+
+    @patch("simstack.SSHConnector.DownloadManager")
+    def test_download_file_feeds_running_download(
+        self, mock_manager_class, ssh_connector, mock_clustermanager
+    ):
+        """Test download_file adds files to an already running download."""
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        running = MagicMock()
+        running.cm = cm_instance
+        running.add.return_value = True
+        ssh_connector._downloads = {"test_registry": running}
+
+        ssh_connector.download_file("test_registry", "/remote/file.txt", "/local/dest")
+
+        running.add.assert_called_once()
+        mock_manager_class.assert_not_called()
+        running.run.assert_not_called()
+
+    @patch("simstack.SSHConnector.DownloadManager")
+    def test_download_directory(
+        self, mock_manager_class, ssh_connector, mock_clustermanager
+    ):
+        """Test download_directory streams the subtree into local_dest."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        callback = MagicMock()
+        progress_callback = MagicMock()
+
+        # Call method
+        ssh_connector.download_directory(
+            "test_registry",
+            "/remote/wf/",
+            "/local/dest",
+            pattern="ForEach/*",
+            progress_callback=progress_callback,
+            callback=(callback, ("done",), {}),
         )
-        cm_instance.get_file.assert_any_call(
-            "/remote/file2.txt", "/local/dest", progress_callback
+
+        # Verify
+        manager = mock_manager_class.return_value
+        manager.download_archive.assert_called_once_with(
+            "/remote/wf/",
+            os.path.join("/local/dest", "wf"),
+            pattern="ForEach/*",
+            progress_callback=progress_callback,
         )
+        callback.assert_called_once_with("done")
 
     def test_upload_files_single_file(self, ssh_connector, mock_clustermanager):
         """Test upload_files method with single file."""
@@ -737,11 +1247,19 @@ class TestSSHConnector:
                 cm_class.assert_called_once()
                 callback.assert_called_once()
 
+    @patch("simstack.SSHConnector.TransferEngine")
     @patch("simstack.SSHConnector.filewalker")
     @patch("simstack.SSHConnector.etree")
     @patch("simstack.SSHConnector.os")
     def test_run_workflow_job(
-        self, mock_os, mock_etree, mock_filewalker, ssh_connector, mock_clustermanager
+        self,
+        mock_os,
+        mock_etree,
+        mock_filewalker,
+        mock_engine_class,
+        ssh_connector,
+        mock_clustermanager,
+        mock_blobstore,
     ):
         """Test run_workflow_job method."""
         # Setup
@@ -755,10 +1273,7 @@ class TestSSHConnector:
         ]
         mock_os.path.commonprefix.return_value = "/upload/dir"
         mock_os.path.relpath.side_effect = ["file1.txt", "file2.txt"]
-        mock_os.path.dirname.side_effect = [
-            "test_submitname/workflow_data",
-            "test_submitname/workflow_data",
-        ]
+        mock_os.path.getsize.return_value = 10
 
         # Mock cluster manager methods
         cm_instance.exists.return_value = False
@@ -770,21 +1285,265 @@ class TestSSHConnector:
 
         # Mock XML processing
         mock_xml = MagicMock()
-        mock_etree.tostring.return_value = b"<workflow>test</workflow>"
+        mock_etree.tostring.return_value = (
+            b"<workflow>${BASEFOLDER} ${QUEUE} c9m:${STORAGE}/file</workflow>"
+        )
+        progress_callback = MagicMock()
 
         # Call method
         ssh_connector.run_workflow_job(
-            "test_registry", "test_submitname", "/upload/dir", mock_xml
+            "test_registry",
+            "test_submitname",
+            "/upload/dir",
+            mock_xml,
+            progress_callback=progress_callback,
         )
 
         # Verify key operations
         cm_instance.exists.assert_called_once_with("test_submitname")
-        assert cm_instance.mkdir_p.call_count == 2
-        assert cm_instance.put_file.call_count == 2
+        mock_engine_class.assert_called_once_with(
+            cm_instance, max_workers=MAX_DT_WORKERS_PER_REGISTRY
+        )
+        mock_engine_class.return_value.upload.assert_called_once_with(
+            [
+                ("/upload/dir/file1.txt", "test_submitname/workflow_data/file1.txt"),
+                ("/upload/dir/file2.txt", "test_submitname/workflow_data/file2.txt"),
+            ],
+            progress_callback=progress_callback,
+        )
+        mock_blobstore.return_value.add.assert_called_once_with(
+            mock_engine_class.return_value.upload.call_args[0][0]
+        )
+        cm_instance.mkdir_p.assert_not_called()
+        cm_instance.put_file.assert_not_called()
         cm_instance.remote_open.assert_called_once()
+        written = "".join(c.args[0] for c in mock_remote_file.write.call_args_list)
+        assert (
+            written == "<workflow>/calc/base/test_submitname test_queue file</workflow>"
+        )
         cm_instance.submit_wf.assert_called_once()
 
-    def test_run_workflow_job_file_exists(self, ssh_connector, mock_clustermanager):
+    @patch("simstack.SSHConnector.TransferEngine")
+    @patch("simstack.SSHConnector.filewalker")
+    @patch("simstack.SSHConnector.etree")
+    @patch("simstack.SSHConnector.os")
+    def test_run_workflow_job_archive(
+        self,
+        mock_os,
+        mock_etree,
+        mock_filewalker,
+        mock_engine_class,
+        ssh_connector,
+        mock_clustermanager,
+        mock_blobstore,
+    ):
+        """Test run_workflow_job switches to archive upload above the threshold."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        ssh_connector.archive_submit_min_files = 2
+
+        mock_filewalker.return_value = [
+            "/upload/dir/file1.txt",
+            "/upload/dir/file2.txt",
+        ]
+        mock_os.path.commonprefix.return_value = "/upload/dir"
+        mock_os.path.relpath.side_effect = ["file1.txt", "file2.txt"]
+        mock_os.path.getsize.return_value = 10
+        cm_instance.exists.return_value = False
+        cm_instance.get_calculation_basepath.return_value = "/calc/base"
+        cm_instance.get_queueing_system.return_value = "test_queue"
+        cm_instance.get_default_queue.return_value = "default"
+        mock_etree.tostring.return_value = b"<workflow>test</workflow>"
+        progress_callback = MagicMock()
+
+        # Call method
+        ssh_connector.run_workflow_job(
+            "test_registry",
+            "test_submitname",
+            "/upload/dir",
+            MagicMock(),
+            progress_callback=progress_callback,
+        )
+
+        # Verify
+        engine = mock_engine_class.return_value
+        engine.upload.assert_not_called()
+        engine.upload_archive.assert_called_once_with(
+            [
+                ("/upload/dir/file1.txt", "test_submitname/workflow_data/file1.txt"),
+                ("/upload/dir/file2.txt", "test_submitname/workflow_data/file2.txt"),
+            ],
+            "test_submitname/workflow_data",
+            progress_callback=progress_callback,
+        )
+        cm_instance.submit_wf.assert_called_once()
+
+    @patch("simstack.SSHConnector.TransferEngine")
+    @patch("simstack.SSHConnector.filewalker")
+    @patch("simstack.SSHConnector.etree")
+    def test_run_workflow_job_blobstore(
+        self,
+        mock_etree,
+        mock_filewalker,
+        mock_engine_class,
+        ssh_connector,
+        mock_clustermanager,
+        mock_blobstore,
+    ):
+        """Test run_workflow_job only uploads files unknown to the blob store."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        mock_filewalker.return_value = [
+            "/upload/dir/file1.txt",
+            "/upload/dir/file2.txt",
+        ]
+        remaining = [
+            ("/upload/dir/file2.txt", "test_submitname/workflow_data/file2.txt")
+        ]
+        mock_blobstore.return_value.copy_known.side_effect = None
+        mock_blobstore.return_value.copy_known.return_value = remaining
+        cm_instance.exists.return_value = False
+        cm_instance.get_calculation_basepath.return_value = "/calc/base"
+        cm_instance.get_queueing_system.return_value = "test_queue"
+        cm_instance.get_default_queue.return_value = "default"
+        mock_etree.tostring.return_value = b"<workflow>test</workflow>"
+
+        with patch("simstack.SSHConnector.os.path.getsize", return_value=10):
+            ssh_connector.run_workflow_job(
+                "test_registry", "test_submitname", "/upload/dir", MagicMock()
+            )
+
+        # Verify
+        mock_blobstore.return_value.copy_known.assert_called_once_with(
+            [
+                ("/upload/dir/file1.txt", "test_submitname/workflow_data/file1.txt"),
+                ("/upload/dir/file2.txt", "test_submitname/workflow_data/file2.txt"),
+            ]
+        )
+        mock_engine_class.return_value.upload.assert_called_once_with(
+            remaining, progress_callback=None
+        )
+        mock_blobstore.return_value.add.assert_called_once_with(remaining)
+
+    @patch("simstack.SSHConnector.TransferEngine")
+    @patch("simstack.SSHConnector.filewalker")
+    @patch("simstack.SSHConnector.etree")
+    def test_run_workflow_job_blobstore_archive(
+        self,
+        mock_etree,
+        mock_filewalker,
+        mock_engine_class,
+        ssh_connector,
+        mock_clustermanager,
+        mock_blobstore,
+    ):
+        """Test run_workflow_job archives only files unknown to the blob store."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        ssh_connector.archive_submit_min_files = 2
+        mock_filewalker.return_value = ["/upload/dir/file%d.txt" % i for i in range(3)]
+        remaining = [
+            (
+                "/upload/dir/file%d.txt" % i,
+                "test_submitname/workflow_data/file%d.txt" % i,
+            )
+            for i in (1, 2)
+        ]
+        mock_blobstore.return_value.copy_known.side_effect = None
+        mock_blobstore.return_value.copy_known.return_value = remaining
+        cm_instance.exists.return_value = False
+        cm_instance.get_calculation_basepath.return_value = "/calc/base"
+        cm_instance.get_queueing_system.return_value = "test_queue"
+        cm_instance.get_default_queue.return_value = "default"
+        mock_etree.tostring.return_value = b"<workflow>test</workflow>"
+
+        with patch("simstack.SSHConnector.os.path.getsize", return_value=10):
+            ssh_connector.run_workflow_job(
+                "test_registry", "test_submitname", "/upload/dir", MagicMock()
+            )
+
+        # Verify the copied file is neither archived nor expected in the archive
+        engine = mock_engine_class.return_value
+        engine.upload.assert_not_called()
+        engine.upload_archive.assert_called_once_with(
+            remaining, "test_submitname/workflow_data", progress_callback=None
+        )
+        mock_blobstore.return_value.add.assert_called_once_with(remaining)
+
+    @patch("simstack.SSHConnector.TransferEngine")
+    def test_run_workflow_job_remove_after_upload(
+        self,
+        mock_engine_class,
+        ssh_connector,
+        mock_clustermanager,
+        mock_blobstore,
+        tmp_path,
+    ):
+        """Test run_workflow_job shows errors and removes the uploaded snapshot."""
+        # Setup
+        cm_class, cm_instance = mock_clustermanager
+        ssh_connector._clustermanagers = {"test_registry": cm_instance}
+        cm_instance.exists.return_value = False
+        snapshot = tmp_path / "snapshot"
+        snapshot.mkdir()
+        (snapshot / "file1.txt").write_text("content")
+        mock_engine_class.return_value.upload.side_effect = RuntimeError("failed")
+
+        with patch("simstack.view.WFViewManager.WFViewManager") as mock_view_manager:
+            ssh_connector.run_workflow_job(
+                "test_registry",
+                "test_submitname",
+                str(snapshot),
+                MagicMock(),
+                remove_after_upload=True,
+            )
+
+        # Verify
+        mock_engine_class.return_value.upload.assert_called_once()
+        mock_view_manager.show_error.assert_called_once_with(
+            "Submitting workflow test_submitname failed: failed"
+        )
+        assert not snapshot.exists()
+
+    def test_get_blobstore(self, ssh_connector, mock_blobstore):
+        """Test _get_blobstore keeps one store per registry and clustermanager."""
+        cm = MagicMock()
+        with patch(
+            "simstack.SSHConnector.SimStackPaths.get_settings_folder_nanomatch",
+            return_value="/settings",
+        ):
+            mock_blobstore.return_value.cm = cm
+            first = ssh_connector._get_blobstore("test_registry", cm)
+            second = ssh_connector._get_blobstore("test_registry", cm)
+            assert first is second
+            assert mock_blobstore.call_count == 1
+
+            # A reconnected registry gets a new store
+            ssh_connector._get_blobstore("test_registry", MagicMock())
+            assert mock_blobstore.call_count == 2
+
+    def test_use_archive_submit(self, ssh_connector):
+        """Test the thresholds of the archive submit mode."""
+        cm = MagicMock()
+        ssh_connector.archive_submit_min_files = 3
+        ssh_connector.archive_submit_min_bytes = 100
+
+        with patch("simstack.SSHConnector.os.path.getsize", return_value=10):
+            assert not ssh_connector._use_archive_submit(cm, [("a", "b")] * 2)
+            assert ssh_connector._use_archive_submit(cm, [("a", "b")] * 3)
+        with patch("simstack.SSHConnector.os.path.getsize", return_value=100):
+            assert ssh_connector._use_archive_submit(cm, [("a", "b")])
+
+        # LocalClusterManagers always upload file by file
+        with patch("simstack.SSHConnector.get_ssh_client", return_value=None):
+            assert not ssh_connector._use_archive_submit(cm, [("a", "b")] * 3)
+
+    def test_run_workflow_job_file_exists(
+        self, ssh_connector, mock_clustermanager, mock_blobstore
+    ):
         """Test run_workflow_job when file exists."""
         # Setup
         cm_class, cm_instance = mock_clustermanager
@@ -862,3 +1621,130 @@ class TestSSHConnector:
 
 
 # Add more tests as needed for other methods
+
+
+@pytest.fixture
+def threaded_connector(mock_qtcluster_provider, qtbot):
+    with patch("simstack.SSHConnector.logging"):
+        connector = SSHConnector()
+        yield connector
+        connector._executor.cancel()
+        connector._executor.wait(5000)
+
+
+class TestThreadedSSHConnector:
+    """Test the worker execution layer of the SSHConnector."""
+
+    def test_update_dir_list_runs_in_worker(self, threaded_connector, qtbot):
+        """Test update_dir_list returns at once and calls back in the GUI thread."""
+        cm = MagicMock()
+        io_threads = []
+
+        def list_dir(path):
+            io_threads.append(threading.get_ident())
+            return ["file"]
+
+        cm.list_dir.side_effect = list_dir
+        threaded_connector._clustermanagers = {"test_registry": cm}
+        callback_threads = []
+        callback = MagicMock(
+            side_effect=lambda *args: callback_threads.append(threading.get_ident())
+        )
+
+        # Call method
+        request = threaded_connector.update_dir_list(
+            "test_registry", "/path", (callback, (), {})
+        )
+
+        # Verify
+        assert request is not None
+        qtbot.waitUntil(lambda: callback.called, timeout=5000)
+        callback.assert_called_once_with("test_registry", "/path", ["file"])
+        assert io_threads[0] != threading.get_ident()
+        assert callback_threads == [threading.get_ident()]
+
+    def test_get_workflow_url_runs_in_worker(self, threaded_connector, qtbot):
+        """Test get_workflow_url uses the connection in the registry thread."""
+        cm = MagicMock()
+        io_threads = []
+
+        def get_url_for_workflow(workflow):
+            io_threads.append(threading.get_ident())
+            return "http://test.url/" + workflow
+
+        cm.get_url_for_workflow.side_effect = get_url_for_workflow
+        threaded_connector._clustermanagers = {"test_registry": cm}
+        callback = MagicMock()
+
+        # Call method
+        request = threaded_connector.get_workflow_url(
+            "test_registry", "workflow1", callback
+        )
+
+        # Verify
+        assert request is not None
+        qtbot.waitUntil(lambda: callback.called, timeout=5000)
+        callback.assert_called_once_with("http://test.url/workflow1")
+        assert io_threads[0] != threading.get_ident()
+
+    def test_cancelled_request_drops_callback(self, threaded_connector, qtbot):
+        """Test callbacks of cancelled requests are not delivered."""
+        started = threading.Event()
+        release = threading.Event()
+        cm = MagicMock()
+
+        def list_dir(path):
+            started.set()
+            release.wait(5)
+            return []
+
+        cm.list_dir.side_effect = list_dir
+        threaded_connector._clustermanagers = {"test_registry": cm}
+        callback = MagicMock()
+
+        request = threaded_connector.update_dir_list(
+            "test_registry", "/path", (callback, (), {})
+        )
+        assert started.wait(5)
+        threaded_connector.cancel_requests("test_registry")
+        release.set()
+        assert request.wait(5)
+        qtbot.wait(50)
+
+        callback.assert_not_called()
+
+    def test_call_in_gui_thread(self, threaded_connector, qtbot):
+        """Test _call_in_gui_thread blocks the worker until the GUI answered."""
+        gui_thread = threading.get_ident()
+        result = []
+
+        def ask():
+            return threading.get_ident()
+
+        def job():
+            result.append(threaded_connector._call_in_gui_thread(ask))
+
+        worker = threading.Thread(target=job)
+        worker.start()
+        qtbot.waitUntil(lambda: bool(result), timeout=5000)
+        worker.join()
+
+        assert result == [gui_thread]
+
+    def test_progress_to_gui_thread_is_throttled(self, threaded_connector, qtbot):
+        """Test progress updates from workers are throttled, the last one is kept."""
+        progress_callback = MagicMock()
+
+        def job():
+            wrapped = threaded_connector._progress_to_gui_thread(progress_callback)
+            for i in range(1, 1001):
+                wrapped(i, 1000)
+
+        worker = threading.Thread(target=job)
+        worker.start()
+        worker.join()
+        qtbot.waitUntil(
+            lambda: progress_callback.call_args == ((1000, 1000),), timeout=5000
+        )
+
+        assert progress_callback.call_count < 100
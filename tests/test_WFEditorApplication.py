@@ -1,10 +1,15 @@
+import itertools
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
+from pathlib import Path
 
 from simstack.WFEditorApplication import WFEditorApplication
+from simstack.lib.StatusPoller import StatusPoller
 from simstack.Constants import SETTING_KEYS
 from simstack.SSHConnector import OPERATIONS as uops
 from simstack.SSHConnector import ERROR as uerror
+from simstack.SSHConnector import WORKFLOW_PAGE_SIZE
 from SimStackServer.MessageTypes import ErrorCodes
 
 
@@ -46,6 +51,10 @@ class TestWFEditorApplication:
                 app.exec_callback_operation = MagicMock()
                 app.exec_operation = MagicMock()
                 app.wanos = []
+                app._workflow_rows = WORKFLOW_PAGE_SIZE
+                app._workflow_query = None
+                app._status_poller = MagicMock()
+                app._download_ids = itertools.count()
 
                 # Store mocks for assertions
                 app._mock_view_manager_class = mock_view_manager_class
@@ -54,6 +63,27 @@ class TestWFEditorApplication:
 
                 return app
 
+    def test_init(self, qapp):
+        """Test the real __init__ constructs the application."""
+        settings = MagicMock()
+        settings.get_value.return_value = False
+        with (
+            patch("simstack.WFEditorApplication.WFViewManager") as mock_view_manager,
+            patch("simstack.WFEditorApplication.QtClusterSettingsProvider"),
+            patch("simstack.WFEditorApplication.SSHConnector"),
+            patch.object(WFEditorApplication, "_update_all") as mock_update_all,
+            patch.object(
+                WFEditorApplication, "_remove_upload_snapshots"
+            ) as mock_remove_snapshots,
+        ):
+            app = WFEditorApplication(settings)
+
+        assert isinstance(app._status_poller, StatusPoller)
+        assert not app._status_poller.is_active()
+        mock_view_manager.return_value.show_mainwindow.assert_called_once()
+        mock_update_all.assert_called_once()
+        mock_remove_snapshots.assert_called_once()
+
     def test_on_save_paths(self, app):
         """Test _on_save_paths method."""
         # Mock methods
@@ -242,10 +272,12 @@ class TestWFEditorApplication:
         workflows = ["workflow1", "workflow2"]
 
         # Call method
-        app._on_workflow_list_updated("registry", workflows)
+        app._on_workflow_list_updated("registry", workflows, 0, 2)
 
         # Verify view manager was updated
-        app._view_manager.update_workflow_list.assert_called_once_with(workflows)
+        app._view_manager.update_workflow_list.assert_called_once_with(
+            workflows, 0, 2
+        )
 
     def test_on_fs_list_updated(self, app):
         """Test _on_fs_list_updated method."""
@@ -271,17 +303,18 @@ class TestWFEditorApplication:
         app._on_fs_job_update_request(path)
 
         # Verify connector was called
-        app._connector.update_dir_list.assert_called_once()
+        app._connector.update_dir_lists.assert_called_once()
 
         # Verify registry name
-        assert app._connector.update_dir_list.call_args[0][0] == "registry"
+        assert app._connector.update_dir_lists.call_args[0][0] == "registry"
 
-        # Verify path
-        assert app._connector.update_dir_list.call_args[0][1] == path
+        # Verify path and prefetch depth
+        assert app._connector.update_dir_lists.call_args[0][1] == [path]
+        assert app._connector.update_dir_lists.call_args[1]["depth"] == 2
 
         # Verify callback
-        callback = app._connector.update_dir_list.call_args[0][2]
-        assert callback[0] == app._on_fs_list_updated
+        callback = app._connector.update_dir_lists.call_args[1]["callback"]
+        assert callback[0] == app._on_fs_lists_updated
 
     def test_on_fs_workflow_update_request(self, app):
         """Test _on_fs_workflow_update_request method."""
@@ -469,6 +502,71 @@ class TestWFEditorApplication:
         callback = app._connector.update_workflow_list.call_args[0][1]
         assert callback[0] == app._on_workflow_list_updated
 
+        # Verify all loaded pages are refreshed
+        assert app._connector.update_workflow_list.call_args[1] == {
+            "offset": 0,
+            "limit": WORKFLOW_PAGE_SIZE,
+        }
+
+    def test_on_fs_more_workflows_request(self, app):
+        """Test _on_fs_more_workflows_request requests the next page."""
+        app._get_current_registry_name = MagicMock(return_value="registry")
+
+        # Call method
+        app._on_fs_more_workflows_request(WORKFLOW_PAGE_SIZE)
+
+        # Verify the page is requested and later refreshes include it
+        kwargs = app._connector.update_workflow_list.call_args[1]
+        assert kwargs == {"offset": WORKFLOW_PAGE_SIZE, "limit": WORKFLOW_PAGE_SIZE}
+        assert app._workflow_rows == 2 * WORKFLOW_PAGE_SIZE
+
+    def test_on_fs_workflow_query_changed(self, app):
+        """Test workflow requests use the query of the filter bar."""
+        app._get_current_registry_name = MagicMock(return_value="registry")
+        app._workflow_rows = 3 * WORKFLOW_PAGE_SIZE
+        query = MagicMock()
+
+        # Call method
+        app._on_fs_workflow_query_changed(query)
+        app._on_fs_worflow_list_update_request()
+
+        # Verify the first page of matches is queried
+        app._connector.update_workflow_list.assert_not_called()
+        args, kwargs = app._connector.query_workflows.call_args
+        assert args[:2] == ("registry", query)
+        assert kwargs == {"offset": 0, "limit": WORKFLOW_PAGE_SIZE}
+
+        # Without query the plain listing is used again
+        app._on_fs_workflow_query_changed(None)
+        app._on_fs_worflow_list_update_request()
+        app._connector.update_workflow_list.assert_called_once()
+
+    def test_poll_status(self, app):
+        """Test polled status changes are shown and adapt the poll interval."""
+        app._get_current_registry_name = MagicMock(return_value="registry")
+
+        # Call method
+        app._poll_status()
+
+        # Verify
+        args = app._connector.poll_status.call_args[0]
+        assert args[0] == "registry"
+        assert args[1][0] == app._on_status_polled
+
+        changes = [("wf", None, 3)]
+        app._on_status_polled("registry", changes)
+        app._view_manager.update_status.assert_called_once_with(changes)
+        app._status_poller.poll_finished.assert_called_once_with(True)
+
+        # Failed polls and polls without changes back off
+        app._on_status_polled("registry", None)
+        app._on_status_polled("registry", [])
+        app._view_manager.update_status.assert_called_once()
+        assert app._status_poller.poll_finished.call_args_list[1:] == [
+            ((False,),),
+            ((False,),),
+        ]
+
     def test_on_saved_workflows_update_request(self, app):
         """Test _on_saved_workflows_update_request method."""
         # Mock _update_workflow_list
@@ -502,6 +600,20 @@ class TestWFEditorApplication:
         assert app._connector.download_file.call_args[0][1] == from_path
         assert app._connector.download_file.call_args[0][2] == to_path
 
+    def test_download_progress(self, app):
+        """Test every download shows its own progress message."""
+        # Call method
+        first = app._download_progress()
+        second = app._download_progress()
+        first(1_000_000, 2_000_000)
+        second(0, 4_000_000)
+
+        # Verify
+        messages = app._view_manager.show_progress_message.call_args_list
+        assert [args[0] for args, _ in messages] == ["download-0", "download-1"]
+        assert messages[0][0][1].startswith("Downloading 1.0 / 2.0 MB")
+        assert messages[1][0][1].startswith("Downloading 0.0 / 4.0 MB")
+
     def test_on_fs_upload(self, app):
         """Test _on_fs_upload method."""
         # Mock _get_current_registry_name
@@ -621,21 +733,16 @@ class TestWFEditorApplication:
         # Mock _get_current_registry_name
         app._get_current_registry_name = MagicMock(return_value="registry")
 
-        # Mock get_workflow_url
-        mock_url = "http://example.com/workflow/workflow1"
-        app._connector.get_workflow_url.return_value = mock_url
-
         # Create test workflow
         workflow = "workflow1"
 
         # Call method
         app._on_fs_browse_workflow(workflow)
 
-        # Verify connector was called
-        app._connector.get_workflow_url.assert_called_once_with("registry", workflow)
-
-        # Verify webbrowser was called
-        mock_webbrowser.open_new_tab.assert_called_once_with(mock_url)
+        # Verify the url is opened, once the connector delivers it
+        app._connector.get_workflow_url.assert_called_once_with(
+            "registry", workflow, mock_webbrowser.open_new_tab
+        )
 
     def test_on_fs_delete_workflow(self, app):
         """Test _on_fs_delete_workflow method."""
@@ -854,7 +961,8 @@ class TestWFEditorApplication:
         # Call method
         app._set_disconnected()
 
-        # Verify view_manager was called with correct status
+        # Verify polling stopped and view_manager was called with correct status
+        app._status_poller.stop.assert_called_once()
         app._view_manager.set_registry_connection_status.assert_called_once_with(
             app._view_manager.REGISTRY_CONNECTION_STATES.disconnected
         )
@@ -896,6 +1004,7 @@ class TestWFEditorApplication:
 
         # Verify _set_connected was called
         app._set_connected.assert_called_once()
+        app._status_poller.start.assert_called_once()
 
     def test_cb_connect_error(self, app):
         """Test _cb_connect method with error."""
@@ -997,6 +1106,90 @@ class TestWFEditorApplication:
         # Verify connector was called
         app._connector.connect_registry.assert_called_once()
 
+    def test_connect_all_remotes(self, app):
+        """Test all registries are connected, the selected one as current."""
+        states = app._view_manager.REGISTRY_CONNECTION_STATES
+        app._get_registry_names = MagicMock(return_value=["reg1", "reg2", "reg3"])
+        app._connect_remote = MagicMock()
+
+        # Call method
+        app._connect_all_remotes()
+
+        # Verify
+        app._connect_remote.assert_called_once_with("reg1", reuse=True, keep_open=True)
+        assert app._view_manager.set_registry_status.call_args_list == [
+            call("reg2", states.connecting),
+            call("reg3", states.connecting),
+        ]
+        registries = [
+            (args[0], args[1][2], kwargs)
+            for args, kwargs in app._connector.connect_registry.call_args_list
+        ]
+        assert registries == [
+            ("reg2", {"registry_name": "reg2"}, {"reuse": True, "keep_open": True}),
+            ("reg3", {"registry_name": "reg3"}, {"reuse": True, "keep_open": True}),
+        ]
+
+        # Background connections only report their status
+        app._view_manager.set_registry_status.reset_mock()
+        app._cb_background_connect("uri", ErrorCodes.NO_ERROR, "", registry_name="reg2")
+        app._cb_background_connect(
+            "uri", ErrorCodes.CONN_ERROR, "failed", registry_name="reg3"
+        )
+        assert app._view_manager.set_registry_status.call_args_list == [
+            call("reg2", states.connected),
+            call("reg3", states.disconnected),
+        ]
+        app._view_manager.show_error.assert_not_called()
+
+    def test_remove_upload_snapshots(self, app, tmp_path):
+        """Test snapshots left by a crash are removed from the workflow folder."""
+        (tmp_path / ".TestWorkflow.snapshot-abc").mkdir()
+        (tmp_path / "TestWorkflow").mkdir()
+        app._WFEditorApplication__settings.get_value.return_value = str(tmp_path)
+
+        # Call method
+        app._remove_upload_snapshots()
+
+        # Verify
+        assert [entry.name for entry in tmp_path.iterdir()] == ["TestWorkflow"]
+
+        # Missing workflow folders are ignored
+        app._WFEditorApplication__settings.get_value.return_value = str(
+            tmp_path / "missing"
+        )
+        app._remove_upload_snapshots()
+
+    def test_on_connection_evicted(self, app):
+        """Test closed idle connections are shown as disconnected."""
+        states = app._view_manager.REGISTRY_CONNECTION_STATES
+        app._current_registry_name = "reg1"
+
+        # Call method
+        app._on_connection_evicted("reg2")
+        app._on_connection_evicted("reg1")
+
+        # Verify
+        app._view_manager.set_registry_status.assert_called_once_with(
+            "reg2", states.disconnected
+        )
+        app._view_manager.set_registry_connection_status.assert_called_once_with(
+            states.disconnected
+        )
+        app._status_poller.stop.assert_called_once()
+
+    def test_on_connect_on_startup_changed(self, app):
+        """Test the connect on startup option is saved."""
+        # Call method
+        app._on_connect_on_startup_changed(True)
+
+        # Verify
+        settings = app._WFEditorApplication__settings
+        settings.set_value.assert_called_once_with(
+            SETTING_KEYS["connectOnStartup"], True
+        )
+        settings.save.assert_called_once()
+
     def test_reconnect_remote(self, app):
         """Test _reconnect_remote method."""
         # Mock methods
@@ -1015,15 +1208,16 @@ class TestWFEditorApplication:
 
         # Verify _set_connecting was called
         app._set_connecting.assert_called_once()
+        app._status_poller.stop.assert_called_once()
 
-        # Verify disconnect was called
-        app._disconnect_remote.assert_called_once_with(no_status_update=True)
+        # Verify the previous registry stays connected
+        app._disconnect_remote.assert_not_called()
 
         # Verify connect was called
-        app._connect_remote.assert_called_once_with(registry_name)
+        app._connect_remote.assert_called_once_with(registry_name, reuse=True)
 
     @patch("simstack.WFEditorApplication.datetime")
-    def test_run_workflow(self, mock_datetime, app):
+    def test_run_workflow(self, mock_datetime, app, tmp_path):
         """Test run_workflow method."""
         # Mock datetime
         mock_now = MagicMock()
@@ -1035,21 +1229,29 @@ class TestWFEditorApplication:
 
         # Create test data
         xml = "<workflow>test</workflow>"
-        directory = "/test/directory"
+        directory = tmp_path / "test_workflow" / "Submitted" / "run"
+        (directory / "workflow_data").mkdir(parents=True)
+        (directory / "workflow_data" / "input.txt").write_text("input")
         name = "test_workflow"
 
         # Call method
-        app.run_workflow(xml, directory, name)
+        app.run_workflow(xml, str(directory), name)
 
         # Verify connector was called
         app._connector.run_workflow_job.assert_called_once()
 
-        # Verify parameters
+        # Verify parameters, a snapshot next to the workflow is uploaded
         args = app._connector.run_workflow_job.call_args[0]
         assert args[0] == "test_registry"
         assert args[1] == "2023-01-01-12h30m45s-test_workflow"
-        assert args[2] == "/test/directory/workflow_data"
+        snapshot = Path(args[2])
+        assert snapshot.parent == tmp_path
+        assert (snapshot / "input.txt").read_text() == "input"
         assert args[3] == xml
+        assert app._connector.run_workflow_job.call_args[1] == {
+            "remove_after_upload": True
+        }
+        app._status_poller.reset.assert_called_once()
 
     @patch("simstack.WFEditorApplication.os.path.join")
     def test_run_workflow_with_path_join(self, mock_join, app):
@@ -1071,9 +1273,13 @@ class TestWFEditorApplication:
             name = "test_workflow"
 
             # Call method
-            app.run_workflow(xml, directory, name)
+            with patch("simstack.WFEditorApplication.snapshot_tree") as mock_snapshot:
+                app.run_workflow(xml, directory, name)
 
             # Verify path join was called
+            mock_snapshot.assert_called_once_with(
+                "/test/directory/workflow_data", Path("/")
+            )
             mock_join.assert_called_once_with(directory, "workflow_data")
 
     def test_get_registry_by_name(self, app):
@@ -1296,7 +1502,7 @@ class TestWFEditorApplication:
         app._disconnect_remote.assert_not_called()
 
         # Verify connect was called
-        app._connect_remote.assert_called_once_with(registry_name)
+        app._connect_remote.assert_called_once_with(registry_name, reuse=True)
 
     def test_error_operation_mapping(self, app):
         """Test _on_error method operation mapping logic"""
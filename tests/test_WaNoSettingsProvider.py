@@ -101,11 +101,12 @@ class TestWaNoSettingsProvider:
         with patch.object(settings_provider, "set_value") as mock_set_value:
             settings_provider._set_defaults()
 
-            # Verify set_value was called 3 times (for the three defaults)
-            assert mock_set_value.call_count == 3
+            # Verify set_value was called 4 times (for the four defaults)
+            assert mock_set_value.call_count == 4
 
             # Check the calls for each default setting
             mock_set_value.assert_any_call(SETTING_KEYS["registries"], [])
+            mock_set_value.assert_any_call(SETTING_KEYS["connectOnStartup"], False)
 
             # We don't check the exact path values as they depend on the OS and directory structure
             # Instead, we check that the keys were set
@@ -0,0 +1,75 @@
+"""
+Microbenchmark of WFWaNoWidget.render on a workflow with 200 WaNos.
+
+Compares copying the WorkflowExecModule with copy_exec_module against the
+former deepcopy. The WaNo models return prepared modules, so only the work
+of render itself is measured. Run with:
+
+    python tests/view/bench_wano_render.py
+"""
+
+import copy
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from SimStackServer.WorkflowModel import Resources, WorkflowExecModule
+
+from simstack.lib.RenderCache import RenderCache
+from simstack.view.wf_editor_widgets import WFWaNoWidget
+
+NUM_WANOS = 200
+REPEATS = 5
+
+
+def _widgets(folder):
+    wf_model = MagicMock()
+    wf_model.base_resource_during_render.return_value = Resources()
+    widgets = []
+    for i in range(NUM_WANOS):
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.wano = MagicMock()
+        widget.wano.folder = folder
+        widget.wano_model = MagicMock()
+        widget.wano_model.name = "WaNo%d" % i
+        wem = WorkflowExecModule()
+        wem.set_given_name("WaNo%d" % i)
+        widget.wano_model.render_and_write_input_files_newmodel.return_value = (
+            None,
+            wem,
+        )
+        widget.wf_model = wf_model
+        widgets.append(widget)
+    return widgets
+
+
+def _bench(widgets, basefolder):
+    best = None
+    for _ in range(REPEATS):
+        # Every repetition renders from scratch.
+        widgets[0].wf_model.render_cache.return_value = RenderCache()
+        start = time.perf_counter()
+        for widget in widgets:
+            widget.render([], [], basefolder, stageout_basedir=widget.wano_model.name)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder, patch("builtins.print"):
+        widgets = _widgets(Path(folder))
+        copied = _bench(widgets, folder)
+        with (
+            patch("simstack.view.wf_editor_widgets.copy_exec_module", copy.deepcopy),
+            patch("simstack.lib.RenderCache.copy_exec_module", copy.deepcopy),
+        ):
+            deepcopied = _bench(widgets, folder)
+    print("render of %d WaNos, best of %d:" % (NUM_WANOS, REPEATS))
+    print("  deepcopy:         %8.2f ms" % (deepcopied * 1000))
+    print("  copy_exec_module: %8.2f ms" % (copied * 1000))
+
+
+if __name__ == "__main__":
+    main()
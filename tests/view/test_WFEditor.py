@@ -155,10 +155,20 @@ class TestWFEditorMethods:
         """Test update_workflow_list method."""
         workflows = ["wf1", "wf2"]
 
-        WFEditor.update_workflow_list(mock_editor_instance, workflows)
+        WFEditor.update_workflow_list(mock_editor_instance, workflows, 200, 500)
 
         mock_editor_instance.remoteFileTree.update_workflow_list.assert_called_once_with(
-            workflows
+            workflows, 200, 500
+        )
+
+    def test_update_status(self, mock_editor_instance):
+        """Test update_status method."""
+        changes = [("wf1", "job1", 3)]
+
+        WFEditor.update_status(mock_editor_instance, changes)
+
+        mock_editor_instance.remoteFileTree.update_status.assert_called_once_with(
+            changes
         )
 
     def test_set_registry_connection_status(self, mock_editor_instance):
@@ -169,6 +179,14 @@ class TestWFEditorMethods:
 
         mock_editor_instance.registrySelection.setStatus.assert_called_once_with(status)
 
+    def test_set_registry_status(self, mock_editor_instance):
+        """Test set_registry_status method."""
+        WFEditor.set_registry_status(mock_editor_instance, "registry", "connected")
+
+        mock_editor_instance.registrySelection.setRegistryStatus.assert_called_once_with(
+            "registry", "connected"
+        )
+
     def test_deactivateWidget_with_wano_editor(self, mock_editor_instance):
         """Test deactivateWidget method when lastActive exists."""
         mock_lastActive = MagicMock()
@@ -224,6 +242,17 @@ class TestWFEditorMethods:
         # Verify remove_if_open was not called since is_wano is False
         mock_editor_instance.wanoEditor.remove_if_open.assert_not_called()
 
+    def test_remove_with_lazy_wano_widget(self, mock_editor_instance):
+        """Test remove method does not construct lazily instantiated WaNos."""
+        mock_editor_instance.wanoEditor = MagicMock()
+        lazy_widget = MagicMock()
+        lazy_widget.is_wano = True
+        lazy_widget.constructed = False
+
+        WFEditor.remove(mock_editor_instance, lazy_widget)
+
+        mock_editor_instance.wanoEditor.remove_if_open.assert_not_called()
+
     def test_clear(self, mock_editor_instance):
         """Test clear method."""
         WFEditor.clear(mock_editor_instance)
@@ -73,6 +73,19 @@ class TestStatusMessageManager:
             # Verify timer interval was updated
             status_manager._timer.update_interval.assert_called_once_with(10)
 
+    def test_replace_message(self, status_manager):
+        """Test replace_message method."""
+        status_manager._StatusMessageManager__set_text = MagicMock()
+
+        # Call method twice with the same key
+        status_manager.replace_message("download", "1 MB", 5)
+        status_manager.replace_message("download", "2 MB", 5)
+        status_manager.add_message("Other", 5)
+
+        # Verify only the latest keyed message is shown
+        assert sorted(entry[0] for entry in status_manager._list) == ["2 MB", "Other"]
+        assert status_manager._stringlist == ["Other", "2 MB"]
+
     def test_sort(self, status_manager):
         """Test __sort method."""
         # Setup test data - messages with timestamps
@@ -177,6 +190,7 @@ class TestWFEditorMainWindow:
             window.aboutWFEAct = MagicMock()
             window.configServAct = MagicMock()
             window.configPathSettingsAct = MagicMock()
+            window.connectOnStartupAct = MagicMock()
 
             # Make sure we have signal objects too
             window.exit_client = MagicMock()
@@ -186,6 +200,7 @@ class TestWFEditorMainWindow:
             window.save_as = MagicMock()
             window.open_registry_settings = MagicMock()
             window.open_path_settings = MagicMock()
+            window.connect_on_startup_changed = MagicMock()
             window.run = MagicMock()
             window.save_paths = MagicMock()
 
@@ -332,6 +347,16 @@ class TestWFEditorMainWindow:
         # Verify signal was emitted
         main_window.open_path_settings.emit.assert_called_once()
 
+    def test_connect_on_startup(self, main_window):
+        """Test the connect on startup option."""
+        # Call method
+        main_window.action_connectOnStartup(True)
+        main_window.set_connect_on_startup(False)
+
+        # Verify signal was emitted and the action updated
+        main_window.connect_on_startup_changed.emit.assert_called_once_with(True)
+        main_window.connectOnStartupAct.setChecked.assert_called_once_with(False)
+
     def test_open_dialog_registry_settings(self, main_window):
         """Test open_dialog_registry_settings method."""
         # Mock SimStackClusterSettingsView
@@ -113,6 +113,30 @@ class TestDataNode:
         non_child = DataNode("non_child")
         assert parent_node.rowOfChild(non_child) == -1
 
+    def test_row_of_child_after_modifications(self, parent_node):
+        """Test rowOfChild renumbers rows after inserts and removals."""
+        children = [DataNode("child%d" % i, parent_node) for i in range(4)]
+        parent_node.removeChild(0)
+        inserted = DataNode("inserted")
+        parent_node.insertChild(1, inserted)
+
+        assert [parent_node.rowOfChild(c) for c in children[1:]] == [0, 2, 3]
+        assert parent_node.rowOfChild(inserted) == 1
+        assert parent_node.rowOfChild(children[0]) == -1
+
+    def test_row_of_child_does_not_scan(self, parent_node):
+        """Test rowOfChild is constant time, independent of the sibling count."""
+
+        class NoScanList(list):
+            def __iter__(self):
+                raise AssertionError("children scanned")
+
+        children = [DataNode("child%d" % i, parent_node) for i in range(10000)]
+        parent_node._children = NoScanList(parent_node._children)
+
+        assert parent_node.rowOfChild(children[-1]) == 9999
+        assert parent_node.rowOfChild(children[5000]) == 5000
+
     def test_remove_child(self, parent_node):
         """Test removeChild method."""
         # Create child nodes
@@ -1,8 +1,12 @@
+import datetime
+
 import pytest
 from unittest.mock import patch, MagicMock
 from PySide6.QtWidgets import QTreeView, QPushButton
-from PySide6.QtCore import QModelIndex
+from PySide6.QtCore import QDate, QModelIndex
+from SimStackServer.MessageTypes import JobStatus
 
+from simstack.lib.WorkflowQuery import WorkflowQuery
 from simstack.view.WFRemoteFileSystem import WFRemoteFileSystem
 from simstack.view.WFEditorTreeModels import WFERemoteFileSystemModel as FSModel
 
@@ -60,8 +64,10 @@ class TestWFRemoteFileSystem:
 
             fs._WFRemoteFileSystem__btn_reload = MagicMock(spec=QPushButton)
             fs._WFRemoteFileSystem__current_requests = {}
+            fs._WFRemoteFileSystem__listed = {}
 
             # Add mock signals
+            fs.request_reload = MagicMock()
             fs.request_job_list_update = MagicMock()
             fs.request_worflow_list_update = MagicMock()
             fs.request_job_update = MagicMock()
@@ -150,8 +156,31 @@ class TestWFRemoteFileSystem:
             # Verify update_file_tree_node was called with correct arguments
             mock_update.assert_called_once_with(fs._WF_PATH, mock_wfs)
 
+    def test_update_workflow_list_page(self, remote_file_system, mock_fs_model):
+        """Test later pages of workflows are appended to the shown ones."""
+        fs = remote_file_system
+        listed = MagicMock()
+        listed.isValid.return_value = True
+        fs._WFRemoteFileSystem__listed = {fs._WF_PATH: listed}
+        mock_wfs = [{"name": "wf1", "path": "wf1_path", "type": "w", "id": "1"}]
+
+        # Call the method
+        with patch.object(fs, "update_file_tree_node") as mock_update, patch(
+            "simstack.view.WFRemoteFileSystem.QModelIndex"
+        ) as mock_index_class:
+            fs.update_workflow_list(mock_wfs, 200, 201)
+
+        # Verify
+        mock_update.assert_not_called()
+        mock_fs_model.set_workflow_count.assert_called_once_with(201)
+        index, entries = mock_fs_model.appendDataRows.call_args[0]
+        assert index is mock_index_class.return_value
+        assert [e["abspath"] for e in entries] == ["/wf1_path"]
+
+    @patch("simstack.view.WFRemoteFileSystem.QModelIndex")
+    @patch("simstack.view.WFRemoteFileSystem.QPersistentModelIndex")
     def test_update_file_tree_node_existing_path(
-        self, remote_file_system, mock_fs_model
+        self, mock_persistent, mock_index_class, remote_file_system, mock_fs_model
     ):
         """Test update_file_tree_node method with an existing path."""
         fs = remote_file_system
@@ -185,14 +214,20 @@ class TestWFRemoteFileSystem:
         fs.update_file_tree_node("test_path", mock_data)
 
         # Verify the model was updated
-        mock_fs_model.removeSubRows.assert_called_once_with(mock_index)
-        mock_fs_model.insertDataRows.assert_called_once()
+        mock_fs_model.updateDataRows.assert_called_once()
+        mock_index_class.assert_called_once_with(mock_index)
+        index = mock_index_class.return_value
+        assert mock_fs_model.updateDataRows.call_args[0][0] is index
+        assert len(mock_fs_model.updateDataRows.call_args[0][1]) == 4
+        mock_fs_model.removeSubRows.assert_not_called()
 
         # Verify current_requests was updated
         assert "test_path" not in fs._WFRemoteFileSystem__current_requests
 
+    @patch("simstack.view.WFRemoteFileSystem.QModelIndex")
+    @patch("simstack.view.WFRemoteFileSystem.QPersistentModelIndex")
     def test_update_file_tree_node_workflow_path(
-        self, remote_file_system, mock_fs_model
+        self, mock_persistent, mock_index_class, remote_file_system, mock_fs_model
     ):
         """Test update_file_tree_node method with workflow path."""
         fs = remote_file_system
@@ -224,16 +259,71 @@ class TestWFRemoteFileSystem:
         fs.update_file_tree_node("?wf?", mock_data)
 
         # Verify the model was updated
-        mock_fs_model.removeSubRows.assert_called_once_with(mock_index)
-        mock_fs_model.insertDataRows.assert_called_once()
+        mock_fs_model.updateDataRows.assert_called_once()
 
         # Verify current_requests was updated
         assert "?wf?" not in fs._WFRemoteFileSystem__current_requests
 
         # Verify entries were sorted (workflows are sorted in reverse)
-        sorted(mock_data, key=lambda k: k["name"], reverse=True)
-        first_entry_idx = mock_fs_model.insertDataRows.call_args[0][0]
-        assert first_entry_idx == 0  # Should insert at position 0
+        entries = mock_fs_model.updateDataRows.call_args[0][1]
+        assert [e["name"] for e in entries] == ["wf2", "wf1"]
+
+    def test_update_file_tree_node_refresh(self, remote_file_system, mock_fs_model):
+        """Test refreshed listings replace the rows of an already listed path."""
+        fs = remote_file_system
+        listed = MagicMock()
+        listed.isValid.return_value = True
+        fs._WFRemoteFileSystem__listed = {"test_path": listed}
+        mock_data = [{"name": "file1", "path": "file1_path", "type": "f", "id": "1"}]
+
+        # Call the method
+        with patch(
+            "simstack.view.WFRemoteFileSystem.QModelIndex"
+        ) as mock_index_class, patch(
+            "simstack.view.WFRemoteFileSystem.WFERemoteFileSystemEntry.createData"
+        ):
+            fs.update_file_tree_node("test_path", mock_data)
+
+        # Verify the rows were updated
+        mock_index_class.assert_called_once_with(listed)
+        index = mock_index_class.return_value
+        assert mock_fs_model.updateDataRows.call_args[0][0] is index
+
+        # Listings of removed rows are dropped
+        listed.isValid.return_value = False
+        fs.update_file_tree_node("test_path", mock_data)
+        assert fs._WFRemoteFileSystem__listed == {}
+
+    def test_update_file_tree_nodes(self, remote_file_system, mock_fs_model):
+        """Test update_file_tree_nodes fills parents before prefetched children."""
+        fs = remote_file_system
+        parent_index = MagicMock()
+        child_index = MagicMock()
+        mock_fs_model.rowCount.return_value = 1
+        mock_fs_model.index.return_value = child_index
+        mock_fs_model.get_abspath.return_value = "/wf/job"
+        fs._WFRemoteFileSystem__current_requests = {"/wf": parent_index}
+        updated = []
+
+        def update(path, files):
+            updated.append(path)
+            index = fs._WFRemoteFileSystem__current_requests.pop(path)
+            listed = MagicMock()
+            listed.isValid.return_value = True
+            fs._WFRemoteFileSystem__listed[path] = listed
+            assert index is (parent_index if path == "/wf" else child_index)
+
+        # Call method
+        with patch.object(fs, "update_file_tree_node", side_effect=update), patch(
+            "simstack.view.WFRemoteFileSystem.QModelIndex"
+        ):
+            fs.update_file_tree_nodes(
+                {"/wf/job/unknown": [], "/wf/job": ["out"], "/wf": ["job"]}
+            )
+
+        # Verify
+        assert updated == ["/wf", "/wf/job"]
+        fs._WFRemoteFileSystem__fileTree.setUpdatesEnabled.assert_called_with(True)
 
     def test_update_file_tree_node_nonexistent_path(self, remote_file_system):
         """Test update_file_tree_node method with a non-existent path."""
@@ -264,15 +354,18 @@ class TestWFRemoteFileSystem:
         path = "test_path"
 
         # Set up signal spy
-        with patch.object(fs.request_job_list_update, "emit") as mock_emit:
+        with patch.object(fs.request_job_list_update, "emit") as mock_emit, patch(
+            "simstack.view.WFRemoteFileSystem.QPersistentModelIndex"
+        ) as mock_persistent:
             # Call the method
             fs._WFRemoteFileSystem__request_header_entry_update(
                 mock_index, path, index_type
             )
 
             # Verify current_requests was updated
-            assert path in fs._WFRemoteFileSystem__current_requests
-            assert fs._WFRemoteFileSystem__current_requests[path] is mock_index
+            mock_persistent.assert_called_once_with(mock_index)
+            requests = fs._WFRemoteFileSystem__current_requests
+            assert requests[path] is mock_persistent.return_value
 
             # Verify signal was emitted
             mock_emit.assert_called_once()
@@ -287,15 +380,18 @@ class TestWFRemoteFileSystem:
         path = "test_path"
 
         # Set up signal spy
-        with patch.object(fs.request_worflow_list_update, "emit") as mock_emit:
+        with patch.object(fs.request_worflow_list_update, "emit") as mock_emit, patch(
+            "simstack.view.WFRemoteFileSystem.QPersistentModelIndex"
+        ) as mock_persistent:
             # Call the method
             fs._WFRemoteFileSystem__request_header_entry_update(
                 mock_index, path, index_type
             )
 
             # Verify current_requests was updated
-            assert path in fs._WFRemoteFileSystem__current_requests
-            assert fs._WFRemoteFileSystem__current_requests[path] is mock_index
+            mock_persistent.assert_called_once_with(mock_index)
+            requests = fs._WFRemoteFileSystem__current_requests
+            assert requests[path] is mock_persistent.return_value
 
             # Verify signal was emitted
             mock_emit.assert_called_once()
@@ -351,6 +447,30 @@ class TestWFRemoteFileSystem:
             # Verify download_file was called with the selected index
             mock_download.assert_called_once_with(mock_index)
 
+    def test_on_cm_download_selection(self, remote_file_system, mock_fs_model):
+        """Test __on_cm_download with several files and directories selected."""
+        fs = remote_file_system
+
+        # Setup a file, a directory and a job in the selection
+        indices = [MagicMock(spec=QModelIndex) for _ in range(3)]
+        fs._WFRemoteFileSystem__fileTree.selectedIndexes = MagicMock(
+            return_value=indices
+        )
+        types = {
+            id(indices[0]): FSModel.DATA_TYPE_FILE,
+            id(indices[1]): FSModel.DATA_TYPE_DIRECTORY,
+            id(indices[2]): FSModel.DATA_TYPE_JOB,
+        }
+        mock_fs_model.get_type.side_effect = lambda index: types[id(index)]
+        mock_fs_model.get_abspath.side_effect = ["/wf/file", "/wf/dir"]
+
+        with patch.object(fs, "download_files") as mock_signal:
+            # Call the method
+            fs._WFRemoteFileSystem__on_cm_download()
+
+            # Verify files and directories are requested together
+            mock_signal.emit.assert_called_once_with(["/wf/file", "/wf/dir"])
+
     def test_on_cm_upload(self, remote_file_system, mock_fs_model):
         """Test __on_cm_upload method."""
         fs = remote_file_system
@@ -551,3 +671,73 @@ class TestWFRemoteFileSystem:
 
             # Verify __got_request was called with None
             mock_got_request.assert_called_once_with(None)
+            fs.request_reload.emit.assert_called_once()
+
+    def _filter_widgets(self, fs, name="", regex=False, status=None, date=None):
+        fs._WFRemoteFileSystem__filter_name = MagicMock()
+        fs._WFRemoteFileSystem__filter_name.text.return_value = name
+        fs._WFRemoteFileSystem__filter_regex = MagicMock()
+        fs._WFRemoteFileSystem__filter_regex.isChecked.return_value = regex
+        fs._WFRemoteFileSystem__filter_status = MagicMock()
+        fs._WFRemoteFileSystem__filter_status.currentData.return_value = status
+        fs._WFRemoteFileSystem__filter_date = MagicMock()
+        fs._WFRemoteFileSystem__filter_date.date.return_value = (
+            date or WFRemoteFileSystem._ANY_DATE
+        )
+        fs.workflow_query_changed = MagicMock()
+
+    def test_apply_filter(self, remote_file_system, mock_fs_model):
+        """Test the filter bar emits the query and requests the workflows."""
+        fs = remote_file_system
+        self._filter_widgets(
+            fs, "relax", status=JobStatus.RUNNING, date=QDate(2024, 2, 1)
+        )
+        header = QModelIndex()
+        mock_fs_model.get_separator_indices.return_value = [header]
+        mock_fs_model.get_type.return_value = FSModel.HEADER_TYPE_WORKFLOW
+        fs._WFRemoteFileSystem__fileTree.isExpanded.return_value = False
+
+        # Call the method
+        fs._WFRemoteFileSystem__apply_filter()
+
+        # Verify
+        fs.workflow_query_changed.emit.assert_called_once_with(
+            WorkflowQuery(
+                "relax",
+                statuses=[JobStatus.RUNNING],
+                submitted_after=datetime.datetime(2024, 2, 1),
+            )
+        )
+        fs._WFRemoteFileSystem__fileTree.expand.assert_called_once_with(header)
+
+        # Expanded headers are requested directly, empty queries are None
+        self._filter_widgets(fs)
+        fs._WFRemoteFileSystem__fileTree.isExpanded.return_value = True
+        with patch.object(fs, "_WFRemoteFileSystem__got_request") as mock_got_request:
+            fs._WFRemoteFileSystem__apply_filter()
+        fs.workflow_query_changed.emit.assert_called_once_with(None)
+        mock_got_request.assert_called_once_with(header)
+
+    def test_apply_filter_invalid_regex(self, remote_file_system):
+        """Test invalid regular expressions are marked and not queried."""
+        fs = remote_file_system
+        self._filter_widgets(fs, "(", regex=True)
+
+        # Call the method
+        fs._WFRemoteFileSystem__apply_filter()
+
+        # Verify
+        fs.workflow_query_changed.emit.assert_not_called()
+        fs._WFRemoteFileSystem__filter_name.setStyleSheet.assert_called_once_with(
+            "color: red"
+        )
+
+    def test_update_status(self, remote_file_system, mock_fs_model):
+        """Test polled status changes are passed to the model."""
+        changes = [("wf", "job", JobStatus.RUNNING)]
+
+        # Call the method
+        remote_file_system.update_status(changes)
+
+        # Verify
+        mock_fs_model.update_status.assert_called_once_with(changes)
@@ -208,6 +208,24 @@ class TestWFViewManager:
             status
         )
 
+    def test_set_registry_status(self, view_manager):
+        """Test set_registry_status method."""
+        # Call method
+        view_manager.set_registry_status("registry", "connected")
+
+        # Verify set_registry_status was called on the editor
+        view_manager._editor.set_registry_status.assert_called_once_with(
+            "registry", "connected"
+        )
+
+    def test_set_connect_on_startup(self, view_manager):
+        """Test set_connect_on_startup method."""
+        # Call method
+        view_manager.set_connect_on_startup(True)
+
+        # Verify set_connect_on_startup was called on the main window
+        view_manager._mainwindow.set_connect_on_startup.assert_called_once_with(True)
+
     def test_update_registries(self, view_manager):
         """Test update_registries method."""
         # Call method
@@ -248,7 +266,16 @@ class TestWFViewManager:
         view_manager.update_workflow_list(wfs)
 
         # Verify update_workflow_list was called on the editor
-        view_manager._editor.update_workflow_list.assert_called_once_with(wfs)
+        view_manager._editor.update_workflow_list.assert_called_once_with(wfs, 0, None)
+
+    def test_update_status(self, view_manager):
+        """Test update_status method."""
+        # Call method
+        changes = [("wf1", None, 3)]
+        view_manager.update_status(changes)
+
+        # Verify update_status was called on the editor
+        view_manager._editor.update_status.assert_called_once_with(changes)
 
     def test_on_file_download(self, view_manager):
         """Test _on_file_download method."""
@@ -287,6 +314,32 @@ class TestWFViewManager:
             # Verify last_used_path was updated
             assert view_manager.last_used_path == "/path/to/remote"
 
+    def test_on_directory_download(self, view_manager):
+        """Test _on_directory_download method."""
+        with patch(
+            "simstack.view.WFViewManager.QFileDialog.getExistingDirectory"
+        ) as mock_dialog, patch(
+            "simstack.view.WFViewManager.QInputDialog.getText"
+        ) as mock_input:
+            # Setup return values
+            mock_dialog.return_value = "/local/dir"
+            mock_input.return_value = (" ForEach/*/outputs/* ", True)
+            view_manager.download_directory_to = MagicMock()
+
+            # Call method
+            view_manager._on_directory_download("/remote/wf")
+
+            # Verify signal was emitted with the stripped pattern
+            view_manager.download_directory_to.emit.assert_called_once_with(
+                "/remote/wf", "/local/dir", "ForEach/*/outputs/*"
+            )
+            assert view_manager.last_used_path == "/local/dir"
+
+            # Cancelling the filter dialog aborts the download
+            mock_input.return_value = ("", False)
+            view_manager._on_directory_download("/remote/wf")
+            view_manager.download_directory_to.emit.assert_called_once()
+
     def test_on_file_upload(self, view_manager):
         """Test _on_file_upload method."""
         # Mock QFileDialog.getOpenFileName
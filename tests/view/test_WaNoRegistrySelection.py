@@ -216,6 +216,21 @@ class TestWaNoRegistrySelection:
             )
             mock_update.assert_called_once()
 
+    def test_set_registry_status(self, registry_selection):
+        """Test every registry shows its own status in the combo box."""
+        states = WaNoRegistrySelection.CONNECTION_STATES
+        combo_box = registry_selection.registryComboBox
+        registry_selection.update_registries(["reg1", "reg2", "reg3"])
+
+        registry_selection.setStatus(states.connected)
+        registry_selection.setRegistryStatus("reg3", states.connecting)
+        registry_selection.setRegistryStatus("unknown", states.connected)
+
+        button_icon = registry_selection.isConnectedIcon.icon()
+        assert combo_box.itemIcon(0).cacheKey() == button_icon.cacheKey()
+        assert combo_box.itemIcon(1).isNull()
+        assert combo_box.itemIcon(2).cacheKey() not in (0, button_icon.cacheKey())
+
     def test_select_registry_sets_current_index(self, registry_selection):
         """Test that select_registry sets the correct combo box index."""
         registry_selection.registryComboBox.addItem("item0")
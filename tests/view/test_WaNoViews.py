@@ -24,6 +24,7 @@ from simstack.view.WaNoViews import (
     WaNoDropDownView,
     WaNoChoiceView,
     WaNoTabView,
+    referenced_files,
 )
 
 
@@ -697,6 +698,29 @@ class TestWaNoItemFileView:
         assert "/path/to/selected/file.txt" in view.lineedit.text()
 
 
+    def test_referenced_files(self, qtbot, tmp_path):
+        """Test referenced_files finds the existing files of one WaNo."""
+        local_file = tmp_path / "input.txt"
+        local_file.write_text("input")
+        root = MagicMock()
+        views = []
+        for filename, view_root in [
+            (str(local_file), root),
+            ("WaNo1/outputs/imported.txt", root),
+            ("", root),
+            (str(local_file), MagicMock()),
+        ]:
+            view = WaNoItemFileView()
+            qtbot.addWidget(view.actual_widget)
+            model = MagicMock()
+            model.get_data.return_value = filename
+            model.get_root.return_value = view_root
+            view.set_model(model)
+            views.append(view)
+
+        assert referenced_files(root) == [str(local_file)]
+
+
 class TestOnlyFloatDelegate:
     """Tests for OnlyFloatDelegate."""
 
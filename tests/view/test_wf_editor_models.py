@@ -1,7 +1,8 @@
 import pytest
 import os
 import tempfile
-from unittest.mock import MagicMock, patch, mock_open
+import threading
+from unittest.mock import MagicMock, patch
 from pathlib import Path
 
 from simstack.view.wf_editor_models import (
@@ -415,6 +416,9 @@ class TestSubWFModel:
         sub_wf_model.elements = [mock_wano]
         sub_wf_model.elementnames = ["TestWaNo"]
         sub_wf_model.element_to_name = MagicMock(return_value="TestWaNo")
+        sub_wf_model.wf_root.render_wano.side_effect = lambda wano, *args, **kwargs: (
+            wano.render(*args, **kwargs)
+        )
 
         with patch("os.makedirs"), patch("os.path.join", return_value="job/TestWaNo"):
             activities, transitions, parent_ids = sub_wf_model.render_to_simple_wf(
@@ -2308,6 +2312,71 @@ class TestWFModel:
 
             assert result is mock_xml
 
+    def _render_workflow_elements(self, wf_model, wanos):
+        with (
+            patch("os.makedirs"),
+            patch("simstack.view.wf_editor_models.Workflow") as mock_workflow,
+            patch(
+                "simstack.view.wf_editor_models.WorkflowElementList",
+                side_effect=lambda activities: activities,
+            ),
+            patch(
+                "simstack.view.wf_editor_models.DirectedGraph",
+                side_effect=lambda transitions: transitions,
+            ),
+            patch("simstack.view.wf_editor_models.etree"),
+        ):
+            wf_model.collect_wano_widgets = MagicMock(return_value=wanos)
+            wf_model.render_to_simple_wf("submit", "job")
+        kwargs = mock_workflow.call_args.kwargs
+        return kwargs["elements"], kwargs["graph"]
+
+    def test_render_to_simple_wf_parallel(self, wf_model):
+        """Test WaNos are rendered in parallel with the serial result."""
+        wanos = []
+        for i in range(3):
+            wano = MagicMock()
+            wano.is_wano = True
+            wem = MagicMock()
+            wem.uid = "uid%d" % i
+            wano.render.return_value = ("jsdl", wem, ["path"])
+            wanos.append(wano)
+        wf_model.elements = list(wanos)
+        wf_model.elementnames = ["WaNo0", "WaNo1", "WaNo2"]
+
+        serial = self._render_workflow_elements(wf_model, [])
+        main_thread = threading.get_ident()
+        for wano in wanos:
+            wano.render.reset_mock()
+            wano.construct_wano.side_effect = lambda: threads.append(
+                threading.get_ident()
+            )
+        threads = []
+        parallel = self._render_workflow_elements(wf_model, wanos)
+
+        assert parallel == serial
+        # WaNos are constructed in the calling thread before rendering
+        assert threads == [main_thread] * 3
+        assert parallel[1] == [("0", "uid0"), ("uid0", "uid1"), ("uid1", "uid2")]
+        for name, wano in zip(wf_model.elementnames, wanos):
+            wano.render.assert_called_once_with(
+                [], [], os.path.join("job", name), stageout_basedir=name
+            )
+        assert wf_model._wano_renderer is None
+
+    def test_render_to_simple_wf_parallel_error(self, wf_model):
+        """Test render errors of the pool are raised to the caller."""
+        wanos = [MagicMock(), MagicMock()]
+        for wano in wanos:
+            wano.is_wano = True
+        wanos[1].render.side_effect = IOError("Disk full")
+        wf_model.elements = list(wanos)
+        wf_model.elementnames = ["WaNo0", "WaNo1"]
+
+        with pytest.raises(IOError, match="Disk full"):
+            self._render_workflow_elements(wf_model, wanos)
+        assert wf_model._wano_renderer is None
+
     def test_assemble_files_with_elements(self, wf_model):
         """Test assemble_files with WaNo and control elements."""
         mock_wano = MagicMock()
@@ -2342,11 +2411,14 @@ class TestWFModel:
             # Mock WaNo element
             from lxml import etree
 
+            staged = []
             mock_wano = MagicMock()
             mock_wano.is_wano = True
             mock_xml_element = etree.Element("test_wano")
             mock_wano.get_xml.return_value = mock_xml_element
-            mock_wano.instantiate_in_folder.return_value = True
+            mock_wano.instantiate_in_folder.side_effect = lambda folder: (
+                staged.append(folder) or True
+            )
             mock_wano.save_delta = MagicMock()
 
             # Mock control element
@@ -2358,37 +2430,31 @@ class TestWFModel:
             wf_model.elements = [mock_wano, mock_control]
             wf_model.elementnames = ["WaNo1", "Control1"]
 
-            with patch(
-                "simstack.view.wf_editor_models.WaNoSettingsProvider"
-            ) as mock_settings_provider, patch(
-                "simstack.view.wf_editor_models.SimStackPaths"
-            ), patch(
-                "simstack.view.wf_editor_models.SETTING_KEYS",
-                {"workflows": "workflows"},
-            ), patch("os.makedirs"), patch("builtins.open", mock_open()), patch(
-                "simstack.view.wf_editor_models.etree.tostring", return_value="<xml/>"
-            ):
-                mock_settings = MagicMock()
-                mock_settings.get_value.return_value = temp_dir
-                mock_settings_provider.get_instance.return_value = mock_settings
+            result = wf_model.save_to_disk(test_folder)
 
-                result = wf_model.save_to_disk(test_folder)
+            assert result is True
+            assert wf_model.wf_name == "TestWorkflow"
+            assert wf_model.foldername == test_folder
 
-                assert result is True
-                assert wf_model.wf_name == "TestWorkflow"
-                assert wf_model.foldername == test_folder
+            # Elements were saved to the staging directory
+            (staging,) = staged
+            assert staging.parent == Path(temp_dir)
+            assert wf_model.save_destination(staging) == staging
+            mock_wano.save_delta.assert_called_once_with(staging)
+            mock_control.save_to_disk.assert_called_once_with(staging)
 
-                # Verify WaNo save was called
-                mock_wano.instantiate_in_folder.assert_called_once_with(test_folder)
-                mock_wano.save_delta.assert_called_once_with(test_folder)
-
-                # Verify control save was called
-                mock_control.save_to_disk.assert_called_once_with(test_folder)
+            # Which was swapped in
+            assert os.listdir(temp_dir) == ["TestWorkflow"]
+            xml = Path(test_folder, "TestWorkflow.xml").read_text()
+            assert "test_wano" in xml
+            assert "test_control" in xml
 
     def test_save_to_disk_failure(self, wf_model):
         """Test save_to_disk with failed save."""
         with tempfile.TemporaryDirectory() as temp_dir:
             test_folder = os.path.join(temp_dir, "TestWorkflow")
+            os.makedirs(test_folder)
+            Path(test_folder, "TestWorkflow.xml").write_text("<old/>")
 
             # Mock WaNo element that fails
             from lxml import etree
@@ -2402,16 +2468,7 @@ class TestWFModel:
             wf_model.elements = [mock_wano]
             wf_model.elementnames = ["WaNo1"]
 
-            with patch(
-                "simstack.view.wf_editor_models.WaNoSettingsProvider"
-            ) as mock_settings_provider, patch(
-                "simstack.view.wf_editor_models.SETTING_KEYS",
-                {"workflows": "workflows"},
-            ), patch("os.makedirs"), patch("builtins.print") as mock_print:
-                mock_settings = MagicMock()
-                mock_settings.get_value.return_value = temp_dir
-                mock_settings_provider.get_instance.return_value = mock_settings
-
+            with patch("builtins.print") as mock_print:
                 with pytest.raises(
                     Exception, match="This should be a custom exception"
                 ):
@@ -2420,38 +2477,83 @@ class TestWFModel:
                 # Verify error was printed
                 mock_print.assert_called_once_with("Error while writing wano")
 
-    def test_save_to_disk_embedded_path(self, wf_model):
-        """Test save_to_disk with embedded path setting."""
+            # The old workflow is untouched
+            assert os.listdir(temp_dir) == ["TestWorkflow"]
+            assert Path(test_folder, "TestWorkflow.xml").read_text() == "<old/>"
+
+    def test_save_to_disk_keeps_unchanged_xml(self, wf_model, tmp_path):
+        """Test save_to_disk only writes the workflow XML, when it changed."""
+        from lxml import etree
+
+        test_folder = tmp_path / "TestWorkflow"
+        mock_control = MagicMock()
+        mock_control.is_wano = False
+        mock_control.save_to_disk.return_value = etree.Element("test_control")
+        wf_model.elements = [mock_control]
+        wf_model.elementnames = ["Control1"]
+        xml_path = test_folder / "TestWorkflow.xml"
+
+        wf_model.save_to_disk(test_folder)
+        first = os.stat(xml_path)
+        wf_model.save_to_disk(test_folder)
+        assert os.stat(xml_path).st_ino == first.st_ino
+
+        # Changed workflow
+        mock_control.save_to_disk.return_value = etree.Element("other_control")
+        wf_model.save_to_disk(test_folder)
+        assert os.stat(xml_path).st_ino != first.st_ino
+        assert "other_control" in xml_path.read_text()
+
+    def test_save_to_disk_without_hard_links(self, wf_model, tmp_path):
+        """Test save_to_disk writes the unchanged XML, if it cannot be linked."""
+        from lxml import etree
+
+        test_folder = tmp_path / "TestWorkflow"
+        mock_control = MagicMock()
+        mock_control.is_wano = False
+        mock_control.save_to_disk.return_value = etree.Element("test_control")
+        wf_model.elements = [mock_control]
+        wf_model.elementnames = ["Control1"]
+        wf_model.save_to_disk(test_folder)
+
+        with patch(
+            "simstack.view.wf_editor_models.os.link",
+            side_effect=OSError("Operation not permitted"),
+        ):
+            assert wf_model.save_to_disk(test_folder) is True
+
+        assert "test_control" in (test_folder / "TestWorkflow.xml").read_text()
+
+    def test_save_to_disk_keeps_submissions(self, wf_model):
+        """Test save_to_disk replaces the old state, but keeps submissions."""
         with tempfile.TemporaryDirectory() as temp_dir:
-            test_folder = os.path.join(temp_dir, "TestWorkflow")
+            test_folder = Path(temp_dir) / "TestWorkflow"
+            (test_folder / "wanos" / "OldWaNo").mkdir(parents=True)
+            (test_folder / "Submitted" / "2024-run").mkdir(parents=True)
+            (test_folder / "TestWorkflow.xml").write_text("<old/>")
 
-            wf_model.elements = []
-            wf_model.elementnames = []
+            # Mock WaNo element writing its new directory
+            from lxml import etree
 
-            with patch(
-                "simstack.view.wf_editor_models.WaNoSettingsProvider"
-            ) as mock_settings_provider, patch(
-                "simstack.view.wf_editor_models.SimStackPaths"
-            ) as mock_paths, patch(
-                "simstack.view.wf_editor_models.SETTING_KEYS",
-                {"workflows": "workflows"},
-            ), patch("simstack.view.wf_editor_models.join") as mock_join, patch(
-                "os.makedirs"
-            ), patch("builtins.open", mock_open()):
-                mock_settings = MagicMock()
-                mock_settings.get_value.return_value = "<embedded>"
-                mock_settings_provider.get_instance.return_value = mock_settings
-
-                mock_paths.get_embedded_path.return_value = "/embedded/path"
-                mock_join.side_effect = lambda *args: "/".join(args)
-
-                result = wf_model.save_to_disk(test_folder)
-
-                assert result is True
-                # Verify embedded path was used
-                mock_paths.get_embedded_path.assert_called_once()
-
-    def test_read_from_disk_v2(self, wf_model):
+            mock_wano = MagicMock()
+            mock_wano.is_wano = True
+            mock_wano.get_xml.return_value = etree.Element("test_wano")
+            mock_wano.instantiate_in_folder.side_effect = lambda folder: (
+                (folder / "wanos" / "NewWaNo").mkdir(parents=True) or True
+            )
+
+            wf_model.elements = [mock_wano]
+            wf_model.elementnames = ["WaNo1"]
+            result = wf_model.save_to_disk(test_folder)
+
+            assert result is True
+            assert "Submitted" in os.listdir(test_folder)
+            assert os.listdir(test_folder / "wanos") == ["NewWaNo"]
+            assert (test_folder / "TestWorkflow.xml").read_text() != "<old/>"
+            assert os.listdir(test_folder / "Submitted") == ["2024-run"]
+            assert os.listdir(temp_dir) == ["TestWorkflow"]
+
+    def test_read_from_disk_v2(self, wf_model, qapp):
         """Test read_from_disk with version 2.0 workflow."""
         with tempfile.TemporaryDirectory() as temp_dir:
             wf_name = "TestWorkflow"
@@ -2489,7 +2591,9 @@ class TestWFModel:
                 "simstack.view.wf_editor_models.WaNoDelta"
             ) as mock_wanodelta, patch(
                 "simstack.view.wf_editor_models._get_control_factory"
-            ) as mock_factory:
+            ) as mock_factory, patch(
+                "simstack.view.wf_editor_models.recover_folder"
+            ) as mock_recover:
                 mock_widget = MagicMock()
                 mock_wfwanowidget.instantiate_from_folder.return_value = mock_widget
 
@@ -2507,19 +2611,42 @@ class TestWFModel:
                 wf_model.read_from_disk(wf_folder)
 
                 # Verify workflow was loaded
+                mock_recover.assert_called_once_with(wf_folder)
                 assert wf_model.foldername == wf_folder
                 assert wf_model.wf_name == wf_name
                 assert wf_model._wf_read_version == "2.0"
 
-                # Verify elements were added
+                # Verify elements were added lazily
                 assert len(wf_model.elements) == 2
                 assert wf_model.elements[0] is mock_widget
                 assert wf_model.elements[1] is mock_model
                 assert wf_model.elementnames == ["TestWaNo", "TestControl"]
+                assert (
+                    mock_wfwanowidget.instantiate_from_folder.call_args.kwargs["lazy"]
+                    is True
+                )
 
                 # Verify view geometry update
                 wf_model.view.updateGeometry.assert_called_once()
 
+                # Verify the WaNos are constructed while idle
+                assert wf_model._wano_prefetcher.is_active()
+                wf_model._wano_prefetcher.stop()
+
+    def test_prefetch_wano(self, wf_model):
+        """Test _prefetch_wano constructs one lazily read WaNo per call."""
+        widgets = [MagicMock(constructed=True), MagicMock(constructed=False)]
+        widgets[1].construct_wano.side_effect = lambda: setattr(
+            widgets[1], "constructed", True
+        )
+
+        with patch.object(wf_model, "collect_wano_widgets", return_value=widgets):
+            assert wf_model._prefetch_wano() is True
+            assert wf_model._prefetch_wano() is False
+
+        widgets[0].construct_wano.assert_not_called()
+        widgets[1].construct_wano.assert_called_once()
+
     def test_read_from_disk_v1(self, wf_model):
         """Test read_from_disk with version 1.0 workflow (no version attribute)."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -1,6 +1,11 @@
+import gc
+import sys
+
 import pytest
 from unittest.mock import patch, MagicMock
-from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtCore import QModelIndex, QPersistentModelIndex, Qt
+from PySide6.QtGui import QColor, QIcon, QImage, QPixmap
+from PySide6.QtWidgets import QFileIconProvider
 
 from simstack.view.WFEditorTreeModels import (
     DATA_TYPE,
@@ -12,10 +17,20 @@ from simstack.view.WFEditorTreeModels import (
     WFERemoteFileSystemModel,
     JOB_STATUS_TO_DATA_TYPE,
     WF_STATUS_TO_DATA_TYPE,
+    cached_icon,
+    clear_icon_cache,
 )
 from SimStackServer.MessageTypes import JobStatus
 
 
+@pytest.fixture(autouse=True)
+def empty_icon_cache():
+    """Empty the process wide icon cache for tests patching QFileIconProvider."""
+    clear_icon_cache()
+    yield
+    clear_icon_cache()
+
+
 class TestDataTreeModel:
     @pytest.fixture
     def model(self):
@@ -36,7 +51,6 @@ class TestDataTreeModel:
         assert model._root._data == "root node"
         assert model._columns == 1
         assert model._items == []
-        assert model.junk == []
 
     def test_get_node_by_index_valid(self, model):
         """Test getNodeByIndex with valid index."""
@@ -438,6 +452,87 @@ class TestWFEFileSystemModel:
             mock_insert.assert_called_once()
             mock_print.assert_called_once_with("insertDataRows: True")
 
+    def _rows(self, *names):
+        return [
+            WFEFileSystemEntry.createData(name, "/dir/" + name, DATA_TYPE.FILE)
+            for name in names
+        ]
+
+    def test_update_data_rows(self, model):
+        """Test updateDataRows only emits signals for changed rows."""
+        parent = QModelIndex()
+        model.insertDataRows(0, self._rows("a", "b", "c", "d"), parent)
+        kept = model.index(2, 0, parent).internalPointer()
+        DataNode("child", kept)
+        signals = []
+        model.rowsRemoved.connect(lambda p, f, t: signals.append(("removed", f, t)))
+        model.rowsInserted.connect(lambda p, f, t: signals.append(("inserted", f, t)))
+        model.dataChanged.connect(
+            lambda f, t, r: signals.append(("changed", f.row(), t.row()))
+        )
+
+        rows = self._rows("a", "c", "c2", "c3", "d")
+        rows[0]["path"] = "renamed"
+        model.updateDataRows(parent, rows)
+
+        assert signals == [
+            ("removed", 1, 1),
+            ("changed", 0, 0),
+            ("inserted", 2, 3),
+        ]
+        assert [model._root.childAtRow(i)._data for i in range(5)] == rows
+        assert model._root.childAtRow(1) is kept
+        assert len(kept) == 1
+
+    def test_update_data_rows_reorder(self, model):
+        """Test updateDataRows moves persistent indexes of reordered rows."""
+        parent = QModelIndex()
+        model.insertDataRows(0, self._rows("a", "b"), parent)
+        persistent = QPersistentModelIndex(model.index(0, 0, parent))
+
+        model.updateDataRows(parent, self._rows("b", "x", "a"))
+
+        assert persistent.row() == 2
+        assert model.filePath(QModelIndex(persistent)) == "a"
+        assert model.rowCount(parent) == 3
+
+        model.updateDataRows(parent, [])
+        assert model.rowCount(parent) == 0
+        assert not persistent.isValid()
+
+    def test_removed_rows_are_released(self, model):
+        """Test removed nodes are detached, so they are freed immediately."""
+        parent = QModelIndex()
+        model.insertDataRows(0, self._rows("a", "b"), parent)
+        node = model._root.childAtRow(0)
+        child = WFEFileSystemEntry(self._rows("x")[0], node)
+        other = model._root.childAtRow(1)
+        assert not hasattr(node, "__dict__")
+
+        model.removeRows(0, 2, parent)
+
+        # Only referenced by this test anymore, not by a parent-child cycle
+        assert sys.getrefcount(other) == 2
+        assert node.getParent() is None
+        assert child.getParent() is None
+        assert len(node) == 0
+
+    def test_refresh_does_not_leak(self, model):
+        """Test refreshing a large tree many times keeps only the shown nodes."""
+        parent = QModelIndex()
+        listings = [self._rows(*("%s%d" % (p, i) for i in range(10000))) for p in "ab"]
+
+        gc.disable()
+        try:
+            for refresh in range(100):
+                model.updateDataRows(parent, listings[refresh % 2])
+            alive = sum(isinstance(o, WFEFileSystemEntry) for o in gc.get_objects())
+        finally:
+            gc.enable()
+
+        assert model.rowCount(parent) == 10000
+        assert alive == 10000
+
     def test_subelements_to_text(self, model):
         """Test subelementsToText method."""
         # Create a simple tree structure
@@ -483,7 +578,6 @@ class TestWFERemoteFileSystemModel:
         model._root = DataNode("root node")
         model._columns = 1
         model._items = []
-        model.junk = []
 
         return model
 
@@ -493,28 +587,30 @@ class TestWFERemoteFileSystemModel:
         assert DATA_TYPE.SEPARATOR1 in model._icons
         assert DATA_TYPE.JOB_SUCCESSFUL in model._icons
 
-    def test_pixmap_to_grayscale(self, model):
-        """Test pixmap_to_grayscale method."""
-        # Create a mock pixmap
-        mock_pixmap = MagicMock()
-        mock_image = MagicMock()
-        mock_image.width.return_value = 2
-        mock_image.height.return_value = 2
-        mock_image.pixel.return_value = 0xFF000000  # Black pixel
-        mock_pixmap.toImage.return_value = mock_image
-
-        with patch("simstack.view.WFEditorTreeModels.qGray", return_value=128), patch(
-            "simstack.view.WFEditorTreeModels.QColor"
-        ) as mock_color, patch(
-            "simstack.view.WFEditorTreeModels.QPixmap"
-        ) as mock_qpixmap:
-            mock_color.return_value.rgba.return_value = 0xFF808080
-            mock_qpixmap.fromImage.return_value = mock_pixmap
-
-            model.pixmap_to_grayscale(mock_pixmap)
-
-            # Verify image manipulation calls
-            assert mock_image.setPixel.call_count == 4  # 2x2 pixels
+    def test_pixmap_to_grayscale(self, model, qapp):
+        """Test pixmap_to_grayscale inverts the gray values of all pixels."""
+        image = QImage(2, 2, QImage.Format_ARGB32)
+        image.fill(QColor(0, 0, 0, 0))
+        image.setPixel(1, 1, QColor(255, 255, 255).rgba())
+
+        result = model.pixmap_to_grayscale(QPixmap.fromImage(image)).toImage()
+
+        assert QColor(result.pixel(0, 0)) == QColor(255, 255, 255, 255)
+        assert QColor(result.pixel(1, 1)) == QColor(0, 0, 0, 255)
+
+    def test_cached_icon(self, qapp):
+        """Test icons are created once per icon type, color and size."""
+        with patch(
+            "simstack.view.WFEditorTreeModels.QFileIconProvider"
+        ) as mock_provider:
+            mock_provider.return_value.icon.return_value = QIcon()
+            plain = cached_icon(QFileIconProvider.Computer)
+            red = cached_icon(QFileIconProvider.Computer, Qt.red)
+
+            assert cached_icon(QFileIconProvider.Computer) is plain
+            assert cached_icon(QFileIconProvider.Computer, Qt.red) is red
+            assert red is not plain
+            assert mock_provider.return_value.icon.call_count == 2
 
     def test_colorize_icon_method_exists(self, model):
         """Test colorize_icon method exists and handles non-QIcon input."""
@@ -620,6 +716,83 @@ class TestWFERemoteFileSystemModel:
             )
             assert result is None
 
+    def test_fetch_more_workflows(self, qapp):
+        """Test further pages of workflows are requested once each."""
+        model = WFERemoteFileSystemModel()
+        header = model.index(0, 0)
+        requested = []
+        model.more_workflows_requested.connect(requested.append)
+        rows = [
+            WFERemoteFileSystemEntry.createData(
+                str(i), "wf%d" % i, "wf%d" % i, "/wf%d" % i, model.DATA_TYPE_WORKFLOW
+            )
+            for i in range(3)
+        ]
+        model.updateDataRows(header, rows[:2])
+        assert not model.canFetchMore(header)
+
+        model.set_workflow_count(3)
+        assert model.canFetchMore(header)
+        assert not model.canFetchMore(QModelIndex())
+        model.fetchMore(header)
+        model.fetchMore(header)
+        assert requested == [2]
+
+        # Rows shown already are not appended twice
+        model.appendDataRows(header, rows[1:])
+        assert model.rowCount(header) == 3
+        assert model.filePath(model.index(2, 0, header)) == "wf2"
+        assert not model.canFetchMore(header)
+
+    def test_update_status(self, qapp):
+        """Test polled status changes only touch the affected rows."""
+        model = WFERemoteFileSystemModel()
+        header = model.index(0, 0)
+        model.updateDataRows(
+            header,
+            [
+                WFERemoteFileSystemEntry.createData(
+                    "wf%d" % i,
+                    "wf%d" % i,
+                    "wf%d" % i,
+                    "/wf%d" % i,
+                    model.DATA_TYPE_WORKFLOW,
+                    status=JobStatus.RUNNING,
+                )
+                for i in range(2)
+            ],
+        )
+        workflow = model.index(1, 0, header)
+        model.updateDataRows(
+            workflow,
+            [
+                WFERemoteFileSystemEntry.createData(
+                    "job",
+                    "job",
+                    "job",
+                    "/wf1/job",
+                    model.DATA_TYPE_JOB,
+                    status=JobStatus.QUEUED,
+                )
+            ],
+        )
+        changed = []
+        model.dataChanged.connect(lambda first, last, roles: changed.append(first))
+
+        model.update_status(
+            [
+                ("wf1", None, JobStatus.SUCCESSFUL),
+                ("wf1", "job", JobStatus.SUCCESSFUL),
+                ("wf0", None, JobStatus.RUNNING),
+                ("unknown", None, JobStatus.FAILED),
+            ]
+        )
+
+        assert changed == [workflow, model.index(0, 0, workflow)]
+        assert model.getNodeByIndex(workflow).getIconType() == DATA_TYPE.WF_SUCCESSFUL
+        job = model.getNodeByIndex(model.index(0, 0, workflow))
+        assert job.getIconType() == DATA_TYPE.JOB_SUCCESSFUL
+
     def test_get_id(self, model):
         """Test get_id method."""
         mock_index = MagicMock()
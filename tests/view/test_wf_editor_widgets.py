@@ -1,8 +1,12 @@
+import os
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from simstack.lib.DigestCache import file_digest
+from simstack.lib.RenderCache import RenderCache
+from simstack.view.WaNoViews import WaNoItemFileView
 from simstack.view.wf_editor_widgets import (
     SubmitType,
     WFWaNoWidget,
@@ -57,6 +61,34 @@ class TestWFWaNoWidgetMethods:
         assert variables == ["var1", "var2"]
         widget.wano_model.get_all_variable_paths.assert_called_once()
 
+    def test_lazy_construction(self):
+        """Test lazily instantiated WaNos are constructed on first use."""
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.wano = MagicMock()
+        widget.wf_model = MagicMock()
+        widget._wano_model = None
+        widget._wano_view = None
+        widget.constructed = False
+        widget.pending_delta = Path("/test/wano_configurations/test-uuid")
+        mock_model = MagicMock()
+        mock_view = MagicMock()
+
+        with patch(
+            "simstack.view.wf_editor_widgets.WaNoFactory.wano_constructor",
+            return_value=(mock_model, mock_view),
+        ) as mock_constructor:
+            assert widget.wano_view is mock_view
+            assert widget.wano_model is mock_model
+
+        # Verify
+        mock_constructor.assert_called_once_with(widget.wano)
+        mock_model.set_parent_wf.assert_called_once_with(widget.wf_model)
+        mock_model.read.assert_called_once_with(
+            Path("/test/wano_configurations/test-uuid")
+        )
+        assert widget.constructed
+        assert widget.pending_delta is None
+
     def test_get_variables_no_model(self):
         """Test get_variables when wano_model is None."""
         widget = WFWaNoWidget.__new__(WFWaNoWidget)
@@ -70,6 +102,9 @@ class TestWFWaNoWidgetMethods:
         widget = WFWaNoWidget.__new__(WFWaNoWidget)
         widget.uuid = "test-uuid"
         widget.wano_model = MagicMock()
+        widget.wf_model = MagicMock()
+        widget.wf_model.save_destination.side_effect = Path
+        widget._saved_delta = None
 
         test_folder = Path("/test/folder")
         expected_outfolder = test_folder / "wano_configurations" / "test-uuid"
@@ -81,7 +116,142 @@ class TestWFWaNoWidgetMethods:
 
             mock_makedirs.assert_called_once_with(expected_outfolder, exist_ok=True)
             mock_print.assert_called_once()
-            widget.wano_model.save.assert_called_once_with(expected_outfolder)
+            widget.wano_model.save.assert_called_with(expected_outfolder)
+
+    def test_save_delta_unchanged(self, tmp_path):
+        """Test save_delta only writes changed deltas."""
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.uuid = "test-uuid"
+        widget.wano_model = MagicMock()
+        widget.wano_model.save.side_effect = lambda folder: (
+            folder / "delta.yml"
+        ).write_text("value: %d" % widget.value)
+        widget.value = 1
+        widget.wf_model = MagicMock()
+        widget.wf_model.save_destination.side_effect = Path
+        widget._saved_delta = None
+        delta_file = tmp_path / "wano_configurations" / "test-uuid" / "delta.yml"
+
+        with patch("builtins.print") as mock_print:
+            widget.save_delta(tmp_path)
+            widget.save_delta(tmp_path)
+            assert mock_print.call_count == 1
+
+            # Changed model
+            widget.value = 2
+            widget.save_delta(tmp_path)
+            assert mock_print.call_count == 2
+            assert delta_file.read_text() == "value: 2"
+
+            # Saved files were modified by someone else
+            delta_file.write_text("value: 3, edited")
+            widget.save_delta(tmp_path)
+            assert mock_print.call_count == 3
+            assert delta_file.read_text() == "value: 2"
+
+    def test_delta_digest_scratch_dir(self, tmp_path):
+        """Test deltas are compared in the scratch directory."""
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.wano_model = MagicMock()
+        folders = []
+        widget.wano_model.save.side_effect = lambda folder: (
+            folders.append(folder) or (folder / "delta.yml").write_text("value: 1")
+        )
+
+        with patch(
+            "simstack.view.wf_editor_widgets.DELTA_SCRATCH_DIR", str(tmp_path)
+        ):
+            first = widget._delta_digest()
+            assert widget._delta_digest() == first
+
+        # Verify
+        assert folders[0].parent == tmp_path
+        assert os.listdir(tmp_path) == []
+
+    def test_save_delta_staging(self, tmp_path):
+        """Test save_delta links unchanged deltas into the staging directory."""
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.uuid = "test-uuid"
+        widget.wano_model = MagicMock()
+        widget.wano_model.save.side_effect = lambda folder: (
+            folder / "delta.yml"
+        ).write_text("value: 1")
+        widget._saved_delta = None
+        final = tmp_path / "TestWorkflow"
+        staging = tmp_path / ".TestWorkflow.saving-1"
+        widget.wf_model = MagicMock()
+        widget.wf_model.save_destination.side_effect = lambda folder: (
+            final if folder == staging else Path(folder)
+        )
+
+        with patch("builtins.print") as mock_print:
+            widget.save_delta(final)
+            widget.save_delta(staging)
+
+        # Verify
+        assert mock_print.call_count == 1
+        staged = staging / "wano_configurations" / "test-uuid" / "delta.yml"
+        saved = final / "wano_configurations" / "test-uuid" / "delta.yml"
+        assert staged.read_text() == "value: 1"
+        assert os.path.samefile(staged, saved)
+
+    def test_save_delta_lazy(self, tmp_path):
+        """Test save_delta links the delta of WaNos, which were not constructed."""
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.uuid = "test-uuid"
+        widget.constructed = False
+        widget._saved_delta = None
+        final = tmp_path / "TestWorkflow"
+        staging = tmp_path / ".TestWorkflow.saving-1"
+        saved = final / "wano_configurations" / "test-uuid"
+        saved.mkdir(parents=True)
+        (saved / "delta.yml").write_text("value: 1")
+        widget.pending_delta = saved
+        widget.wf_model = MagicMock()
+        widget.wf_model.save_destination.return_value = final
+
+        with patch(
+            "simstack.view.wf_editor_widgets.WaNoFactory.wano_constructor"
+        ) as mock_constructor:
+            widget.save_delta(staging)
+
+        # Verify
+        mock_constructor.assert_not_called()
+        staged = staging / "wano_configurations" / "test-uuid" / "delta.yml"
+        assert os.path.samefile(staged, saved / "delta.yml")
+        assert widget.pending_delta == saved
+
+    def test_compare_wano_equality(self, tmp_path):
+        """Test WaNos are compared by the digests of their XMLs."""
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        wanos = []
+        for name in ("first", "second"):
+            folder = tmp_path / name
+            folder.mkdir()
+            (folder / "TestWaNo.xml").write_text("<WaNoTemplate/>")
+            wano = MagicMock()
+            wano.name = "TestWaNo"
+            wano.folder = folder
+            wanos.append(wano)
+
+        with (
+            patch(
+                "simstack.view.wf_editor_widgets.file_digest",
+                wraps=file_digest,
+            ) as mock_digest,
+            patch(
+                "simstack.view.wf_editor_widgets.get_wano_xml_path",
+                side_effect=lambda folder, wano_name_override: (
+                    folder / (wano_name_override + ".xml")
+                ),
+            ),
+        ):
+            assert widget._compare_wano_equality(*wanos)
+            mock_digest.assert_any_call(wanos[0].folder / "TestWaNo.xml")
+            mock_digest.assert_any_call(wanos[1].folder / "TestWaNo.xml")
+
+            (wanos[1].folder / "TestWaNo.xml").write_text("<WaNoTemplate/>\n")
+            assert not widget._compare_wano_equality(*wanos)
 
     def test_read_delta(self):
         """Test _read_delta method."""
@@ -94,14 +264,16 @@ class TestWFWaNoWidgetMethods:
         widget.wano_model.read.assert_called_once_with(test_folder)
         widget.wano_model.update_views_from_models.assert_called_once()
 
-    @patch("simstack.view.wf_editor_widgets.copy.deepcopy")
-    def test_render(self, mock_deepcopy):
+    @patch("simstack.view.wf_editor_widgets.copy_exec_module")
+    def test_render(self, mock_copy_exec_module):
         """Test render method."""
         widget = WFWaNoWidget.__new__(WFWaNoWidget)
         widget.wano_model = MagicMock()
         widget.wano_model.name = "TestWaNo"
         widget.wf_model = MagicMock()
         widget.wf_model.base_resource_during_render.return_value = "base_resources"
+        widget.wf_model.render_cache.return_value.get.return_value = None
+        widget._render_key = MagicMock(return_value="key")
 
         # Mock render method return
         mock_wem = MagicMock()
@@ -111,14 +283,14 @@ class TestWFWaNoWidgetMethods:
             mock_wem,
         )
 
-        # Mock deepcopy
+        # Mock copy
         mock_copied_wem = MagicMock()
         mock_copied_wem.name = "copied_wem"
         mock_copied_wem.resources.overwrite_unset_fields_from_default_resources = (
             MagicMock()
         )
         mock_copied_wem.set_wano_xml = MagicMock()
-        mock_deepcopy.return_value = mock_copied_wem
+        mock_copy_exec_module.return_value = mock_copied_wem
 
         path_list = ["path1", "path2"]
         output_path_list = ["out1", "out2"]
@@ -135,8 +307,8 @@ class TestWFWaNoWidgetMethods:
                 basefolder, stageout_basedir=stageout_basedir
             )
 
-            # Verify deepcopy was called
-            mock_deepcopy.assert_called_once_with(mock_wem)
+            # Verify the module was copied
+            mock_copy_exec_module.assert_called_once_with(mock_wem)
 
             # Verify resource overwrite
             mock_copied_wem.resources.overwrite_unset_fields_from_default_resources.assert_called_once_with(
@@ -154,6 +326,86 @@ class TestWFWaNoWidgetMethods:
             # Verify print was called
             mock_print.assert_called_once()
 
+            # Verify the result was cached
+            widget._render_key.assert_called_once_with(stageout_basedir)
+            widget.wf_model.render_cache.return_value.put.assert_called_once_with(
+                "key", basefolder, "jsdl", mock_copied_wem
+            )
+
+    def test_render_cached(self, tmp_path, qtbot):
+        """Test render reuses the files of an unchanged WaNo."""
+        wano_folder = tmp_path / "wano"
+        wano_folder.mkdir()
+        (wano_folder / "TestWaNo.xml").write_text("<WaNoTemplate/>")
+        first = tmp_path / "first"
+        first.mkdir()
+        second = tmp_path / "second"
+        second.mkdir()
+
+        widget = WFWaNoWidget.__new__(WFWaNoWidget)
+        widget.wano = MagicMock()
+        widget.wano.folder = wano_folder
+        widget.wano_model = MagicMock()
+        widget.wano_model.name = "TestWaNo"
+        widget.wano_model.save.side_effect = lambda folder: (
+            folder / "delta.yml"
+        ).write_text("value: %d" % widget.value)
+        widget.value = 1
+        widget.wf_model = MagicMock()
+        widget.wf_model.render_cache.return_value = RenderCache()
+        local_file = tmp_path / "structure.xyz"
+        local_file.write_text("H 0 0 0")
+        file_view = WaNoItemFileView()
+        qtbot.addWidget(file_view.actual_widget)
+        file_model = MagicMock()
+        file_model.get_data.return_value = str(local_file)
+        file_model.get_root.return_value = widget.wano_model
+        file_view.set_model(file_model)
+
+        def render_files(basefolder, stageout_basedir):
+            (Path(basefolder) / "input.txt").write_text("rendered")
+            wem = MagicMock()
+            wem.name = "TestWaNo"
+            return "jsdl", wem
+
+        widget.wano_model.render_and_write_input_files_newmodel.side_effect = (
+            render_files
+        )
+
+        with (
+            patch("builtins.print"),
+            patch(
+                "simstack.view.wf_editor_widgets.copy_exec_module",
+                side_effect=lambda x: x,
+            ),
+            patch("simstack.lib.RenderCache.copy_exec_module", side_effect=lambda x: x),
+        ):
+            widget.render([], [], str(first), "TestWaNo")
+            jsdl, wem, path_list = widget.render([], [], str(second), "TestWaNo")
+            assert (
+                widget.wano_model.render_and_write_input_files_newmodel.call_count == 1
+            )
+            assert (second / "input.txt").read_text() == "rendered"
+            assert path_list == ["TestWaNo"]
+
+            # A changed parameter is rendered again
+            widget.value = 2
+            third = tmp_path / "third"
+            third.mkdir()
+            widget.render([], [], str(third), "TestWaNo")
+            assert (
+                widget.wano_model.render_and_write_input_files_newmodel.call_count == 2
+            )
+
+            # A changed local file, which a parameter references, as well
+            local_file.write_text("He 0 0 0")
+            fourth = tmp_path / "fourth"
+            fourth.mkdir()
+            widget.render([], [], str(fourth), "TestWaNo")
+            assert (
+                widget.wano_model.render_and_write_input_files_newmodel.call_count == 3
+            )
+
 
 class TestWFItemListInterface:
     """Tests for WFItemListInterface class."""